@@ -105,7 +105,7 @@ class OSFCASAuthentication(authentication.BaseAuthentication):
 
         # Found a token; query CAS for the associated user id
         try:
-            cas_auth_response = client.profile(auth_token)
+            cas_auth_response = client.cached_profile(auth_token)
         except cas.CasHTTPError:
             raise exceptions.NotAuthenticated(_('User provided an invalid OAuth2 access token'))
 
@@ -311,6 +311,11 @@ class ODMFilterMixin(FilterMixin):
         else:
             query = default_query
 
+        get_cursor_query = getattr(self.paginator, 'get_cursor_query', None)
+        cursor_query = get_cursor_query(self.request, self) if get_cursor_query else None
+        if cursor_query:
+            query = query & cursor_query if query else cursor_query
+
         return query
 
     def query_params_to_odm_query(self, query_params):
@@ -339,6 +344,10 @@ class ListFilterMixin(FilterMixin):
 
     Subclasses must define `get_default_queryset()`.
 
+    Subclasses whose default queryset can be expressed as a single MODM query may also define
+    `get_default_odm_query()`. Filters on fields stored on `model_class` are then compiled into
+    that query, and only the remaining filters (e.g. on `SerializerMethodField`s) are applied in memory.
+
     Serializers that want to restrict which fields are used for filtering need to have a variable called
     filterable_fields which is a frozenset of strings representing the field names as they appear in the serialization.
     """
@@ -358,66 +367,99 @@ class ListFilterMixin(FilterMixin):
     def get_default_queryset(self):
         raise NotImplementedError('Must define get_default_queryset')
 
+    def get_default_odm_query(self):
+        """Return the MODM query selecting the default queryset from `model_class`, or None if the
+        default queryset is not backed by a single query.
+        """
+        return None
+
+    def get_odm_queryset(self, query):
+        """Run a compiled query. Override if the results of `model_class.find` need wrapping."""
+        return self.model_class.find(query)
+
+    def is_stored_field(self, field, source_field_name):
+        """Whether a filter on `field` can be compiled into a query against `model_class`"""
+        if isinstance(field, ser.SerializerMethodField):
+            return False
+        return source_field_name in getattr(self.model_class, '_fields', {})
+
     def get_queryset_from_request(self):
-        default_queryset = self.get_default_queryset()
-        if not self.kwargs.get('is_embedded') and self.request.query_params:
-            param_queryset = self.param_queryset(self.request.query_params, default_queryset)
-            return param_queryset
-        else:
-            return default_queryset
+        if self.kwargs.get('is_embedded') or not self.request.query_params:
+            return self.get_default_queryset()
+        default_query = self.get_default_odm_query()
+        if default_query is not None:
+            return self.odm_param_queryset(self.request.query_params, default_query)
+        return self.param_queryset(self.request.query_params, self.get_default_queryset())
+
+    def odm_param_queryset(self, query_params, default_query):
+        """Compiles filters on stored fields into `default_query` and applies the rest in memory"""
+        filters = self.parse_query_params(query_params)
+        query_parts = [default_query]
+        remaining_filters = {}
+        for field_name, params in filters.iteritems():
+            field = self.serializer_class._declared_fields[field_name]
+            for group in params:
+                if self.is_stored_field(field, group['source_field_name']):
+                    # Query based on the DB field, not the name of the serializer parameter
+                    query_parts.append(Q(group['source_field_name'], group['op'], group['value']))
+                else:
+                    remaining_filters.setdefault(field_name, []).append(group)
+        queryset = self.get_odm_queryset(functools.reduce(operator.and_, query_parts))
+        if remaining_filters:
+            return self.filter_queryset(remaining_filters, queryset)
+        return queryset
 
     def param_queryset(self, query_params, default_queryset):
         """filters default queryset based on query parameters"""
         filters = self.parse_query_params(query_params)
-        queryset = set(default_queryset)
-        if filters:
-            for field_name, params in filters.iteritems():
-                for group in params:
-                    queryset = queryset.intersection(set(self.get_filtered_queryset(field_name, group, default_queryset)))
-        return list(queryset)
+        if not filters:
+            return default_queryset
+        return self.filter_queryset(filters, default_queryset)
+
+    def filter_queryset(self, filters, queryset):
+        """Applies parsed filters to each item in a single pass, preserving the order of `queryset`"""
+        predicates = [
+            self.get_filter_predicate(field_name, group)
+            for field_name, params in filters.iteritems()
+            for group in params
+        ]
+        try:
+            return [
+                item for item in queryset
+                if all(predicate(item) for predicate in predicates)
+            ]
+        except TypeError:
+            raise InvalidFilterValue(detail='Could not apply filter to specified field')
 
     def get_filtered_queryset(self, field_name, params, default_queryset):
         """filters default queryset based on the serializer field type"""
+        return self.filter_queryset({field_name: [params]}, default_queryset)
+
+    def get_filter_predicate(self, field_name, params):
+        """Returns a function of one item which tests it against a single parsed filter"""
         field = self.serializer_class._declared_fields[field_name]
         source_field_name = params['source_field_name']
 
         if isinstance(field, ser.SerializerMethodField):
-            return_val = [
-                item for item in default_queryset
-                if self.FILTERS[params['op']](self.get_serializer_method(field_name)(item), params['value'])
-            ]
+            serializer_method = self.get_serializer_method(field_name)
+            op = self.FILTERS[params['op']]
+            return lambda item: op(serializer_method(item), params['value'])
         elif isinstance(field, ser.CharField):
             if source_field_name in ('_id', 'root'):
                 # Param parser treats certain ID fields as bulk queries: a list of options, instead of just one
                 # Respect special-case behavior, and enforce exact match for these list fields.
                 options = set(item.lower() for item in params['value'])
-                return_val = [
-                    item for item in default_queryset
-                    if getattr(item, source_field_name, '') in options
-                ]
-            else:
-                # TODO: What is {}.lower()? Possible bug
-                return_val = [
-                    item for item in default_queryset
-                    if params['value'].lower() in getattr(item, source_field_name, {}).lower()
-                ]
+                return lambda item: getattr(item, source_field_name, '') in options
+            # TODO: What is {}.lower()? Possible bug
+            value = params['value'].lower()
+            return lambda item: value in getattr(item, source_field_name, {}).lower()
         elif isinstance(field, ser.ListField):
-            return_val = [
-                item for item in default_queryset
-                if params['value'].lower() in [
-                    lowercase(i.lower) for i in getattr(item, source_field_name, [])
-                ]
+            value = params['value'].lower()
+            return lambda item: value in [
+                lowercase(i.lower) for i in getattr(item, source_field_name, [])
             ]
-        else:
-            try:
-                return_val = [
-                    item for item in default_queryset
-                    if self.FILTERS[params['op']](getattr(item, source_field_name, None), params['value'])
-                ]
-            except TypeError:
-                raise InvalidFilterValue(detail='Could not apply filter to specified field')
-
-        return return_val
+        op = self.FILTERS[params['op']]
+        return lambda item: op(getattr(item, source_field_name, None), params['value'])
 
     def get_serializer_method(self, field_name):
         """
@@ -1,3 +1,10 @@
+import base64
+import datetime
+import functools
+import json
+import operator
+
+from dateutil import parser as date_parser
 from django.utils import six
 from collections import OrderedDict
 from django.core.urlresolvers import reverse
@@ -9,8 +16,14 @@ from rest_framework.response import Response
 from rest_framework.utils.urls import (
     replace_query_param, remove_query_param
 )
+from modularodm import Q
+from modularodm.query import queryset as modularodm_queryset
+
+from api.base.exceptions import InvalidQueryStringError
+from api.base.filters import ODMOrderingFilter
 from api.base.serializers import is_anonymized
 from api.base.settings import MAX_PAGE_SIZE
+from api.base.utils import is_truthy
 
 from framework.guid.model import Guid
 from website.project.model import Node, Comment
@@ -27,6 +40,16 @@ class JSONAPIPagination(pagination.PageNumberPagination):
     page_size_query_param = 'page[size]'
     max_page_size = MAX_PAGE_SIZE
 
+    # Opt-in keyset pagination: `page[cursor]=` starts at the first page. Only
+    # counts the result set if `page[total]` is truthy.
+    cursor_query_param = 'page[cursor]'
+    total_query_param = 'page[total]'
+
+    cursor = None
+    cursor_page = None
+    cursor_query_applied = False
+    cursor_query_disabled = False
+
     def page_number_query(self, url, page_number):
         """
         Builds uri and adds page param.
@@ -63,6 +86,8 @@ class JSONAPIPagination(pagination.PageNumberPagination):
         return self.page_number_query(url, page_number)
 
     def get_response_dict(self, data, url):
+        if self.cursor_page is not None:
+            return self.get_cursor_response_dict(data, url)
         return OrderedDict([
             ('data', data),
             ('links', OrderedDict([
@@ -106,6 +131,12 @@ class JSONAPIPagination(pagination.PageNumberPagination):
 
         If this is an embedded resource, returns first page, ignoring query params.
         """
+        if self.is_cursor_request(request, view) and isinstance(queryset, modularodm_queryset.BaseQuerySet):
+            # Views that did not apply the seek query would ignore the cursor, so
+            # fall back to page numbers for those
+            if not request.query_params.get(self.cursor_query_param) or self.cursor_query_applied:
+                return self.paginate_queryset_by_cursor(queryset, request, view)
+
         if request.parser_context['kwargs'].get('is_embedded'):
             paginator = DjangoPaginator(queryset, self.page_size)
             page_number = 1
@@ -127,6 +158,149 @@ class JSONAPIPagination(pagination.PageNumberPagination):
         else:
             return super(JSONAPIPagination, self).paginate_queryset(queryset, request, view=None)
 
+    def is_cursor_request(self, request, view):
+        """Whether to paginate by cursor. Only views that set
+        `supports_cursor_pagination` apply the seek query of the cursor to their
+        queryset, so other views always paginate by page number.
+        """
+        return (
+            getattr(view, 'supports_cursor_pagination', False) and
+            self.cursor_query_param in request.query_params and
+            not request.parser_context['kwargs'].get('is_embedded')
+        )
+
+    def get_cursor_ordering(self, request, view, queryset=None):
+        """Return the sort keys of the view with `_id` appended as a tie-breaker,
+        so that every document has a unique position.
+        """
+        ordering = list(ODMOrderingFilter().get_ordering(request, queryset, view) or [])
+        if '_id' not in [field.lstrip('-') for field in ordering]:
+            ordering.append('_id')
+        return ordering
+
+    def encode_cursor(self, direction, values):
+        values = [
+            {'$date': value.isoformat()} if isinstance(value, datetime.datetime) else value
+            for value in values
+        ]
+        return base64.urlsafe_b64encode(json.dumps([direction, values]))
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            if direction not in ('next', 'prev') or not isinstance(values, list):
+                raise ValueError
+            return direction, [
+                date_parser.parse(value['$date']) if isinstance(value, dict) else value
+                for value in values
+            ]
+        except (TypeError, ValueError, KeyError):
+            raise InvalidQueryStringError(parameter=self.cursor_query_param, detail='Invalid cursor.')
+
+    def get_cursor_query(self, request, view):
+        """Return the query selecting the documents after (or before) the requested
+        cursor, or `None` if not paginating by cursor. Views that build their
+        queryset from a modular-odm query must intersect it with this query.
+        """
+        if self.cursor_query_disabled or not self.is_cursor_request(request, view):
+            return None
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        direction, values = self.cursor = self.decode_cursor(cursor)
+        ordering = self.get_cursor_ordering(request, view)
+        if len(values) != len(ordering):
+            raise InvalidQueryStringError(parameter=self.cursor_query_param, detail='Invalid cursor.')
+        self.cursor_query_applied = True
+
+        clauses = []
+        for index, field in enumerate(ordering):
+            # Ties on every preceding key, and past the cursor on this one
+            comparison = 'lt' if field.startswith('-') == (direction == 'next') else 'gt'
+            past = self.get_seek_query(field.lstrip('-'), comparison, values[index])
+            if past is None:
+                continue
+            equal = [Q(prev.lstrip('-'), 'eq', value) for prev, value in zip(ordering[:index], values)]
+            clauses.append(functools.reduce(operator.and_, equal + [past]))
+        if not clauses:
+            # Nothing comes after the cursor
+            return Q('_id', 'eq', None)
+        return functools.reduce(operator.or_, clauses)
+
+    def get_seek_query(self, field, comparison, value):
+        """Return the query selecting documents whose `field` sorts before ('lt')
+        or after ('gt') `value`, or `None` if none can. Missing and null values
+        sort before every other value, but are never matched by `lt` or `gt`.
+        """
+        if value is None:
+            return Q(field, 'ne', None) if comparison == 'gt' else None
+        if comparison == 'lt':
+            return Q(field, 'lt', value) | Q(field, 'eq', None)
+        return Q(field, 'gt', value)
+
+    def paginate_queryset_by_cursor(self, queryset, request, view):
+        self.request = request
+        page_size = self.get_page_size(request)
+        direction = self.cursor[0] if self.cursor else 'next'
+        ordering = self.get_cursor_ordering(request, view, queryset)
+        if direction == 'prev':
+            sort = [field.lstrip('-') if field.startswith('-') else '-' + field for field in ordering]
+        else:
+            sort = ordering
+
+        results = list(queryset.sort(*sort).limit(page_size + 1))
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if direction == 'prev':
+            results.reverse()
+            self.has_previous_cursor, self.has_next_cursor = has_more, True
+        else:
+            self.has_previous_cursor, self.has_next_cursor = self.cursor is not None, has_more
+
+        self.cursor_ordering = ordering
+        self.cursor_page = results
+        self.cursor_page_size = page_size
+        self.cursor_total = None
+        if is_truthy(request.query_params.get(self.total_query_param, False)):
+            self.cursor_total = self.get_cursor_total(view)
+        return results
+
+    def get_cursor_total(self, view):
+        self.cursor_query_disabled = True
+        try:
+            queryset = view.get_queryset()
+        finally:
+            self.cursor_query_disabled = False
+        if isinstance(queryset, modularodm_queryset.BaseQuerySet):
+            return queryset.count()
+        return len(queryset)
+
+    def cursor_query(self, url, direction, obj):
+        url = remove_query_param(self.request.build_absolute_uri(url), '_')
+        url = remove_query_param(url, self.page_query_param)
+        if direction is None:
+            return replace_query_param(url, self.cursor_query_param, '')
+        storage = obj.to_storage()
+        values = [storage.get(field.lstrip('-')) for field in self.cursor_ordering]
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(direction, values))
+
+    def get_cursor_response_dict(self, data, url):
+        page = self.cursor_page
+        meta = OrderedDict()
+        if self.cursor_total is not None:
+            meta['total'] = self.cursor_total
+        meta['per_page'] = self.cursor_page_size
+        return OrderedDict([
+            ('data', data),
+            ('links', OrderedDict([
+                ('first', self.cursor_query(url, None, None) if self.has_previous_cursor else None),
+                ('last', None),
+                ('prev', self.cursor_query(url, 'prev', page[0]) if page and self.has_previous_cursor else None),
+                ('next', self.cursor_query(url, 'next', page[-1]) if page and self.has_next_cursor else None),
+                ('meta', meta),
+            ])),
+        ])
+
 
 class CommentPagination(JSONAPIPagination):
 
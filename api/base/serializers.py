@@ -1,4 +1,5 @@
 import collections
+import copy
 import re
 
 import furl
@@ -18,6 +19,7 @@ from api.base.exceptions import TargetNotSupportedError
 from api.base.exceptions import RelationshipPostMakesNoChanges
 from api.base.settings import BULK_SETTINGS
 from api.base.utils import absolute_reverse, extend_querystring_params
+from api.caching.utils import get_representation_version, representation_cache
 from framework.auth import core as auth_core
 from website import settings
 from website import util as website_utils
@@ -845,6 +847,9 @@ class JSONAPIListSerializer(ser.ListSerializer):
                 self.child.to_esi_representation(item, envelope=None) for item in data
             ]
         else:
+            data = list(data)
+            self.child.prefetch_page(data)
+            self.prefetch_embeds(data)
             ret = [
                 self.child.to_representation(item, envelope=envelope) for item in data
             ]
@@ -854,6 +859,15 @@ class JSONAPIListSerializer(ser.ListSerializer):
 
         return ret
 
+    def prefetch_embeds(self, data):
+        """Give each embed partial a chance to load its relationship for the whole
+        page before items are serialized one at a time.
+        """
+        for partial in self.context.get('embed', {}).values():
+            prefetch = getattr(partial, 'prefetch', None)
+            if prefetch and data:
+                prefetch(data)
+
     # Overrides ListSerializer which doesn't support multiple update by default
     def update(self, instance, validated_data):
 
@@ -934,6 +948,11 @@ class JSONAPISerializer(ser.Serializer):
         'nodes:node-registrations',
     }
 
+    # Whether anonymous representations may be reused across requests until the
+    # object is saved. Only enable for serializers whose output, embeds aside,
+    # depends on nothing but the object and the anonymized flag.
+    cache_representation = False
+
     # overrides Serializer
     @classmethod
     def many_init(cls, *args, **kwargs):
@@ -949,6 +968,33 @@ class JSONAPISerializer(ser.Serializer):
             [f.field_name for f in fields_check if getattr(f, 'json_api_link', False)])
         return invalid_embeds
 
+    def prefetch_page(self, items):
+        """Called with a page of items before they are serialized one at a time.
+        Serializers may override this to load data for the whole page at once.
+        """
+        pass
+
+    def get_representation_cache_key(self, obj, is_anonymous):
+        """Return the key under which the representation of ``obj`` is cached, or
+        ``None`` if it may not be cached for this request. Embeds are never cached;
+        they are rendered for each request on top of the cached representation.
+        """
+        if not self.cache_representation or self.context.get('enable_esi'):
+            return None
+        request = self.context['request']
+        if not request.user.is_anonymous() or 'related_counts' in request.query_params:
+            return None
+        if not hasattr(obj, 'absolute_api_v2_url'):
+            return None
+        return (
+            '{}.{}'.format(type(self).__module__, type(self).__name__),
+            obj._primary_key,
+            get_representation_version(obj),
+            is_anonymous,
+            request.get_host(),
+            request.version,
+        )
+
     def to_esi_representation(self, data, envelope='data'):
         href = None
         query_params_blacklist = ['page[size]']
@@ -1004,13 +1050,23 @@ class JSONAPISerializer(ser.Serializer):
                                           detail='The following fields are not embeddable: {}'.format(
                                               ', '.join(invalid_embeds)))
 
+        cache_key = self.get_representation_cache_key(obj, is_anonymous)
+        cached = representation_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            data = copy.deepcopy(cached)
+            data['embeds'] = {}
+
         for field in fields:
+            nested_field = getattr(field, 'field', None)
+            is_link = getattr(field, 'json_api_link', False) or getattr(nested_field, 'json_api_link', False)
+            if cached is not None and not (is_link and field.field_name in embeds):
+                continue
+
             try:
                 attribute = field.get_attribute(obj)
             except SkipField:
                 continue
 
-            nested_field = getattr(field, 'field', None)
             if attribute is None:
                 # We skip `to_representation` for `None` values so that
                 # fields do not have to explicitly deal with that case.
@@ -1020,7 +1076,7 @@ class JSONAPISerializer(ser.Serializer):
                     representation = field.to_representation(attribute)
                 except SkipField:
                     continue
-                if getattr(field, 'json_api_link', False) or getattr(nested_field, 'json_api_link', False):
+                if is_link:
                     # If embed=field_name is appended to the query string or 'always_embed' flag is True, directly embed the
                     # results in addition to adding a relationship link
                     if embeds and (field.field_name in embeds or getattr(field, 'always_embed', None)):
@@ -1040,6 +1096,8 @@ class JSONAPISerializer(ser.Serializer):
                             data['embeds'][field.field_name] = result
                         else:
                             data['embeds'][field.field_name] = {'error': 'This field is not embeddable.'}
+                    if cached is not None:
+                        continue
                     try:
                         if not (is_anonymous and
                                     hasattr(field, 'view_name') and
@@ -1054,8 +1112,14 @@ class JSONAPISerializer(ser.Serializer):
                 else:
                     data['attributes'][field.field_name] = representation
 
-        if not data['relationships']:
-            del data['relationships']
+        if cache_key and cached is None:
+            embedded = data.pop('embeds')
+            representation_cache.set(cache_key, data)
+            data = copy.deepcopy(data)
+            data['embeds'] = embedded
+
+        if not data.get('relationships'):
+            data.pop('relationships', None)
 
         if not data['embeds']:
             del data['embeds']
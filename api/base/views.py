@@ -1,3 +1,4 @@
+import collections
 import weakref
 from django.conf import settings as django_settings
 from django.http import JsonResponse
@@ -43,6 +44,25 @@ class JSONAPIBaseView(generics.GenericAPIView):
         """
         if getattr(field, 'field', None):
             field = field.field
+
+        def prefetch(items):
+            """Resolve this embed for every item of a page up front, letting each
+            embedded view class load what it needs with one query per relationship
+            rather than one per item.
+            """
+            views = collections.OrderedDict()
+            for item in items:
+                try:
+                    v, view_args, view_kwargs = field.resolve(item, field_name)
+                except Exception:
+                    # Let the per-item partial surface the error
+                    continue
+                if not v:
+                    continue
+                views.setdefault(v.cls, []).append(view_kwargs)
+            for view_cls, kwargs_list in views.items():
+                view_cls.prefetch_embeds(self.request, kwargs_list)
+
         def partial(item):
             # resolve must be implemented on the field
             v, view_args, view_kwargs = field.resolve(item, field_name)
@@ -105,8 +125,21 @@ class JSONAPIBaseView(generics.GenericAPIView):
 
             return ret
 
+        partial.prefetch = prefetch
         return partial
 
+    @classmethod
+    def prefetch_embeds(cls, request, kwargs_list):
+        """Called before a page of items embedding this view is serialized, with the
+        view kwargs resolved for each item. Views may override this to bulk-load the
+        objects their ``get_object`` or ``get_queryset`` would otherwise load one item
+        at a time; the ODM identity map then serves those per-item lookups.
+
+        :param request: The request the page is being serialized for
+        :param list kwargs_list: URL kwargs of the embedded view, one dict per item
+        """
+        pass
+
     def get_serializer_context(self):
         """Inject request into the serializer context. Additionally, inject partial functions
         (request, object -> embed items) if the query string contains embeds.  Allows
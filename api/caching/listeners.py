@@ -1,8 +1,32 @@
-from api.caching.tasks import ban_url
+from api.caching.tasks import BanBatch, ban_batch
+from api.caching.utils import invalidate_representation
+from framework.caching import request_cache
 from framework.postcommit_tasks.handlers import enqueue_postcommit_task
 from modularodm import signals
+from website import settings
+
+
+def get_ban_batch():
+    """Return the batch of bans for the current request, creating and enqueueing
+    it on first use. Outside of a request every call gets its own batch.
+    """
+    cache = request_cache('varnish-bans')
+    if cache is not None and 'batch' in cache:
+        return cache['batch']
+    batch = BanBatch()
+    if cache is not None:
+        cache['batch'] = batch
+    enqueue_postcommit_task(ban_batch, (batch, ), {}, celery=False, once_per_request=True)
+    return batch
+
 
 @signals.save.connect
 def ban_object_from_cache(sender, instance, fields_changed, cached_data):
+    if settings.ENABLE_VARNISH and hasattr(instance, 'absolute_api_v2_url'):
+        get_ban_batch().add(instance)
+
+
+@signals.save.connect
+def invalidate_cached_representation(sender, instance, fields_changed, cached_data):
     if hasattr(instance, 'absolute_api_v2_url'):
-        enqueue_postcommit_task(ban_url, (instance, ), {}, celery=False, once_per_request=True)
+        invalidate_representation(instance)
@@ -1,85 +1,205 @@
+import threading
+import time
 import urlparse
 
 import requests
 import logging
+from gevent.pool import Pool
+from requests.adapters import HTTPAdapter
 from website.project.model import Comment
 
 from website import settings
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections to the varnish servers, shared by all bans in this process
+_session = None
+_session_lock = threading.Lock()
+
 
 def get_varnish_servers():
     #  TODO: this should get the varnish servers from HAProxy or a setting
     return settings.VARNISH_SERVERS
 
 
-def get_bannable_urls(instance):
-    bannable_urls = []
-    parsed_absolute_url = {}
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=max(len(get_varnish_servers()), 1),
+                pool_maxsize=settings.VARNISH_BAN_CONCURRENCY,
+            )
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+class BanMetrics(object):
+    """Running totals for bans sent by this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sent = 0
+            self.failed = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.sent += 1
+            if not ok:
+                self.failed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'mean_latency': self.total_latency / self.sent if self.sent else 0.0,
+                'max_latency': self.max_latency,
+            }
 
+ban_metrics = BanMetrics()
+
+
+def get_bannable_paths(instance):
+    """Return the API paths whose cached responses go stale when ``instance``
+    changes, along with the hostname of the API.
+    """
     if not hasattr(instance, 'absolute_api_v2_url'):
         logger.warning('Tried to ban {}:{} but it didn\'t have a absolute_api_v2_url method'.format(instance.__class__, instance))
         return [], ''
 
+    parsed_absolute_url = urlparse.urlparse(instance.absolute_api_v2_url)
+    paths = [parsed_absolute_url.path]
+    if isinstance(instance, Comment):
+        try:
+            paths.append(urlparse.urlparse(instance.target.referent.absolute_api_v2_url).path)
+        except AttributeError:
+            # some referents don't have an absolute_api_v2_url
+            # I'm looking at you NodeWikiPage
+            pass
+
+        try:
+            paths.append(urlparse.urlparse(instance.root_target.referent.absolute_api_v2_url).path)
+        except AttributeError:
+            # some root_targets don't have an absolute_api_v2_url
+            pass
+
+    return paths, parsed_absolute_url.hostname
+
+
+def get_bannable_urls(instance):
+    bannable_urls = []
+    paths, hostname = get_bannable_paths(instance)
     for host in get_varnish_servers():
-        # add instance url
         varnish_parsed_url = urlparse.urlparse(host)
-        parsed_absolute_url = urlparse.urlparse(instance.absolute_api_v2_url)
-        url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                          netloc=varnish_parsed_url.netloc,
-                                                          path=parsed_absolute_url.path)
-        bannable_urls.append(url_string)
-        if isinstance(instance, Comment):
-            try:
-                parsed_target_url = urlparse.urlparse(instance.target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some referents don't have an absolute_api_v2_url
-                # I'm looking at you NodeWikiPage
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                                  netloc=varnish_parsed_url.netloc,
-                                                                  path=parsed_target_url.path)
-                bannable_urls.append(url_string)
-
-            try:
-                parsed_root_target_url = urlparse.urlparse(instance.root_target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some root_targets don't have an absolute_api_v2_url
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                              netloc=varnish_parsed_url.netloc,
-                                                              path=parsed_root_target_url.path)
-                bannable_urls.append(url_string)
-
-    return bannable_urls, parsed_absolute_url.hostname
+        for path in paths:
+            bannable_urls.append(get_ban_url(varnish_parsed_url, path))
+    return bannable_urls, hostname
 
 
-def ban_url(instance):
-    # TODO: Refactor; Pull url generation into postcommit_task handling so we only ban urls once per request
+def get_ban_url(varnish_parsed_url, path):
+    return '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
+                                                netloc=varnish_parsed_url.netloc,
+                                                path=path)
+
+
+def collapse_paths(paths):
+    """Reduce ``paths`` to the smallest set of prefixes that bans the same URLs.
+    Each ban matches everything below its path, so a path is dropped when
+    another path in the set is a prefix of it.
+    """
+    collapsed = []
+    for path in sorted(set(paths)):
+        if collapsed and path.startswith(collapsed[-1]):
+            continue
+        collapsed.append(path)
+    return collapsed
+
+
+def send_ban(url_to_ban, hostname, timeout):
+    start = time.time()
+    try:
+        response = get_session().request('BAN', url_to_ban, timeout=timeout, headers=dict(
+            Host=hostname
+        ))
+    except Exception as ex:
+        ok = False
+        logger.error('Banning {} failed: {}'.format(
+            url_to_ban,
+            ex.message
+        ))
+    else:
+        ok = response.ok
+        if not ok:
+            logger.error('Banning {} failed: {}'.format(
+                url_to_ban,
+                response.text
+            ))
+        else:
+            logger.info('Banning {} succeeded'.format(
+                url_to_ban
+            ))
+    ban_metrics.record(time.time() - start, ok)
+    return ok
+
+
+def ban_paths(paths, hostname):
+    """Ban every collapsed path on every varnish server concurrently.
+
+    :return: Number of bans that failed
+    """
     timeout = 0.3  # 300ms timeout for bans
+    if not settings.ENABLE_VARNISH:
+        return 0
+    urls = [
+        get_ban_url(urlparse.urlparse(host), path)
+        for host in get_varnish_servers()
+        for path in collapse_paths(paths)
+    ]
+    if not urls:
+        return 0
+    start = time.time()
+    pool = Pool(settings.VARNISH_BAN_CONCURRENCY)
+    results = pool.map(lambda url: send_ban(url, hostname, timeout), urls)
+    failed = results.count(False)
+    logger.info('Sent {} bans in {:.0f}ms, {} failed'.format(len(urls), (time.time() - start) * 1000, failed))
+    return failed
+
+
+class BanBatch(object):
+    """Paths to ban once the current request has committed. Each request
+    enqueues a single batch as a postcommit task, so objects saved several times
+    or sharing a path are only banned once.
+    """
+
+    def __init__(self):
+        self.paths = set()
+        self.hostname = None
+
+    def __repr__(self):
+        return '<BanBatch {}>'.format(id(self))
+
+    def add(self, instance):
+        paths, hostname = get_bannable_paths(instance)
+        self.paths.update(paths)
+        self.hostname = self.hostname or hostname
+
+
+def ban_batch(batch):
+    ban_paths(batch.paths, batch.hostname)
+
+
+def ban_url(instance):
     if settings.ENABLE_VARNISH:
-        bannable_urls, hostname = get_bannable_urls(instance)
-
-        for url_to_ban in set(bannable_urls):
-            try:
-                response = requests.request('BAN', url_to_ban, timeout=timeout, headers=dict(
-                    Host=hostname
-                ))
-            except Exception as ex:
-                logger.error('Banning {} failed: {}'.format(
-                    url_to_ban,
-                    ex.message
-                ))
-            else:
-                if not response.ok:
-                    logger.error('Banning {} failed: {}'.format(
-                        url_to_ban,
-                        response.text
-                    ))
-                else:
-                    logger.info('Banning {} succeeded'.format(
-                        url_to_ban
-                    ))
+        paths, hostname = get_bannable_paths(instance)
+        ban_paths(paths, hostname)
@@ -0,0 +1,66 @@
+import mock
+from nose.tools import *  # flake8: noqa
+
+from api.caching import tasks
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory
+from website import settings
+
+
+class TestBanPipeline(OsfTestCase):
+
+    def setUp(self):
+        super(TestBanPipeline, self).setUp()
+        tasks.ban_metrics.reset()
+
+    def test_collapse_paths_drops_duplicates_and_covered_paths(self):
+        paths = [
+            '/v2/nodes/abc12/',
+            '/v2/nodes/abc12/contributors/',
+            '/v2/nodes/abc12/',
+            '/v2/nodes/abc123/',
+            '/v2/users/xyz98/',
+        ]
+        assert_equal(
+            tasks.collapse_paths(paths),
+            ['/v2/nodes/abc12/', '/v2/nodes/abc123/', '/v2/users/xyz98/']
+        )
+
+    @mock.patch('api.caching.tasks.send_ban')
+    def test_ban_paths_fans_out_to_every_server(self, mock_send):
+        mock_send.return_value = True
+        servers = ['http://varnish1:8080', 'http://varnish2:8080']
+        with mock.patch.object(settings, 'ENABLE_VARNISH', True), mock.patch.object(settings, 'VARNISH_SERVERS', servers):
+            failed = tasks.ban_paths(['/v2/nodes/abc12/', '/v2/nodes/abc12/files/'], 'api.osf.io')
+        assert_equal(failed, 0)
+        urls = sorted(call[0][0] for call in mock_send.call_args_list)
+        assert_equal(urls, [
+            'http://varnish1:8080/v2/nodes/abc12/.*',
+            'http://varnish2:8080/v2/nodes/abc12/.*',
+        ])
+
+    @mock.patch('api.caching.tasks.send_ban')
+    def test_ban_paths_does_nothing_when_varnish_disabled(self, mock_send):
+        with mock.patch.object(settings, 'ENABLE_VARNISH', False):
+            tasks.ban_paths(['/v2/nodes/abc12/'], 'api.osf.io')
+        assert_false(mock_send.called)
+
+    @mock.patch('api.caching.tasks.get_session')
+    def test_send_ban_records_metrics(self, mock_session):
+        mock_session.return_value.request.side_effect = [
+            mock.Mock(ok=True),
+            Exception('timed out'),
+        ]
+        assert_true(tasks.send_ban('http://varnish1:8080/v2/nodes/abc12/.*', 'api.osf.io', 0.3))
+        assert_false(tasks.send_ban('http://varnish1:8080/v2/nodes/abc12/.*', 'api.osf.io', 0.3))
+        snapshot = tasks.ban_metrics.snapshot()
+        assert_equal(snapshot['sent'], 2)
+        assert_equal(snapshot['failed'], 1)
+
+    def test_ban_batch_collects_paths_once(self):
+        node = ProjectFactory()
+        batch = tasks.BanBatch()
+        batch.add(node)
+        batch.add(node)
+        assert_equal(len(batch.paths), 1)
+        assert_in(node._id, list(batch.paths)[0])
@@ -0,0 +1,39 @@
+import uuid
+
+from framework.caching import TieredCache
+from website import settings
+
+# Serialized representations, keyed by (serializer, pk, version, ...)
+representation_cache = TieredCache(
+    'api-representation',
+    max_size=settings.API_REPRESENTATION_CACHE_SIZE,
+    ttl=settings.API_REPRESENTATION_CACHE_TTL,
+)
+
+# Version token per object, replaced whenever the object is saved
+representation_versions = TieredCache(
+    'api-representation-version',
+    max_size=settings.API_REPRESENTATION_CACHE_SIZE,
+    ttl=settings.API_REPRESENTATION_CACHE_TTL,
+)
+
+
+def get_representation_version(instance):
+    """Return a token that changes every time ``instance`` is saved. Objects that
+    track ``date_modified`` also include it, so that writes that bypass the save
+    signal still produce a new version.
+    """
+    key = (instance._name, instance._primary_key)
+    token = representation_versions.get(key)
+    if token is None:
+        token = uuid.uuid4().hex
+        representation_versions.set(key, token)
+    date_modified = getattr(instance, 'date_modified', None)
+    if date_modified is not None:
+        return '{}-{}'.format(token, date_modified.isoformat())
+    return token
+
+
+def invalidate_representation(instance):
+    """Drop every cached representation of ``instance``."""
+    representation_versions.delete((instance._name, instance._primary_key))
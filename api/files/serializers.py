@@ -8,7 +8,7 @@ from modularodm import Q
 from framework.auth.core import Auth, User
 from website import settings
 
-from website.files.models import FileNode
+from website.files.models import File, FileNode
 from website.project.model import Comment
 from website.util import api_v2_url
 
@@ -196,6 +196,19 @@ class FileSerializer(JSONAPISerializer):
 
         return creat_dt and creat_dt.replace(tzinfo=pytz.utc)
 
+    # overrides JSONAPISerializer
+    def prefetch_page(self, items):
+        self.download_counts = File.get_download_counts([
+            obj for obj in items
+            if obj.provider == 'osfstorage' and obj.is_file
+        ])
+
+    def get_download_count(self, obj):
+        download_counts = getattr(self, 'download_counts', None) or {}
+        if obj._id in download_counts:
+            return download_counts[obj._id]
+        return obj.get_download_count()
+
     def get_extra(self, obj):
         metadata = {}
         if obj.provider == 'osfstorage' and obj.versions:
@@ -208,6 +221,8 @@ class FileSerializer(JSONAPISerializer):
             'md5': metadata.get('md5', None),
             'sha256': metadata.get('sha256', None),
         }
+        if obj.provider == 'osfstorage' and obj.is_file:
+            extras['downloads'] = self.get_download_count(obj)
         return extras
 
     def get_current_user_can_comment(self, obj):
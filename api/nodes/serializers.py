@@ -86,6 +86,8 @@ class NodeSerializer(JSONAPISerializer):
         'wikis'
     ]
 
+    cache_representation = True
+
     id = IDField(source='_id', read_only=True)
     type = TypeField()
 
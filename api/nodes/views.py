@@ -65,7 +65,7 @@ from website.addons.wiki.model import NodeWikiPage
 from website.exceptions import NodeStateError
 from website.util.permissions import ADMIN
 from website.models import Node, Pointer, Comment, NodeLog, Institution, DraftRegistration
-from website.files.models import FileNode
+from website.files.models import FileNode, StoredFileNode
 from framework.auth.core import User
 from api.base.utils import default_node_list_query, default_node_permission_query
 
@@ -93,6 +93,12 @@ class NodeMixin(object):
             self.check_object_permissions(self.request, node)
         return node
 
+    @classmethod
+    def prefetch_nodes(cls, kwargs_list):
+        """Load the nodes named by each of ``kwargs_list`` with a single query."""
+        node_ids = list({kwargs[cls.node_lookup_url_kwarg] for kwargs in kwargs_list})
+        return list(Node.find(Q('_id', 'in', node_ids)))
+
 
 class DraftMixin(object):
 
@@ -245,6 +251,7 @@ class NodeList(JSONAPIBaseView, bulk_views.BulkUpdateJSONAPIView, bulk_views.Bul
     #This Request/Response
 
     """
+    supports_cursor_pagination = True
     permission_classes = (
         drf_permissions.IsAuthenticatedOrReadOnly,
         base_permissions.TokenHasScope,
@@ -505,6 +512,11 @@ class NodeDetail(JSONAPIBaseView, generics.RetrieveUpdateDestroyAPIView, NodeMix
     view_category = 'nodes'
     view_name = 'node-detail'
 
+    # overrides JSONAPIBaseView
+    @classmethod
+    def prefetch_embeds(cls, request, kwargs_list):
+        cls.prefetch_nodes(kwargs_list)
+
     # overrides RetrieveUpdateDestroyAPIView
     def get_object(self):
         return self.get_node()
@@ -620,6 +632,13 @@ class NodeContributorsList(JSONAPIBaseView, bulk_views.BulkUpdateJSONAPIView, bu
     view_name = 'node-contributors'
     ordering = ('index',)  # default ordering
 
+    # overrides JSONAPIBaseView
+    @classmethod
+    def prefetch_embeds(cls, request, kwargs_list):
+        nodes = cls.prefetch_nodes(kwargs_list)
+        user_ids = list({user_id for node in nodes for user_id in node.contributors._to_data()})
+        list(User.find(Q('_id', 'in', user_ids)))
+
     def get_default_queryset(self):
         node = self.get_node()
         visible_contributors = set(node.visible_contributor_ids)
@@ -1796,6 +1815,11 @@ class NodeFilesList(JSONAPIBaseView, generics.ListAPIView, WaterButlerMixin, Lis
 
     view_category = 'nodes'
     view_name = 'node-files'
+    model_class = StoredFileNode
+
+    # Fields stored on StoredFileNode with the same value the serializer exposes;
+    # e.g. osfstorage computes `path` and `materialized_path` instead.
+    STORED_FILTER_FIELDS = frozenset(['_id', 'name', 'node', 'provider', 'last_touched'])
 
     def get_default_queryset(self):
         # Don't bother going to waterbutler for osfstorage
@@ -1810,6 +1834,23 @@ class NodeFilesList(JSONAPIBaseView, generics.ListAPIView, WaterButlerMixin, Lis
 
         return list(files_list.children)
 
+    # overrides ListFilterMixin
+    def get_default_odm_query(self):
+        if self.kwargs[self.provider_lookup_url_kwarg] != 'osfstorage':
+            return None
+        folder = self.fetch_from_waterbutler()
+        if folder.is_file:
+            raise NotFound
+        return Q('parent', 'eq', folder._id)
+
+    # overrides ListFilterMixin
+    def get_odm_queryset(self, query):
+        return FileNode.find(query)
+
+    # overrides ListFilterMixin
+    def is_stored_field(self, field, source_field_name):
+        return source_field_name in self.STORED_FILTER_FIELDS
+
     # overrides ListAPIView
     def get_queryset(self):
         return self.get_queryset_from_request()
@@ -2444,6 +2485,7 @@ class NodeLogList(JSONAPIBaseView, generics.ListAPIView, NodeMixin, ODMFilterMix
 
     ordering = ('-date', )
 
+    supports_cursor_pagination = True
     permission_classes = (
         drf_permissions.IsAuthenticatedOrReadOnly,
         ContributorOrPublic,
@@ -20,6 +20,10 @@ from api.base.serializers import (IDField, RelationshipField, LinksField, HideIf
 
 class BaseRegistrationSerializer(NodeSerializer):
 
+    # Withdrawal and embargo fields come from sanctions, which change without
+    # saving the registration
+    cache_representation = False
+
     title = ser.CharField(read_only=True)
     description = ser.CharField(read_only=True)
     category_choices = NodeSerializer.category_choices
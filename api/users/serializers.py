@@ -22,6 +22,7 @@ class UserSerializer(JSONAPISerializer):
         'id'
     ])
     non_anonymized_fields = ['type']
+    cache_representation = True
     id = IDField(source='_id', read_only=True)
     type = TypeField()
     full_name = ser.CharField(source='fullname', required=True, label='Full name', help_text='Display name used in the general user interface')
@@ -95,6 +96,13 @@ class UserSerializer(JSONAPISerializer):
     def get_absolute_url(self, obj):
         return absolute_reverse('users:user-detail', kwargs={'user_id': obj._id})
 
+    # overrides JSONAPISerializer
+    def get_representation_cache_key(self, obj, is_anonymous):
+        key = super(UserSerializer, self).get_representation_cache_key(obj, is_anonymous)
+        if key is None:
+            return None
+        return key + (self.context['request'].query_params.get('profile_image_size'), )
+
     def profile_image_url(self, user):
         size = self.context['request'].query_params.get('profile_image_size')
         return user.profile_image_url(size=size)
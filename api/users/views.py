@@ -101,6 +101,7 @@ class UserList(JSONAPIBaseView, generics.ListCreateAPIView, ODMFilterMixin):
     #This Request/Response
 
     """
+    supports_cursor_pagination = True
     permission_classes = (
         drf_permissions.IsAuthenticatedOrReadOnly,
         base_permissions.RequiresScopedRequestOrReadOnly,
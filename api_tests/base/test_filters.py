@@ -5,7 +5,9 @@ from dateutil import parser
 
 import json
 
+import mock
 from nose.tools import *  # flake8: noqa
+from modularodm import Q
 
 from rest_framework import serializers as ser
 
@@ -117,6 +119,48 @@ class TestFilterMixin(ApiTestCase):
         assert_in('bool_field', fields)
         assert_equal(fields['bool_field'][0]['value'], False)
 
+    def test_param_queryset_preserves_order(self):
+        query_params = {
+            'filter[bool_field]': 'true',
+            'filter[int_field]': '42',
+        }
+        default_queryset = [
+            FakeRecord(_id=3, foobar=True),
+            FakeRecord(_id=1, foobar=False),
+            FakeRecord(_id=2, foobar=True),
+            FakeRecord(_id=4, foobar=True, int_field=7),
+        ]
+        filtered = self.view.param_queryset(query_params, default_queryset)
+        assert_equal([record._id for record in filtered], [3, 2])
+
+    def test_param_queryset_without_filters_returns_default_queryset(self):
+        default_queryset = [FakeRecord(_id=2), FakeRecord(_id=1)]
+        filtered = self.view.param_queryset({'page': '2'}, default_queryset)
+        assert_is(filtered, default_queryset)
+
+    def test_odm_param_queryset_compiles_stored_fields(self):
+        class FakeModel(object):
+            _fields = {'string_field': None}
+            find = mock.Mock(return_value=[
+                FakeRecord(_id=1, foobar=True),
+                FakeRecord(_id=2, foobar=False),
+            ])
+
+        self.view.model_class = FakeModel
+        query_params = {
+            'filter[string_field]': 'foo',
+            'filter[bool_field]': 'true',
+        }
+        default_query = Q('node', 'eq', 'abcde')
+        filtered = self.view.odm_param_queryset(query_params, default_query)
+        query = FakeModel.find.call_args[0][0]
+        assert_equal(
+            [(q.attribute, q.operator, q.argument) for q in query.nodes],
+            [('node', 'eq', 'abcde'), ('string_field', 'icontains', 'foo')]
+        )
+        # bool_field has no stored field on the model, so it is applied in memory
+        assert_equal([record._id for record in filtered], [1])
+
     def test_parse_query_params_uses_field_source_attribute(self):
         query_params = {
             'filter[bool_field]': 'false',
@@ -113,6 +113,51 @@ class TestNullLinks(ApiTestCase):
 
 
 
+class TestRepresentationCache(ApiTestCase):
+
+    def setUp(self):
+        super(TestRepresentationCache, self).setUp()
+        self.user = factories.AuthUserFactory()
+        self.node = factories.ProjectFactory(is_public=True, creator=self.user)
+        self.url = '/{}nodes/{}/'.format(API_BASE, self.node._id)
+
+    def test_anonymous_representation_is_reused(self):
+        res = self.app.get(self.url)
+        with mock.patch.object(base_serializers.representation_cache, 'set') as mock_set:
+            res2 = self.app.get(self.url)
+        assert_false(mock_set.called)
+        assert_equal(res.json, res2.json)
+
+    def test_save_invalidates_representation(self):
+        self.app.get(self.url)
+        self.node.title = 'A new title'
+        self.node.save()
+        res = self.app.get(self.url)
+        assert_equal(res.json['data']['attributes']['title'], 'A new title')
+
+    def test_authenticated_representation_is_not_cached(self):
+        with mock.patch.object(base_serializers.representation_cache, 'set') as mock_set:
+            res = self.app.get(self.url, auth=self.user.auth)
+        assert_false(mock_set.called)
+        assert_equal(res.json['data']['attributes']['current_user_permissions'], ['read', 'write', 'admin'])
+
+    def test_embeds_are_rendered_on_cached_representation(self):
+        self.app.get(self.url)
+        res = self.app.get(self.url, params={'embed': 'contributors'})
+        assert_in('contributors', res.json['data']['relationships'])
+        contributor_ids = [each['id'] for each in res.json['data']['embeds']['contributors']['data']]
+        assert_equal(contributor_ids, ['{}-{}'.format(self.node._id, self.user._id)])
+
+    def test_withdrawal_is_seen_by_anonymous_users(self):
+        registration = factories.RegistrationFactory(project=self.node, is_public=True)
+        url = '/{}registrations/{}/'.format(API_BASE, registration._id)
+        res = self.app.get(url)
+        assert_false(res.json['data']['attributes']['withdrawn'])
+        factories.WithdrawnRegistrationFactory(registration=registration, user=self.user)
+        res = self.app.get(url)
+        assert_true(res.json['data']['attributes']['withdrawn'])
+
+
 class TestApiBaseSerializers(ApiTestCase):
 
     def setUp(self):
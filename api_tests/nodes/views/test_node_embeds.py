@@ -1,9 +1,12 @@
 from nose.tools import *  # flake8: noqa
 import functools
 
+import mock
+
 from framework.auth.core import Auth
 
 from api.base.settings.defaults import API_BASE
+from api.nodes.views import NodeContributorsList
 from tests.base import ApiTestCase
 from tests.factories import (
     ProjectFactory,
@@ -87,3 +90,31 @@ class TestNodeEmbeds(ApiTestCase):
         assert_equal(res.status_code, 400)
         assert_equal(res.json['errors'][0]['detail'], "The following fields are not embeddable: title")
 
+
+    def test_embed_contributors_on_list_prefetched_once_per_page(self):
+        url = '/{0}nodes/{1}/children/?embed=contributors'.format(API_BASE, self.root_node._id)
+
+        with mock.patch.object(NodeContributorsList, 'prefetch_embeds') as mock_prefetch:
+            res = self.app.get(url, auth=self.user.auth)
+        assert_equal(mock_prefetch.call_count, 1)
+        kwargs_list = mock_prefetch.call_args[0][1]
+        assert_equal(
+            sorted(kwargs['node_id'] for kwargs in kwargs_list),
+            sorted([self.child1._id, self.child2._id])
+        )
+        assert_equal(len(res.json['data']), 2)
+
+    def test_embed_contributors_on_list(self):
+        url = '/{0}nodes/{1}/children/?embed=contributors'.format(API_BASE, self.root_node._id)
+
+        res = self.app.get(url, auth=self.user.auth)
+        embedded = {
+            node['id']: [contrib['id'] for contrib in node['embeds']['contributors']['data']]
+            for node in res.json['data']
+        }
+        expected = [c._id for c in self.contribs] + [self.user._id]
+        assert_equal(
+            sorted(embedded[self.child1._id]),
+            sorted('{}-{}'.format(self.child1._id, id_) for id_ in expected)
+        )
+        assert_equal(embedded[self.child2._id], ['{}-{}'.format(self.child2._id, self.user._id)])
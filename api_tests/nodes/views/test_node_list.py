@@ -8,6 +8,7 @@ from website.models import Node, NodeLog
 from website.util import permissions
 from website.util.sanitize import strip_html
 
+from api.base.pagination import JSONAPIPagination
 from api.base.settings.defaults import API_BASE, MAX_PAGE_SIZE
 
 from tests.base import ApiTestCase
@@ -1842,3 +1843,63 @@ class TestNodeListPagination(ApiTestCase):
 
         assert_not_in('{}-{}'.format(res.json['data'][0]['id'], self.users[10]._id), uids)
         assert_equal(res.json['data'][0]['embeds']['contributors']['links']['meta']['per_page'], 10)
+
+    def test_cursor_pagination_walks_every_node_once(self):
+        url = '{}?page[cursor]=&page[size]=4'.format(self.url)
+        pids = []
+        pages = 0
+        while url:
+            res = self.app.get(url, auth=Auth(self.users[0]))
+            pids.extend(e['id'] for e in res.json['data'])
+            assert_is_none(res.json['links']['last'])
+            assert_not_in('total', res.json['links']['meta'])
+            url = res.json['links']['next']
+            pages += 1
+        assert_equal(pages, 3)
+        # Newest first, ties broken by ascending _id
+        expected = sorted(self.projects, key=lambda project: project._id)
+        expected = sorted(expected, key=lambda project: project.date_modified, reverse=True)
+        assert_equal(pids, [project._id for project in expected])
+
+    def test_cursor_pagination_prev_link(self):
+        res = self.app.get('{}?page[cursor]=&page[size]=4'.format(self.url), auth=Auth(self.users[0]))
+        first_page = [e['id'] for e in res.json['data']]
+        assert_is_none(res.json['links']['prev'])
+
+        res = self.app.get(res.json['links']['next'], auth=Auth(self.users[0]))
+        res = self.app.get(res.json['links']['prev'], auth=Auth(self.users[0]))
+        assert_equal([e['id'] for e in res.json['data']], first_page)
+
+    def test_cursor_pagination_total_when_requested(self):
+        url = '{}?page[cursor]=&page[total]=true'.format(self.url)
+        res = self.app.get(url, auth=Auth(self.users[0]))
+        assert_equal(res.json['links']['meta']['total'], 11)
+
+    def test_cursor_pagination_invalid_cursor(self):
+        url = '{}?page[cursor]=notacursor'.format(self.url)
+        res = self.app.get(url, auth=Auth(self.users[0]), expect_errors=True)
+        assert_equal(res.status_code, 400)
+
+    def test_cursor_ignored_by_views_without_cursor_support(self):
+        project = self.projects[0]
+        for _ in range(2):
+            ProjectFactory(parent=project, creator=self.users[0])
+        url = '/{}nodes/{}/children/?page[cursor]='.format(API_BASE, project._id)
+        res = self.app.get(url, auth=Auth(self.users[0]))
+        assert_equal(len(res.json['data']), 2)
+        assert_equal(res.json['links']['meta']['total'], 2)
+
+    def test_cursor_seek_query_handles_null_sort_keys(self):
+        empty, described = self.projects[:2]
+        empty.description = None
+        empty.save()
+        described.description = 'Soul Man'
+        described.save()
+        paginator = JSONAPIPagination()
+        both = Q('_id', 'in', [empty._id, described._id])
+
+        after_null = Node.find(paginator.get_seek_query('description', 'gt', None) & both)
+        assert_equal([node._id for node in after_null], [described._id])
+        before_value = Node.find(paginator.get_seek_query('description', 'lt', 'Soul Man') & both)
+        assert_equal([node._id for node in before_value], [empty._id])
+        assert_is_none(paginator.get_seek_query('description', 'lt', None))
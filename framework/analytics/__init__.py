@@ -1,7 +1,14 @@
 #!/usr/bin/env python
 # encoding: utf-8
 
+import atexit
+import base64
+import collections
 import functools
+import hashlib
+import logging
+import struct
+import threading
 from datetime import datetime
 
 from dateutil import parser
@@ -10,9 +17,12 @@ from framework.mongo import database
 from framework.postcommit_tasks.handlers import run_postcommit
 from framework.sessions import session
 from framework.celery_tasks import app
+from website import settings
 
 from flask import request
 
+logger = logging.getLogger(__name__)
+
 collection = database['pagecounters']
 
 @run_postcommit(once_per_request=False, celery=True)
@@ -75,49 +85,177 @@ def build_page(rex, kwargs):
     except KeyError:
         return None
 
+class VisitFilter(object):
+    """Bloom filter of the pages a session has visited, used in place of the
+    list of pages once the session has visited many. Takes a fixed amount of
+    session storage however many pages are visited, at the cost of occasionally
+    treating a first visit as a repeat one.
+
+    :param int size: Number of bits in the filter
+    :param str data: Serialized filter, as returned by :meth:`serialize`
+    """
+
+    HASHES = 4
+
+    def __init__(self, size, data=None):
+        self.size = size
+        self.bits = bytearray(base64.b64decode(data)) if data else bytearray(size // 8)
+        if len(self.bits) != size // 8:
+            self.bits = bytearray(size // 8)
+
+    def _positions(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        digest = hashlib.md5(key).digest()
+        return [each % self.size for each in struct.unpack('<4I', digest)[:self.HASHES]]
+
+    def __contains__(self, key):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(key))
+
+    def add(self, key):
+        """Add ``key`` to the filter. Return whether it was not already present."""
+        added = False
+        for pos in self._positions(key):
+            if not self.bits[pos // 8] & (1 << (pos % 8)):
+                self.bits[pos // 8] |= 1 << (pos % 8)
+                added = True
+        return added
+
+    def serialize(self):
+        return base64.b64encode(bytes(self.bits))
+
+
+class CounterBuffer(object):
+    """Aggregates `$inc` updates to `pagecounters` in memory. A background
+    thread (a greenlet under gevent) writes them out one upsert per page every
+    ``interval`` seconds, or as soon as ``threshold`` pages are pending, so
+    requests never wait on the writes. The thread gets its own client from the
+    pool, so the writes are not part of any request's transaction.
+    """
+
+    def __init__(self, db, interval, threshold):
+        self.db = db
+        self.interval = interval
+        self.threshold = threshold
+        self.pending = collections.defaultdict(collections.Counter)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+
+    def add(self, page, increments):
+        with self._lock:
+            self.pending[page].update(increments)
+            full = len(self.pending) >= self.threshold
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='page-counter-flusher')
+                self._flusher.daemon = True
+                self._flusher.start()
+        if full:
+            self._wake.set()
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as error:
+                logger.error('Failed to flush page counters: {}'.format(error))
+
+    def get_pending(self, page):
+        with self._lock:
+            return dict(self.pending.get(page, {}))
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, collections.defaultdict(collections.Counter)
+        collection = self.db['pagecounters']
+        for page, increments in pending.items():
+            try:
+                collection.update({'_id': page}, {'$inc': dict(increments)}, True, False)
+            except Exception as error:
+                logger.error('Failed to flush page counters for {}: {}'.format(page, error))
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_counter_buffer(db=None):
+    db = db or database
+    with _buffers_lock:
+        if db.name not in _buffers:
+            _buffers[db.name] = CounterBuffer(
+                db,
+                interval=settings.PAGE_COUNTER_FLUSH_INTERVAL,
+                threshold=settings.PAGE_COUNTER_FLUSH_THRESHOLD,
+            )
+        return _buffers[db.name]
+
+
+@atexit.register
+def flush_counters():
+    """Write out every buffered page counter."""
+    for counter_buffer in _buffers.values():
+        counter_buffer.flush()
+
+
+def record_visit(visits, page, size):
+    """Add ``page`` to the pages a session has visited, as stored in the
+    session: a list of pages, or once it grows past ``VISIT_LIST_MAX_SIZE``
+    pages, a :class:`VisitFilter` of ``size`` bits serialized in its place.
+
+    :return: Tuple of whether this is the first visit to ``page`` and the
+        visited pages to store
+    """
+    if visits is None or isinstance(visits, list):
+        visits = visits or []
+        if page in visits:
+            return False, visits
+        visits.append(page)
+        if len(visits) <= settings.VISIT_LIST_MAX_SIZE:
+            return True, visits
+        visit_filter = VisitFilter(size)
+        for each in visits:
+            visit_filter.add(each)
+        return True, visit_filter.serialize()
+    visit_filter = VisitFilter(size, visits)
+    first_visit = visit_filter.add(page)
+    return first_visit, visit_filter.serialize()
+
+
 def update_counter(page, db=None):
     """Update counters for page.
 
     :param str page: Colon-delimited page key in analytics collection
     :param db: MongoDB database or `None`
     """
-    db = db or database
-    collection = db['pagecounters']
-
     date = datetime.utcnow()
     date = date.strftime('%Y/%m/%d')
 
     page = clean_page(page)
 
-    d = {'$inc': {}}
+    increments = {}
 
     visited_by_date = session.data.get('visited_by_date')
-    if not visited_by_date:
-        visited_by_date = {'date': date, 'pages': []}
-
-    if date == visited_by_date['date']:
-        if page not in visited_by_date['pages']:
-            d['$inc']['date.%s.unique' % date] = 1
-            visited_by_date['pages'].append(page)
-            session.data['visited_by_date'] = visited_by_date
-    else:
-        visited_by_date['date'] = date
-        visited_by_date['pages'] = []
-        d['$inc']['date.%s.unique' % date] = 1
-        visited_by_date['pages'].append(page)
-        session.data['visited_by_date'] = visited_by_date
+    if not visited_by_date or visited_by_date.get('date') != date:
+        visited_by_date = {'date': date}
+    visits = visited_by_date.pop('pages', None)
+    visits = visited_by_date.pop('filter', visits)
+    first_visit, visits = record_visit(visits, page, settings.DAILY_VISIT_FILTER_SIZE)
+    if first_visit:
+        increments['date.%s.unique' % date] = 1
+    visited_by_date['pages' if isinstance(visits, list) else 'filter'] = visits
+    session.data['visited_by_date'] = visited_by_date
 
-    d['$inc']['date.%s.total' % date] = 1
+    increments['date.%s.total' % date] = 1
 
-    visited = session.data.get('visited')  # '/project/x/, project/y/'
-    if not visited:
-        visited = []
-    if page not in visited:
-        d['$inc']['unique'] = 1
-        visited.append(page)
-        session.data['visited'] = visited
-    d['$inc']['total'] = 1
-    collection.update({'_id': page}, d, True, False)
+    first_visit, session.data['visited'] = record_visit(
+        session.data.get('visited'), page, settings.VISIT_FILTER_SIZE
+    )
+    if first_visit:
+        increments['unique'] = 1
+    increments['total'] = 1
+    get_counter_buffer(db).add(page, increments)
 
 
 def update_counters(rex, db=None):
@@ -141,19 +279,53 @@ def update_counters(rex, db=None):
 
 def get_basic_counters(page, db=None):
     db = db or database
-    collection = db['pagecounters']
     unique = 0
     total = 0
     collection = database['pagecounters']
+    page = clean_page(page)
     result = collection.find_one(
-        {'_id': clean_page(page)},
+        {'_id': page},
         {'total': 1, 'unique': 1}
     )
-    if result:
-        if 'unique' in result:
-            unique = result['unique']
-        if 'total' in result:
-            total = result['total']
+    # Include increments this process has not written out yet
+    pending = get_counter_buffer(db).get_pending(page)
+    if result or pending:
+        result = result or {}
+        unique = result.get('unique', 0) + pending.get('unique', 0)
+        total = result.get('total', 0) + pending.get('total', 0)
         return unique, total
     else:
         return None, None
+
+
+def get_basic_counters_many(pages, db=None):
+    """Like :func:`get_basic_counters`, for many pages with a single query.
+
+    :param list pages: Page keys in analytics collection
+    :return dict: Map of each page to its `(unique, total)` counts
+    """
+    if not pages:
+        return {}
+    db = db or database
+    counter_buffer = get_counter_buffer(db)
+    cleaned = {page: clean_page(page) for page in pages}
+    results = {
+        result['_id']: result
+        for result in database['pagecounters'].find(
+            {'_id': {'$in': list(set(cleaned.values()))}},
+            {'total': 1, 'unique': 1}
+        )
+    }
+    counters = {}
+    for page, key in cleaned.items():
+        result = results.get(key)
+        pending = counter_buffer.get_pending(key)
+        if result or pending:
+            result = result or {}
+            counters[page] = (
+                result.get('unique', 0) + pending.get('unique', 0),
+                result.get('total', 0) + pending.get('total', 0),
+            )
+        else:
+            counters[page] = (None, None)
+    return counters
@@ -1,15 +1,18 @@
 # -*- coding: utf-8 -*-
 
 import furl
+import hashlib
 import httplib as http
 import json
 import urllib
+import uuid
 
 from lxml import etree
 import requests
 
 from framework.auth import User
 from framework.auth import authenticate
+from framework.caching import TieredCache
 from framework.flask import redirect
 from framework.exceptions import HTTPError
 from website import settings
@@ -53,6 +56,35 @@ class CasResponse(object):
         self.attributes = attributes or {}
 
 
+# Successful access token lookups, keyed by the token generation and a hash of the token
+token_cache = TieredCache(
+    'cas-token',
+    max_size=settings.CAS_TOKEN_CACHE_SIZE,
+    ttl=settings.CAS_TOKEN_CACHE_TTL,
+)
+
+# Replaced on every revocation so that no process keeps using a revoked token
+# from its in-process tier. Only kept in the shared tier.
+token_generation = TieredCache('cas-token-generation', local=False)
+
+
+def get_token_cache_key(access_token):
+    generation = token_generation.get('current', '') if token_generation.enabled else ''
+    return (generation, hashlib.sha256(access_token).hexdigest())
+
+
+def evict_tokens(access_token=None):
+    """Forget cached lookups of ``access_token``, or of every token when it is
+    ``None``.
+    """
+    if access_token is not None:
+        token_cache.delete(get_token_cache_key(access_token))
+    else:
+        token_cache.clear()
+    if token_generation.enabled:
+        token_generation.set('current', uuid.uuid4().hex)
+
+
 class CasClient(object):
     """HTTP client for the CAS server."""
 
@@ -124,6 +156,29 @@ class CasClient(object):
         else:
             self._handle_error(resp)
 
+    def cached_profile(self, access_token):
+        """
+        Same as `profile`, but reuses the result of earlier lookups of the same token
+        for `CAS_TOKEN_CACHE_TTL` seconds. Only tokens CAS authenticated are cached.
+
+        :param str access_token: CAS access_token.
+        :rtype: CasResponse
+        :raises: CasError if an unexpected response is returned.
+        """
+        key = get_token_cache_key(access_token)
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, attributes = cached
+            attributes = dict(attributes, accessToken=access_token)
+            return CasResponse(authenticated=True, user=user, attributes=attributes)
+
+        resp = self.profile(access_token)
+        if resp.authenticated:
+            attributes = dict(resp.attributes)
+            attributes.pop('accessToken', None)
+            token_cache.set(key, (resp.user, attributes))
+        return resp
+
     def _handle_error(self, response, message='Unexpected response from CAS server'):
         """Handle an error response from CAS."""
         raise CasHTTPError(
@@ -167,6 +222,8 @@ class CasClient(object):
         """Revoke a tokens based on payload"""
         url = self.get_auth_token_revocation_url()
 
+        # Evict before asking CAS, so a failed revocation can't leave a revoked token cached
+        evict_tokens(payload.get('token'))
         resp = requests.post(url, data=payload)
         if resp.status_code == 204:
             return True
@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 import datetime as dt
-import itertools
+import hashlib
+import hmac
 import logging
 import re
 import urlparse
 from copy import deepcopy
 
-import bson
 import pytz
 import itsdangerous
 
@@ -20,7 +20,8 @@ from framework.addons import AddonModelMixin
 from framework.auth import signals, utils
 from framework.auth.exceptions import (ChangePasswordError, ExpiredTokenError, InvalidTokenError,
                                        MergeConfirmedRequiredError, MergeConflictError)
-from framework.bcrypt import generate_password_hash, check_password_hash
+from framework.bcrypt import generate_password_hash, check_password_hash, constant_time_compare
+from framework.caching import LRUCache
 from framework.exceptions import PermissionsError
 from framework.guid.model import GuidStoredObject
 from framework.mongo.validators import string_required
@@ -41,6 +42,13 @@ name_formatters = {
 
 logger = logging.getLogger(__name__)
 
+# Digest of the last password each user was verified with, so that clients sending
+# credentials with every request (HTTP Basic auth) don't pay for bcrypt every time
+verified_passwords = LRUCache(
+    max_size=settings.PASSWORD_VERIFICATION_CACHE_SIZE,
+    ttl=settings.PASSWORD_VERIFICATION_CACHE_TTL,
+)
+
 
 # Hide implementation of token generation
 def generate_confirm_token():
@@ -677,6 +685,7 @@ class User(GuidStoredObject, AddonModelMixin):
         """
         had_existing_password = bool(self.password)
         self.password = generate_password_hash(raw_password)
+        verified_passwords.delete(self._id)
         if self.username == raw_password:
             raise ChangePasswordError(['Password cannot be the same as your email address'])
         if had_existing_password and notify:
@@ -689,10 +698,27 @@ class User(GuidStoredObject, AddonModelMixin):
             remove_sessions_for_user(self)
 
     def check_password(self, raw_password):
-        """Return a boolean of whether ``raw_password`` was correct."""
+        """Return a boolean of whether ``raw_password`` was correct.
+        Successful checks are remembered for ``PASSWORD_VERIFICATION_CACHE_TTL`` seconds.
+        """
         if not self.password or not raw_password:
             return False
-        return check_password_hash(self.password, raw_password)
+        digest = self._get_password_digest(raw_password)
+        verified = verified_passwords.get(self._id)
+        if verified is not None and constant_time_compare(verified, digest):
+            return True
+        if not check_password_hash(self.password, raw_password):
+            return False
+        if self._id:
+            verified_passwords.set(self._id, digest)
+        return True
+
+    def _get_password_digest(self, raw_password):
+        """Keyed digest of ``raw_password`` that changes along with the stored
+        password hash, so cached verifications never outlive a password change.
+        """
+        message = u'\0'.join((self.username or '', raw_password, self.password)).encode('utf-8')
+        return hmac.new(settings.SECRET_KEY, message, hashlib.sha256).hexdigest()
 
     @property
     def csl_given_name(self):
@@ -961,7 +987,8 @@ class User(GuidStoredObject, AddonModelMixin):
 
         """
         for node in self.contributed:
-            node.update_search()
+            # Contributors aren't part of file docs
+            node.update_search(update_files=None)
 
     def update_search_nodes_contributors(self):
         """
@@ -1116,6 +1143,7 @@ class User(GuidStoredObject, AddonModelMixin):
             else:
                 raise
         self.is_disabled = True
+        verified_passwords.delete(self._id)
 
     @property
     def is_disabled(self):
@@ -1232,6 +1260,8 @@ class User(GuidStoredObject, AddonModelMixin):
             raise ValueError('Node is already being watched.')
         watch_config.save()
         self.watched.append(watch_config)
+        from website.project import statistics as node_statistics  # Avoid circular import
+        node_statistics.update_node_statistics(watch_config.node, 'watched_count')
         return None
 
     def unwatch(self, watch_config):
@@ -1250,6 +1280,8 @@ class User(GuidStoredObject, AddonModelMixin):
                     each.__class__.remove_one(each)
                     self.watched.remove(each)
                     self.save()
+                from website.project import statistics as node_statistics  # Avoid circular import
+                node_statistics.update_node_statistics(watch_config.node, 'watched_count')
                 return None
         raise ValueError('Node not being watched.')
 
@@ -1258,31 +1290,36 @@ class User(GuidStoredObject, AddonModelMixin):
         watched_node_ids = set([config.node._id for config in self.watched])
         return node._id in watched_node_ids
 
-    def get_recent_log_ids(self, since=None):
-        '''Return a generator of recent logs' ids.
+    def get_recent_log_ids(self, since=None, limit=None):
+        '''Return a generator of recent logs' ids on watched nodes, in reverse
+        chronological order.
+
+        Logs are selected, sorted and limited by the database, using the
+        ``(node, date)`` index on logs to read only the watched nodes' logs in
+        the window, and only their ids are read as the generator is consumed.
 
         :param since: A datetime specifying the oldest time to retrieve logs
-        from. If ``None``, defaults to 60 days before today. Must be a tz-aware
-        datetime because PyMongo's generation times are tz-aware.
+        from. If ``None``, defaults to 60 days before today.
+        :param int limit: Maximum number of ids to return
 
         :rtype: generator of log ids (strings)
         '''
-        log_ids = []
+        # Avoid circular import
+        from website.project.model import NodeLog
         # Default since to 60 days before today if since is None
         # timezone aware utcnow
         utcnow = dt.datetime.utcnow().replace(tzinfo=pytz.utc)
         since_date = since or (utcnow - dt.timedelta(days=60))
-        for config in self.watched:
-            # Extract the timestamps for each log from the log_id (fast!)
-            # The first 4 bytes of Mongo's ObjectId encodes time
-            # This prevents having to load each Log Object and access their
-            # date fields
-            node_log_ids = [log.pk for log in config.node.logs
-                                   if bson.ObjectId(log.pk).generation_time > since_date and
-                                   log.pk not in log_ids]
-            # Log ids in reverse chronological order
-            log_ids = _merge_into_reversed(log_ids, node_log_ids)
-        return (l_id for l_id in log_ids)
+        node_ids = list({config.node._id for config in self.watched if config.node})
+        if not node_ids:
+            return iter([])
+        cursor = NodeLog._storage[0].store.find(
+            {'node': {'$in': node_ids}, 'date': {'$gt': since_date}},
+            {'_id': True},
+        ).sort([('date', -1), ('_id', -1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return (log['_id'] for log in cursor)
 
     def get_daily_digest_log_ids(self):
         '''Return a generator of log ids generated in the past day
@@ -1505,9 +1542,3 @@ class User(GuidStoredObject, AddonModelMixin):
         """
         default_timestamp = dt.datetime(1970, 1, 1, 12, 0, 0)
         return self.comments_viewed_timestamp.get(target_id, default_timestamp)
-
-
-def _merge_into_reversed(*iterables):
-    '''Merge multiple sorted inputs into a single output in reverse order.
-    '''
-    return sorted(itertools.chain(*iterables), reverse=True)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Caches for values that are expensive to recompute.
+
+Three tiers are available:
+
+* :func:`request_cache` returns a dict that lives as long as the current Flask
+  or Django request.
+* :class:`LRUCache` is a bounded, thread-safe in-process cache. Only use it for
+  values whose keys change when the underlying data changes (e.g. keys that
+  include a content hash or modification date), since other processes cannot
+  invalidate it.
+* :class:`SharedCache` talks to a Redis-compatible server shared by every
+  process on the host. It is only enabled when ``settings.SHARED_CACHE_URL`` is
+  set and the ``redis`` package is installed.
+
+:class:`TieredCache` layers an :class:`LRUCache` over a :class:`SharedCache`.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+import cPickle as pickle
+
+from framework.mongo import get_cache_key, dummy_request
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+_request_caches = WeakKeyDictionary()
+
+
+def request_cache(namespace):
+    """Return a dict for ``namespace`` scoped to the current request, or
+    ``None`` when not handling a request.
+    """
+    request = get_cache_key()
+    if request is dummy_request:
+        return None
+    return _request_caches.setdefault(request, {}).setdefault(namespace, {})
+
+
+class LRUCache(object):
+    """Bounded least-recently-used cache with optional per-entry expiry.
+
+    :param int max_size: Maximum number of entries kept
+    :param int ttl: Default number of seconds an entry stays valid; ``None``
+        keeps entries until they are evicted
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                return default
+            if expires is not None and expires < time.time():
+                return default
+            self._data[key] = (value, expires)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SharedCache(object):
+    """Cache stored on a Redis-compatible server. Values are pickled. Any error
+    talking to the server is logged and treated as a cache miss, so callers
+    always fall back to recomputing.
+
+    :param str namespace: Prefix for every key written by this cache
+    :param int ttl: Default number of seconds an entry stays valid
+    """
+
+    _clients = {}
+
+    def __init__(self, namespace, ttl=None, url=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.url = url or settings.SHARED_CACHE_URL
+
+    @classmethod
+    def is_enabled(cls):
+        if not settings.SHARED_CACHE_URL:
+            return False
+        try:
+            import redis  # noqa
+        except ImportError:
+            logger.warning('SHARED_CACHE_URL is set but redis is not installed')
+            return False
+        return True
+
+    @property
+    def client(self):
+        import redis
+        if self.url not in self._clients:
+            self._clients[self.url] = redis.StrictRedis.from_url(self.url, socket_timeout=0.1)
+        return self._clients[self.url]
+
+    def _key(self, key):
+        if isinstance(key, tuple):
+            key = ':'.join(str(part) for part in key)
+        return '{}:{}'.format(self.namespace, key)
+
+    def get(self, key, default=None):
+        try:
+            value = self.client.get(self._key(key))
+        except Exception as error:
+            logger.error('Shared cache get failed: {}'.format(error))
+            return default
+        if value is None:
+            return default
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        try:
+            self.client.set(self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=ttl)
+        except Exception as error:
+            logger.error('Shared cache set failed: {}'.format(error))
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as error:
+            logger.error('Shared cache delete failed: {}'.format(error))
+
+
+class TieredCache(object):
+    """In-process :class:`LRUCache` backed by a :class:`SharedCache` when one is
+    configured. Hits on the shared tier are copied into the local tier.
+
+    :param str namespace: Prefix for keys in the shared tier
+    :param int max_size: Maximum number of entries in the local tier
+    :param int ttl: Default number of seconds an entry stays valid
+    :param bool local: Whether to keep an in-process tier at all; disable it
+        for values that must be invalidated across processes
+    """
+
+    def __init__(self, namespace, max_size=1024, ttl=None, local=True):
+        self.namespace = namespace
+        self.local = LRUCache(max_size=max_size, ttl=ttl) if local else None
+        self.ttl = ttl
+        self._shared = None
+
+    @property
+    def shared(self):
+        if self._shared is None and SharedCache.is_enabled():
+            self._shared = SharedCache(self.namespace, ttl=self.ttl)
+        return self._shared
+
+    @property
+    def enabled(self):
+        return self.local is not None or self.shared is not None
+
+    def get(self, key, default=None):
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                if self.local is not None:
+                    self.local.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value, ttl=None):
+        if self.local is not None:
+            self.local.set(key, value, ttl=ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        if self.local is not None:
+            self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        """Clear the local tier. Shared entries expire on their own."""
+        if self.local is not None:
+            self.local.clear()
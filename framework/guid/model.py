@@ -1,21 +1,145 @@
 # -*- coding: utf-8 -*-
+import logging
 import random
+import time
 
 import pymongo
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from modularodm import fields
 
 from framework.mongo import StoredObject
 
 from modularodm.storage.base import KeyExistsException
 
+from website import settings
+
+logger = logging.getLogger(__name__)
+
 ALPHABET = '23456789abcdefghjkmnpqrstuvwxyz'
 
+# Rounds of candidates a refill draws before giving up on filling the pool
+MAX_REFILL_ROUNDS = 10
+# Seconds between refills requested by this process when the pool runs dry
+REFILL_REQUEST_INTERVAL = 60
+
+_refills_requested = {}
+
+
+def generate_guid_id(length=5):
+    return ''.join(random.sample(ALPHABET, length))
+
+
+def request_refill(length=5):
+    """Ask a worker to refill the pool of ``length``-character GUIDs, at most
+    once every ``REFILL_REQUEST_INTERVAL`` seconds.
+    """
+    if not settings.USE_CELERY:
+        return
+    now = time.time()
+    if now - _refills_requested.get(length, 0) < REFILL_REQUEST_INTERVAL:
+        return
+    _refills_requested[length] = now
+    from framework.guid.tasks import refill_guid_pool
+    refill_guid_pool.delay(length)
+
 
 class BlacklistGuid(StoredObject):
 
     _id = fields.StringField(primary=True)
 
 
+class ReservedGuid(StoredObject):
+    """A GUID set aside for a new object. GUIDs are checked against existing
+    GUIDs and the blacklist in bulk when the pool is refilled, so claiming one
+    takes a single atomic operation.
+    """
+
+    __indices__ = [{
+        'key_or_list': [
+            ('length', pymongo.ASCENDING),
+            ('claim', pymongo.ASCENDING),
+        ]
+    }]
+
+    _id = fields.StringField(primary=True)
+    length = fields.IntegerField()
+    # Set while a batch claim is taking this GUID out of the pool
+    claim = fields.StringField()
+
+    @classmethod
+    def claim_ids(cls, count=1, length=5):
+        """Take up to ``count`` GUIDs of ``length`` characters out of the pool.
+        Fewer are returned if the pool runs dry, in which case a refill is
+        requested.
+
+        :return: list of GUID ids
+        """
+        collection = cls._storage[0].store
+        query = {'length': length, 'claim': None}
+        if count == 1:
+            document = collection.find_and_modify(query, remove=True)
+            claimed = [document['_id']] if document else []
+        else:
+            token = str(ObjectId())
+            while True:
+                wanted = count - collection.find({'claim': token}).count()
+                if wanted <= 0:
+                    break
+                ids = [each['_id'] for each in collection.find(query, {'_id': True}).limit(wanted)]
+                if not ids:
+                    break
+                # Only GUIDs nobody else has marked yet are marked, so a GUID
+                # read by concurrent claims goes to one of them
+                collection.update(
+                    dict(query, _id={'$in': ids}),
+                    {'$set': {'claim': token}},
+                    multi=True,
+                )
+            claimed = [each['_id'] for each in collection.find({'claim': token}, {'_id': True})]
+            collection.remove({'claim': token})
+        if len(claimed) < count:
+            request_refill(length)
+        return claimed
+
+    @classmethod
+    def refill(cls, length=5, size=None):
+        """Top the pool of ``length``-character GUIDs up to ``size``. Each round of
+        candidates is checked against the GUIDs, the blacklist and the pool with
+        one query each.
+
+        :return: Number of GUIDs added to the pool
+        """
+        size = size or settings.GUID_POOL_SIZE
+        collection = cls._storage[0].store
+        query = {'length': length, 'claim': None}
+        initial = collection.find(query).count()
+        for _ in range(MAX_REFILL_ROUNDS):
+            missing = size - collection.find(query).count()
+            if missing <= 0:
+                break
+            candidates = {generate_guid_id(length) for _ in range(missing)}
+            for model in (Guid, BlacklistGuid, cls):
+                candidates.difference_update(
+                    each['_id'] for each in model._storage[0].store.find(
+                        {'_id': {'$in': list(candidates)}}, {'_id': True}
+                    )
+                )
+            if not candidates:
+                continue
+            try:
+                collection.insert(
+                    [{'_id': guid_id, 'length': length, 'claim': None} for guid_id in candidates],
+                    continue_on_error=True,
+                )
+            except DuplicateKeyError:
+                # A concurrent refill reserved some of the same GUIDs
+                pass
+        added = collection.find(query).count() - initial
+        logger.info('Reserved {} GUIDs of length {}'.format(added, length))
+        return added
+
+
 class Guid(StoredObject):
 
     __indices__ = [{
@@ -27,24 +151,37 @@ class Guid(StoredObject):
     referent = fields.AbstractForeignField()
 
     @classmethod
-    def generate(self, referent=None, min_length=5):
-        while True:
-            # Create GUID
-            guid_id = ''.join(random.sample(ALPHABET, min_length))
+    def generate(cls, referent=None, min_length=5):
+        return cls.generate_many([referent], min_length=min_length)[0]
 
-            # Check GUID against blacklist
-            blacklist_guid = BlacklistGuid.load(guid_id)
-            if not blacklist_guid:
+    @classmethod
+    def generate_many(cls, referents, min_length=5):
+        """Create a GUID for each of ``referents``, whose ids are claimed from the
+        pool of reserved GUIDs in one go. A referent that has not been saved yet
+        is pointed to by the id of its GUID, which the caller then assigns as its
+        primary key.
+        """
+        reserved = ReservedGuid.claim_ids(len(referents), length=min_length)
+        guids = []
+        for referent in referents:
+            while True:
+                if reserved:
+                    guid_id = reserved.pop()
+                else:
+                    # The pool is dry; try random GUIDs against the blacklist
+                    guid_id = generate_guid_id(min_length)
+                    if BlacklistGuid.load(guid_id):
+                        continue
+                guid = Guid(_id=guid_id)
+                if referent is not None:
+                    guid.referent = referent if referent._primary_key else (guid_id, referent._name)
                 try:
-                    guid = Guid(_id=guid_id)
                     guid.save()
-                    break
                 except KeyExistsException:
-                    pass
-        if referent:
-            guid.referent = referent
-            guid.save()
-        return guid
+                    continue
+                guids.append(guid)
+                break
+        return guids
 
     def __repr__(self):
         return '<id:{0}, referent:({1}, {2})>'.format(self._id, self.referent._primary_key, self.referent._name)
@@ -84,9 +221,7 @@ class GuidStoredObject(StoredObject):
 
         # Else create GUID optimistically
         else:
-            guid = Guid.generate(min_length=self.__guid_min_length__)
-            guid.referent = (guid._primary_key, self._name)
-            guid.save()
+            guid = Guid.generate(referent=self, min_length=self.__guid_min_length__)
             # Set primary key to GUID key
             self._primary_key = guid._primary_key
 
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+from framework.celery_tasks import app
+from framework.guid.model import ReservedGuid
+
+
+@app.task(ignore_result=True)
+def refill_guid_pool(length=5):
+    ReservedGuid.refill(length=length)
@@ -6,8 +6,9 @@ import httplib as http
 import json
 import logging
 import os
+import uuid
 
-from flask import request, make_response
+from flask import request, make_response, has_request_context
 import lxml.html
 from mako.lookup import TemplateLookup
 from mako.template import Template
@@ -16,6 +17,7 @@ from werkzeug.exceptions import NotFound
 import werkzeug.wrappers
 
 from framework import sentry
+from framework.caching import TieredCache, request_cache
 from framework.exceptions import HTTPError
 from framework.flask import app, redirect
 from framework.sessions import session
@@ -53,6 +55,11 @@ _TPL_LOOKUP_SAFE = TemplateLookup(
     module_directory='/tmp/mako_modules',
 )
 
+#: Rendered ``mod-meta`` fragments that opt in with a ``cache`` key, keyed by the
+#: page, the viewer, the fragment and the generations of its cache tags. There is
+#: no in-process tier so that an invalidated fragment is dropped by every process.
+fragment_cache = TieredCache('web-fragments', ttl=settings.WEB_FRAGMENT_CACHE_TTL, local=False)
+
 REDIRECT_CODES = [
     http.MOVED_PERMANENTLY,
     http.FOUND,
@@ -303,6 +310,51 @@ def call_url(url, view_kwargs=None):
 
     return rv
 
+def get_fragment_generation(tag):
+    """Return a token identifying the current state of the fragments tagged with
+    `tag`. The token is replaced by `invalidate_fragments`.
+    """
+    generations = request_cache('fragment-generations')
+    if generations is not None and tag in generations:
+        return generations[tag]
+    generation = fragment_cache.get(('generation', tag))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        fragment_cache.set(('generation', tag), generation)
+    if generations is not None:
+        generations[tag] = generation
+    return generation
+
+
+def invalidate_fragments(tag):
+    """Drop every cached fragment tagged with `tag`."""
+    fragment_cache.set(('generation', tag), uuid.uuid4().hex)
+    generations = request_cache('fragment-generations')
+    if generations is not None:
+        generations.pop(tag, None)
+
+
+def get_fragment_cache_key(element_meta):
+    """Return the cache key of a ``mod-meta`` fragment, or ``None`` if it does not
+    opt in to caching. Nested templates also see the data of the page they are
+    embedded in, so the key includes the page URL and the viewer.
+    """
+    tags = element_meta.get('cache')
+    if not tags or not has_request_context():
+        return None
+    if not isinstance(tags, list):
+        tags = []
+    return json.dumps([
+        request.full_path,
+        session.data.get('auth_user_id'),
+        element_meta['tpl'],
+        element_meta.get('uri'),
+        element_meta.get('view_kwargs', {}),
+        element_meta.get('kwargs', {}),
+        [get_fragment_generation(tag) for tag in tags],
+    ], sort_keys=True)
+
+
 ### Renderers ###
 
 class Renderer(object):
@@ -493,6 +545,12 @@ class WebRenderer(Renderer):
         view_kwargs = element_meta.get('view_kwargs', {})
         error_msg = element_meta.get('error', None)
 
+        cache_key = get_fragment_cache_key(element_meta)
+        if cache_key is not None:
+            cached = fragment_cache.get(cache_key)
+            if cached is not None:
+                return cached, is_replace
+
         # TODO: Is copy enough? Discuss.
         render_data = copy.copy(data)
         render_data.update(kwargs)
@@ -526,8 +584,19 @@ class WebRenderer(Renderer):
                 repr(error)
             ), is_replace
 
+        if cache_key is not None:
+            fragment_cache.set(cache_key, template_rendered)
         return template_rendered, is_replace
 
+    def render_elements(self, elements, data):
+        """Render embedded templates one after the other. Their views share the
+        request's database connection and transaction, so they are not run
+        concurrently.
+
+        :return: List of 2-tuples, as returned by ``render_element``
+        """
+        return [self.render_element(element, data) for element in elements]
+
     def _render(self, data, template_name=None):
         """Render output of view function to HTML.
 
@@ -557,19 +626,31 @@ class WebRenderer(Renderer):
 
         html = lxml.html.fragment_fromstring(rendered, create_parent='remove')
 
-        for element in html.findall('.//*[@mod-meta]'):
-
-            # Render nested template
-            template_rendered, is_replace = self.render_element(element, data)
+        # Templates embedded in another embed are part of its markup
+        elements = [
+            element for element in html.findall('.//*[@mod-meta]')
+            if not any(ancestor.get('mod-meta') is not None for ancestor in element.iterancestors())
+        ]
+        if not elements:
+            return rendered
 
+        # Render nested templates, then splice them in, in document order
+        pieces = []
+        position = 0
+        for element, (template_rendered, is_replace) in zip(elements, self.render_elements(elements, data)):
             original = lxml.html.tostring(element)
+            start = rendered.find(original, position)
+            if start == -1:
+                continue
             if is_replace:
                 replacement = template_rendered
             else:
-                replacement = original
-                replacement = replacement.replace('><', '>' + template_rendered + '<')
-
-            rendered = rendered.replace(original, replacement)
+                replacement = original.replace('><', '>' + template_rendered + '<')
+            pieces.append(rendered[position:start])
+            pieces.append(replacement)
+            position = start + len(original)
+        pieces.append(rendered[position:])
+        rendered = ''.join(pieces)
 
         ## Parse HTML using html5lib; lxml is too strict and e.g. throws
         ## errors if missing parent container; htmlparser mangles whitespace
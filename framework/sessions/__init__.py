@@ -76,6 +76,23 @@ def prepare_private_key():
         return redirect(new_url, code=http.TEMPORARY_REDIRECT)
 
 
+class BasicAuthSession(object):
+    """Stands in for `Session` on requests authenticated with HTTP Basic auth.
+    Credentials come with every such request, so it is never stored.
+    """
+    _id = None
+
+    def __init__(self):
+        self.data = {}
+
+    @property
+    def is_authenticated(self):
+        return 'auth_user_id' in self.data
+
+    def save(self):
+        pass
+
+
 def get_session():
     user_session = sessions.get(request._get_current_object())
     if not user_session:
@@ -90,7 +107,7 @@ def set_session(session):
 
 def create_session(response, data=None):
     current_session = get_session()
-    if current_session:
+    if current_session and not isinstance(current_session, BasicAuthSession):
         current_session.data.update(data or {})
         current_session.save()
         cookie_value = itsdangerous.Signer(settings.SECRET_KEY).sign(current_session._id)
@@ -131,9 +148,7 @@ def before_request():
             email=request.authorization.username,
             password=request.authorization.password
         )
-        # Create an empty session
-        # TODO: Shoudn't need to create a session for Basic Auth
-        user_session = Session()
+        user_session = BasicAuthSession()
         set_session(user_session)
 
         if user:
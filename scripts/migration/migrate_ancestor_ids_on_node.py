@@ -0,0 +1,60 @@
+"""
+This will add the materialized `ancestor_ids` lineage to all nodes.
+Starting from every top-level node, the lineage of each primary descendant is
+rewritten with `Node.update_descendant_ancestor_ids`, one level at a time.
+"""
+import sys
+import logging
+from modularodm import Q
+from website import models
+from website.app import init_app
+from scripts import utils as script_utils
+from framework.transactions.context import TokuTransaction
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate_tree(node, dry=True):
+    count = 0
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        if not dry:
+            current.update_descendant_ancestor_ids()
+        # Load children after the update so they carry their new lineage
+        children = list(models.Node.find(Q('_id', 'in', current.primary_node_ids)))
+        count += len(children)
+        pending.extend(children)
+    return count
+
+
+def do_migration(dry=True):
+    top_level_nodes = models.Node.find(Q('parent_node', 'eq', None))
+    top_level_count = top_level_nodes.count()
+    logger.info('Migrating {} top-level nodes'.format(top_level_count))
+    for idx, node in enumerate(top_level_nodes, 1):
+        if node.node__parent:
+            # Child of a deleted parent; migrated along with its parent's tree
+            continue
+        with TokuTransaction():
+            if not dry:
+                models.Node._storage[0].store.update(
+                    {'_id': node._id},
+                    {'$set': {'ancestor_ids': []}},
+                )
+            count = migrate_tree(node, dry=dry)
+        logger.info('{}/{}: Set ancestor_ids on {} descendants of node {}'.format(idx, top_level_count, count, node._id))
+        models.Node._clear_caches()
+
+
+def main(dry=True):
+    init_app(set_backends=True, routes=False)  # Sets the storage backends on all models
+    do_migration(dry=dry)
+
+
+if __name__ == '__main__':
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    main(dry=dry)
@@ -0,0 +1,65 @@
+"""
+This will store the `materialized_path` of every osfstorage file and folder, and
+`has_checked_out_descendants` on every osfstorage folder.
+Starting from each osfstorage root folder, every subtree is walked once and
+written with raw updates, so no save hooks (search, logs) are triggered.
+"""
+import sys
+import logging
+from website.files.models import StoredFileNode
+from website.app import init_app
+from scripts import utils as script_utils
+from framework.transactions.context import TokuTransaction
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate_tree(document, materialized_path='/', dry=True):
+    """Store paths and checkout flags on ``document``, a raw osfstorage
+    filenode, and everything below it.
+
+    :return: The number of filenodes updated and whether anything in this
+        subtree, ``document`` included, is checked out
+    """
+    collection = StoredFileNode._storage[0].store
+    count = 1
+    update = {'materialized_path': materialized_path}
+    checked_out_below = False
+    if not document['is_file']:
+        for child in collection.find({'parent': document['_id']}):
+            child_path = materialized_path + child['name'] + ('' if child['is_file'] else '/')
+            child_count, child_checked_out = migrate_tree(child, child_path, dry=dry)
+            count += child_count
+            checked_out_below = checked_out_below or child_checked_out
+        update['has_checked_out_descendants'] = checked_out_below
+    if not dry:
+        collection.update({'_id': document['_id']}, {'$set': update})
+    return count, checked_out_below or bool(document.get('checkout'))
+
+
+def do_migration(dry=True):
+    roots = StoredFileNode._storage[0].store.find({
+        'provider': 'osfstorage',
+        'is_file': False,
+        'parent': None,
+    })
+    root_count = roots.count()
+    logger.info('Migrating {} osfstorage roots'.format(root_count))
+    for idx, root in enumerate(roots, 1):
+        with TokuTransaction():
+            count, _ = migrate_tree(root, dry=dry)
+        logger.info('{}/{}: Stored paths on {} filenodes of node {}'.format(idx, root_count, count, root['node']))
+    StoredFileNode._clear_caches()
+
+
+def main(dry=True):
+    init_app(set_backends=True, routes=False)  # Sets the storage backends on all models
+    do_migration(dry=dry)
+
+
+if __name__ == '__main__':
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    main(dry=dry)
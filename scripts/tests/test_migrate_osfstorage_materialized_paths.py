@@ -0,0 +1,48 @@
+from nose.tools import *  # noqa PEP8 asserts
+
+from scripts.migration.migrate_osfstorage_materialized_paths import migrate_tree
+from tests.base import OsfTestCase
+from tests.factories import AuthUserFactory, ProjectFactory
+from website.files.models import StoredFileNode, OsfStorageFile, OsfStorageFolder
+
+
+class TestMigrateOsfStorageMaterializedPaths(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateOsfStorageMaterializedPaths, self).setUp()
+        self.user = AuthUserFactory()
+        self.project = ProjectFactory(creator=self.user)
+        self.root = self.project.get_addon('osfstorage').get_root()
+        self.folder = self.root.append_folder('Cloud')
+        self.file = self.folder.append_file('Carp')
+        self.file.check_in_or_out(self.user, self.user, save=True)
+        self.empty = self.root.append_folder('Empty')
+
+        # Reset everything to how it was stored before paths were tracked
+        self.collection = StoredFileNode._storage[0].store
+        self.collection.update(
+            {'node': self.project._id},
+            {'$set': {'materialized_path': ''}, '$unset': {'has_checked_out_descendants': True}},
+            multi=True,
+        )
+        StoredFileNode._clear_caches()
+
+    def test_migrate_tree(self):
+        count, checked_out = migrate_tree(self.collection.find_one({'_id': self.root._id}), dry=False)
+        StoredFileNode._clear_caches()
+
+        assert_equal(count, 4)
+        assert_true(checked_out)
+        folder = OsfStorageFolder.load(self.folder._id)
+        assert_equal(folder.stored_object.materialized_path, '/Cloud/')
+        assert_true(folder.has_checked_out_descendants)
+        assert_false(OsfStorageFolder.load(self.empty._id).has_checked_out_descendants)
+        assert_equal(OsfStorageFile.load(self.file._id).stored_object.materialized_path, '/Cloud/Carp')
+
+    def test_migrate_tree_dry(self):
+        migrate_tree(self.collection.find_one({'_id': self.root._id}), dry=True)
+        StoredFileNode._clear_caches()
+
+        folder = OsfStorageFolder.load(self.folder._id)
+        assert_equal(folder.stored_object.materialized_path, '')
+        assert_is_none(folder.has_checked_out_descendants)
@@ -410,10 +410,12 @@ def elasticsearch(ctx):
         print('Your system is not recognized, you will have to start elasticsearch manually')
 
 @task
-def migrate_search(ctx, delete=False, index=settings.ELASTIC_INDEX):
-    """Migrate the search-enabled models."""
+def migrate_search(ctx, delete=False, index=settings.ELASTIC_INDEX, workers=None, restart=False):
+    """Migrate the search-enabled models. An interrupted migration is resumed
+    unless ``restart`` is set.
+    """
     from website.search_migration.migrate import migrate
-    migrate(delete, index=index)
+    migrate(delete, index=index, workers=int(workers) if workers else None, resume=not restart)
 
 
 @task
@@ -25,9 +25,11 @@ from django.test import TestCase as DjangoTestCase
 
 
 from api.base.wsgi import application as api_django_app
+from api.caching.utils import representation_cache, representation_versions
 from admin.base.wsgi import application as admin_django_app
 from framework.mongo import set_up_storage
 from framework.auth import User
+from framework.auth.cas import token_cache
 from framework.auth.core import Auth
 from framework.sessions.model import Session
 from framework.guid.model import Guid
@@ -137,6 +139,10 @@ class DbTestCase(unittest.TestCase):
         cls._original_bcrypt_log_rounds = settings.BCRYPT_LOG_ROUNDS
         settings.BCRYPT_LOG_ROUNDS = 1
 
+        # Tests search right after writing to the index
+        cls._original_elastic_refresh = settings.ELASTIC_REFRESH
+        settings.ELASTIC_REFRESH = True
+
         teardown_database(database=database_proxy._get_current_object())
         # TODO: With `database` as a `LocalProxy`, we should be able to simply
         # this logic
@@ -159,6 +165,7 @@ class DbTestCase(unittest.TestCase):
         settings.PIWIK_HOST = cls._original_piwik_host
         settings.ENABLE_EMAIL_SUBSCRIPTIONS = cls._original_enable_email_subscriptions
         settings.BCRYPT_LOG_ROUNDS = cls._original_bcrypt_log_rounds
+        settings.ELASTIC_REFRESH = cls._original_elastic_refresh
 
 
 class   AppTestCase(unittest.TestCase):
@@ -332,6 +339,10 @@ class ApiTestCase(DbTestCase, ApiAppTestCase, UploadTestCase, MockRequestTestCas
     def setUp(self):
         super(ApiTestCase, self).setUp()
         settings.USE_EMAIL = False
+        # Documents are dropped between tests without save signals firing
+        representation_cache.clear()
+        representation_versions.clear()
+        token_cache.clear()
 
 class ApiAddonTestCase(ApiTestCase):
     """Base `TestCase` for tests that require interaction with addons.
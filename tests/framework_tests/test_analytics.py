@@ -3,8 +3,11 @@
 Unit tests for analytics logic in framework/analytics/__init__.py
 """
 
+import time
 import unittest
 
+import mock
+
 from nose.tools import *  # flake8: noqa  (PEP8 asserts)
 from flask import Flask
 
@@ -75,9 +78,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}'.format(self.node, self.fid)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=self.fid)
 
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
@@ -96,9 +96,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid)
-
-        session.data['visited'].append(page)
         download_file_version_(node=self.node, fid=self.fid, vid=self.vid)
 
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
@@ -116,6 +113,90 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters(page, db=self.db)
         assert_equal(count, (3, 5))
 
+    def test_update_counters_flushed_in_bulk(self):
+        @analytics.update_counters('download:{target_id}:{fid}', db=self.db)
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        page = 'download:{0}:{1}'.format(self.node, self.fid)
+        collection = self.db['pagecounters']
+        with mock.patch.object(analytics.settings, 'PAGE_COUNTER_FLUSH_INTERVAL', 60), \
+                mock.patch.object(analytics.settings, 'PAGE_COUNTER_FLUSH_THRESHOLD', 1000):
+            analytics._buffers.clear()
+            download_file_(node=self.node, fid=self.fid)
+            download_file_(node=self.node, fid=self.fid)
+            assert_is_none(collection.find_one({'_id': page}))
+            assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+
+            analytics.flush_counters()
+            analytics._buffers.clear()
+        result = collection.find_one({'_id': page})
+        assert_equal((result['unique'], result['total']), (1, 2))
+
+    def test_counter_buffer_flushed_in_background(self):
+        page = 'download:{0}:{1}'.format(self.node, self.fid)
+        collection = self.db['pagecounters']
+        counter_buffer = analytics.CounterBuffer(self.db, interval=60, threshold=1)
+        counter_buffer.add(page, {'total': 1})
+        for _ in range(50):
+            result = collection.find_one({'_id': page})
+            if result:
+                break
+            time.sleep(0.1)
+        assert_equal(result['total'], 1)
+        assert_equal(counter_buffer.get_pending(page), {})
+
+    def test_few_visited_pages_stored_in_list(self):
+        @analytics.update_counters('download:{target_id}:{fid}', db=self.db)
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        page = 'download:{0}:{1}'.format(self.node, self.fid)
+        download_file_(node=self.node, fid=self.fid)
+        download_file_(node=self.node, fid=self.fid)
+        assert_equal(session.data['visited'], [page])
+        assert_equal(session.data['visited_by_date']['pages'], [page])
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+
+    def test_many_visited_pages_stored_in_fixed_size_filter(self):
+        @analytics.update_counters('download:{target_id}:{fid}', db=self.db)
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        with mock.patch.object(analytics.settings, 'VISIT_LIST_MAX_SIZE', 5):
+            for fid in range(6):
+                download_file_(node=self.node, fid=fid)
+            assert_false(isinstance(session.data['visited'], list))
+            assert_in('filter', session.data['visited_by_date'])
+            size = len(session.data['visited'])
+            for fid in range(6, 50):
+                download_file_(node=self.node, fid=fid)
+            assert_equal(len(session.data['visited']), size)
+            download_file_(node=self.node, fid=0)
+        page = 'download:{0}:{1}'.format(self.node, 0)
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+
+    def test_legacy_visited_list_is_converted(self):
+        @analytics.update_counters('download:{target_id}:{fid}', db=self.db)
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        page = 'download:{0}:{1}'.format(self.node, self.fid)
+        session.data['visited'] = [page]
+        download_file_(node=self.node, fid=self.fid)
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (0, 1))
+
+    def test_get_basic_counters_many(self):
+        collection = self.db['pagecounters']
+        collection.update({'_id': 'node:abc12'}, {'$inc': {'total': 5, 'unique': 3}}, True, False)
+        collection.update({'_id': 'node:def34'}, {'$inc': {'total': 2, 'unique': 1}}, True, False)
+        counts = analytics.get_basic_counters_many(['node:abc12', 'node:def34', 'node:ghi56'], db=self.db)
+        assert_equal(counts, {
+            'node:abc12': (3, 5),
+            'node:def34': (1, 2),
+            'node:ghi56': (None, None),
+        })
+
     @unittest.skip('Reverted the fix for #2281. Unskip this once we use GUIDs for keys in the download counts collection')
     def test_update_counters_different_files(self):
         # Regression test for https://github.com/CenterForOpenScience/osf.io/issues/2281
@@ -133,9 +214,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, fid2), db=self.db)
         assert_equal(count, (None, None))
 
-        page = 'download:{0}:{1}'.format(self.node, fid1)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=fid1)
         download_file_(node=self.node, fid=fid2)
 
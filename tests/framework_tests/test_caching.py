@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import mock
+from nose.tools import *  # noqa (PEP8 asserts)
+
+from framework.caching import LRUCache, TieredCache, request_cache
+from tests.base import AppTestCase
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_set(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        assert_equal(cache.get('a'), 1)
+        assert_is_none(cache.get('b'))
+        assert_equal(cache.get('b', 'default'), 'default')
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert_equal(cache.get('a'), 1)
+        assert_is_none(cache.get('b'))
+        assert_equal(cache.get('c'), 3)
+        assert_equal(len(cache), 2)
+
+    @mock.patch('framework.caching.time.time')
+    def test_expires_entries(self, mock_time):
+        mock_time.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.set('a', 1)
+        mock_time.return_value = 109
+        assert_equal(cache.get('a'), 1)
+        mock_time.return_value = 111
+        assert_is_none(cache.get('a'))
+
+    def test_delete_and_clear(self):
+        cache = LRUCache()
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.delete('a')
+        assert_not_in('a', cache)
+        cache.clear()
+        assert_equal(len(cache), 0)
+
+
+class TestTieredCache(unittest.TestCase):
+
+    @mock.patch('framework.caching.SharedCache.is_enabled', return_value=False)
+    def test_local_only(self, mock_enabled):
+        cache = TieredCache('test', max_size=10)
+        cache.set('a', 1)
+        assert_equal(cache.get('a'), 1)
+        assert_true(cache.enabled)
+
+    @mock.patch('framework.caching.SharedCache.is_enabled', return_value=False)
+    def test_disabled_without_tiers(self, mock_enabled):
+        cache = TieredCache('test', local=False)
+        cache.set('a', 1)
+        assert_is_none(cache.get('a'))
+        assert_false(cache.enabled)
+
+    @mock.patch('framework.caching.SharedCache.is_enabled', return_value=True)
+    def test_shared_hit_populates_local(self, mock_enabled):
+        cache = TieredCache('test', max_size=10)
+        with mock.patch('framework.caching.SharedCache.get', return_value=42) as mock_get:
+            assert_equal(cache.get('a'), 42)
+            assert_equal(cache.get('a'), 42)
+        assert_equal(mock_get.call_count, 1)
+
+
+class TestRequestCache(AppTestCase):
+
+    def test_scoped_to_request(self):
+        cache = request_cache('test')
+        cache['a'] = 1
+        assert_equal(request_cache('test'), {'a': 1})
+        assert_equal(request_cache('other'), {})
+
+    def test_none_outside_request(self):
+        self.context.pop()
+        try:
+            assert_is_none(request_cache('test'))
+        finally:
+            self.context.push()
@@ -8,13 +8,15 @@ import unittest
 import os
 
 import flask
+import mock
 from lxml.html import fragment_fromstring
 import werkzeug.wrappers
 
+from framework.caching import TieredCache
 from framework.exceptions import HTTPError, http
 from framework.routing import (
     Renderer, JSONRenderer, WebRenderer,
-    render_mako_string,
+    render_mako_string, invalidate_fragments,
 )
 
 from tests.base import AppTestCase, OsfTestCase
@@ -319,6 +321,57 @@ class WebRendererTemplateTestCase(OsfTestCase):
         )
 
 
+    def test_nested_templates_spliced_in_order(self):
+        """Nested templates are each spliced in where their element was."""
+        self.app.app.preprocess_request()
+
+        r = WebRenderer(
+            'nested_parent_many.html',
+            render_mako_string,
+            template_dir=TEMPLATES_PATH,
+        )
+
+        resp = r({})
+
+        first = resp.data.index('<p>child template content</p>')
+        between = resp.data.index('<span>between</span>')
+        second = resp.data.index('><p>child second</p></div>')
+        self.assertTrue(first < between < second)
+        self.assertNotIn('"replace": true', resp.data)
+
+    def _render_cached_child(self, renderer, name):
+        html = fragment_fromstring(
+            ''.join((
+                "<div mod-meta='",
+                '{"tpl":"nested_child_name.html","replace": true,"cache": ["abc12"]}',
+                "'></div>",
+            )),
+            create_parent='remove-me',
+        )
+        return renderer.render_element(
+            html.findall('.//*[@mod-meta]')[0],
+            data={'name': name},
+        )
+
+    @mock.patch('framework.routing.fragment_cache', TieredCache('test-fragments'))
+    def test_fragment_cache(self):
+        """Embeds with a ``cache`` key are rendered once until one of their
+        tags is invalidated.
+        """
+        self.app.app.preprocess_request()
+
+        r = WebRenderer(
+            'nested_child_name.html',
+            render_mako_string,
+            template_dir=TEMPLATES_PATH,
+        )
+
+        self.assertEqual(self._render_cached_child(r, 'first'), ('<p>child first</p>', True))
+        self.assertEqual(self._render_cached_child(r, 'second'), ('<p>child first</p>', True))
+        invalidate_fragments('abc12')
+        self.assertEqual(self._render_cached_child(r, 'second'), ('<p>child second</p>', True))
+
+
 class JSONRendererEncoderTestCase(unittest.TestCase):
 
     def test_encode_custom_class(self):
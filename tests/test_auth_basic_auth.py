@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from website.addons.twofactor.tests import _valid_code
 from website import settings
 
+from framework.sessions.model import Session
 from tests.base import OsfTestCase
 from tests.factories import ProjectFactory, AuthUserFactory, SessionFactory
 
@@ -44,6 +45,13 @@ class TestAuthBasicAuthentication(OsfTestCase):
         res = self.app.get(self.reachable_url, auth=self.user1.auth)
         assert_equal(res.status_code, 200)
 
+    def test_valid_credential_does_not_store_session(self):
+        session_count = Session.find().count()
+        res = self.app.get(self.reachable_url, auth=self.user1.auth)
+        assert_equal(res.status_code, 200)
+        assert_equal(Session.find().count(), session_count)
+        assert_not_in(settings.COOKIE_NAME, res.headers.get('Set-Cookie', ''))
+
     def test_valid_credential_authenticates_but_user_lacks_object_permissions(self):
         res = self.app.get(self.unreachable_url, auth=self.user1.auth, expect_errors=True)
         assert_equal(res.status_code, 403)
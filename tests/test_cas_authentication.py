@@ -67,6 +67,7 @@ class TestCASClient(OsfTestCase):
         OsfTestCase.setUp(self)
         self.base_url = 'http://accounts.test.test'
         self.client = cas.CasClient(self.base_url)
+        cas.token_cache.clear()
 
     @httpretty.activate
     def test_service_validate(self):
@@ -140,6 +141,55 @@ class TestCASClient(OsfTestCase):
         with assert_raises(cas.CasHTTPError):
             res = self.client.revoke_application_tokens(client_id, client_secret)
 
+    @mock.patch('framework.auth.cas.CasClient.profile')
+    def test_cached_profile_reuses_lookup(self, mock_profile):
+        user = UserFactory()
+        token = fake.md5()
+        mock_profile.return_value = cas.CasResponse(
+            authenticated=True, user=user._id,
+            attributes={'accessToken': token, 'accessTokenScope': {'osf.full_read'}}
+        )
+        self.client.cached_profile(token)
+        resp = self.client.cached_profile(token)
+        assert_equal(mock_profile.call_count, 1)
+        assert_true(resp.authenticated)
+        assert_equal(resp.user, user._id)
+        assert_equal(resp.attributes['accessToken'], token)
+        assert_equal(resp.attributes['accessTokenScope'], {'osf.full_read'})
+
+    @mock.patch('framework.auth.cas.CasClient.profile')
+    def test_cached_profile_does_not_cache_failed_lookups(self, mock_profile):
+        mock_profile.return_value = make_failure_response()
+        self.client.cached_profile('invalid-access-token')
+        self.client.cached_profile('invalid-access-token')
+        assert_equal(mock_profile.call_count, 2)
+
+    @httpretty.activate
+    @mock.patch('framework.auth.cas.CasClient.profile')
+    def test_token_revocation_evicts_cached_profile(self, mock_profile):
+        user = UserFactory()
+        token = fake.md5()
+        mock_profile.return_value = make_successful_response(user)
+        httpretty.register_uri(httpretty.POST, self.client.get_auth_token_revocation_url(), status=204)
+
+        self.client.cached_profile(token)
+        self.client.revoke_tokens({'token': token})
+        self.client.cached_profile(token)
+        assert_equal(mock_profile.call_count, 2)
+
+    @httpretty.activate
+    @mock.patch('framework.auth.cas.CasClient.profile')
+    def test_application_token_revocation_evicts_cached_profiles(self, mock_profile):
+        user = UserFactory()
+        token = fake.md5()
+        mock_profile.return_value = make_successful_response(user)
+        httpretty.register_uri(httpretty.POST, self.client.get_auth_token_revocation_url(), status=204)
+
+        self.client.cached_profile(token)
+        self.client.revoke_application_tokens('fake_id', 'fake_secret')
+        self.client.cached_profile(token)
+        assert_equal(mock_profile.call_count, 2)
+
     @unittest.skip('finish me')
     def test_profile_valid_access_token_returns_cas_response(self):
         assert 0
@@ -12,9 +12,12 @@ from framework.auth.core import Auth
 from website import settings
 import website.search.search as search
 from website.search import elastic_search
+from website.search.exceptions import SearchException
 from website.search.util import build_query
+from website.search.indexing import IndexingBatch, batched_updates, indexing_metrics
+from website.search_migration import migrate as search_migration
 from website.search_migration.migrate import migrate
-from website.models import Retraction, NodeLicense, Tag
+from website.models import Retraction, NodeLicense, Tag, User
 
 from tests.base import OsfTestCase
 from tests.test_features import requires_search
@@ -797,32 +800,81 @@ class TestSearchMigration(SearchTestCase):
         )
 
     def test_first_migration_no_delete(self):
-        migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app)
+        migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
         var = self.es.indices.get_aliases()
         assert_equal(var[settings.ELASTIC_INDEX + '_v1']['aliases'].keys()[0], settings.ELASTIC_INDEX)
 
     def test_multiple_migrations_no_delete(self):
         for n in xrange(1, 21):
-            migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app)
+            migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
             var = self.es.indices.get_aliases()
             assert_equal(var[settings.ELASTIC_INDEX + '_v{}'.format(n)]['aliases'].keys()[0], settings.ELASTIC_INDEX)
 
     def test_first_migration_with_delete(self):
-        migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app)
+        migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
         var = self.es.indices.get_aliases()
         assert_equal(var[settings.ELASTIC_INDEX + '_v1']['aliases'].keys()[0], settings.ELASTIC_INDEX)
 
     def test_multiple_migrations_with_delete(self):
         for n in xrange(1, 21, 2):
-            migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app)
+            migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
             var = self.es.indices.get_aliases()
             assert_equal(var[settings.ELASTIC_INDEX + '_v{}'.format(n)]['aliases'].keys()[0], settings.ELASTIC_INDEX)
 
-            migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app)
+            migrate(delete=True, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
             var = self.es.indices.get_aliases()
             assert_equal(var[settings.ELASTIC_INDEX + '_v{}'.format(n + 1)]['aliases'].keys()[0], settings.ELASTIC_INDEX)
             assert not var.get(settings.ELASTIC_INDEX + '_v{}'.format(n))
 
+    def test_partitions_cover_every_document(self):
+        for _ in range(4):
+            UserFactory()
+        partitions = search_migration.get_partitions('user', 2)
+        assert_is_none(partitions[0][0])
+        assert_is_none(partitions[-1][1])
+        for user in User.find():
+            containing = [
+                (start, end) for start, end in partitions
+                if (start is None or user._id >= start) and (end is None or user._id < end)
+            ]
+            assert_equal(len(containing), 1)
+        assert_equal(len(partitions), (User.find().count() + 1) // 2)
+
+    def test_interrupted_migration_resumes(self):
+        UserFactory(fullname='Iggy Pop')
+        new_index = search_migration.set_up_index(settings.ELASTIC_INDEX)
+        search_migration.create_checkpoints(settings.ELASTIC_INDEX, new_index, size=1)
+        first = search_migration.database[search_migration.CHECKPOINT_COLLECTION].find_one({'kind': 'user'})
+        search_migration.reindex_partition(first['_id'])
+
+        with mock.patch('website.search_migration.migrate.reindex_partition', wraps=search_migration.reindex_partition) as mock_reindex:
+            migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
+        assert_not_in(first['_id'], [call[0][0] for call in mock_reindex.call_args_list])
+        var = self.es.indices.get_aliases()
+        assert_equal(var[new_index]['aliases'].keys()[0], settings.ELASTIC_INDEX)
+        active_users = len([user for user in User.find() if user.is_active])
+        assert_equal(self.es.count(index=new_index, doc_type='user')['count'], active_users)
+        assert_equal(search_migration.database[search_migration.CHECKPOINT_COLLECTION].find().count(), 0)
+
+    @mock.patch('website.search_migration.migrate.get_expected_counts')
+    def test_alias_not_swapped_when_counts_differ(self, mock_counts):
+        migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
+        mock_counts.return_value = {'user': 100000}
+        with assert_raises(SearchException):
+            migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=1)
+        var = self.es.indices.get_aliases()
+        assert_equal(var[settings.ELASTIC_INDEX + '_v1']['aliases'].keys()[0], settings.ELASTIC_INDEX)
+        assert_false(var[settings.ELASTIC_INDEX + '_v2']['aliases'])
+        search_migration.database[search_migration.CHECKPOINT_COLLECTION].remove()
+        search.delete_index(settings.ELASTIC_INDEX + '_v2')
+
+    def test_parallel_migration(self):
+        migrate(delete=False, index=settings.ELASTIC_INDEX, app=self.app.app, workers=2)
+        index = settings.ELASTIC_INDEX + '_v1'
+        assert_true(self.es.get(index=index, doc_type='project', id=self.project._id)['found'])
+        active_users = len([user for user in User.find() if user.is_active])
+        assert_equal(self.es.count(index=index, doc_type='user')['count'], active_users)
+
 class TestSearchFiles(SearchTestCase):
 
     def setUp(self):
@@ -886,6 +938,19 @@ class TestSearchFiles(SearchTestCase):
         find = query_file('Try a Little Tenderness.flac')['results']
         assert_equal(len(find), 1)
 
+    def test_rename_node_updates_file_docs(self):
+        file_ = self.root.append_file('Respect.wav')
+        self.node.set_title('Otis Blue', auth=Auth(self.node.creator))
+        self.node.save()
+        doc = elastic_search.es.get(index=elastic_search.INDEX, doc_type='file', id=file_._id)
+        assert_equal(doc['_source']['node_title'], 'Otis Blue')
+        assert_equal(doc['_source']['name'], 'Respect.wav')
+
+    @mock.patch('website.search.elastic_search.update_node_files')
+    def test_node_tags_do_not_touch_file_docs(self, mock_update_files):
+        self.node.add_tag('soul', auth=Auth(self.node.creator))
+        assert_false(mock_update_files.called)
+
     def test_delete_node(self):
         node = ProjectFactory(is_public=True, title='The Soul Album')
         osf_storage = node.get_addon('osfstorage')
@@ -897,3 +962,76 @@ class TestSearchFiles(SearchTestCase):
         node.save()
         find = query_file('The Dock of the Bay.mp3')['results']
         assert_equal(len(find), 0)
+
+
+class TestIndexingBatch(SearchTestCase):
+
+    def setUp(self):
+        super(TestIndexingBatch, self).setUp()
+        indexing_metrics.reset()
+
+    def test_node_updates_coalesce_to_widest_file_update(self):
+        node = ProjectFactory()
+        batch = IndexingBatch()
+        batch.add_node(node, update_files=None)
+        batch.add_node(node, update_files='all')
+        batch.add_node(node, update_files='node_fields')
+        assert_equal(len(batch), 1)
+        assert_equal(batch.items()[0][:3], ['node', node._id, {'update_files': 'all'}])
+        snapshot = indexing_metrics.snapshot()
+        assert_equal(snapshot['enqueued'], 3)
+        assert_equal(snapshot['coalesced'], 2)
+
+    def test_batched_updates_index_on_exit(self):
+        with batched_updates():
+            node = ProjectFactory(title='Green Onions', is_public=True)
+            node.set_title('Melting Pot', auth=Auth(node.creator))
+            node.save()
+            assert_equal(len(query('Melting Pot')['results']), 0)
+        assert_equal(len(query('Melting Pot')['results']), 1)
+        assert_equal(len(query('Green Onions')['results']), 0)
+        snapshot = indexing_metrics.snapshot()
+        assert_equal(snapshot['depth'], 0)
+        assert_equal(snapshot['failed'], 0)
+        assert_true(snapshot['indexed'] >= 1)
+
+    def test_batched_updates_skip_files_deleted_before_indexing(self):
+        node = ProjectFactory(is_public=True)
+        root = node.get_addon('osfstorage').get_root()
+        with batched_updates():
+            file_ = root.append_file('Time Is Tight.mp3')
+            file_.delete()
+        assert_equal(len(query_file('Time Is Tight.mp3')['results']), 0)
+
+    def test_index_pending_mixed_batch(self):
+        private = ProjectFactory(title='Hold On', is_public=False)
+        public = ProjectFactory(title='Soul Man', is_public=True)
+        items = [
+            ['node', private._id, {'update_files': 'all'}, time.time()],
+            ['node', public._id, {'update_files': 'all'}, time.time()],
+        ]
+        # Deleting the never indexed private node and its files returns 404s
+        assert_equal(elastic_search.index_pending(items, index=elastic_search.INDEX), [])
+        assert_equal(len(query('Soul Man')['results']), 1)
+        assert_equal(indexing_metrics.snapshot()['failed'], 0)
+
+    @mock.patch('website.search.search.index_pending')
+    def test_batched_updates_flush_at_max_pending(self, mock_index_pending):
+        users = [UserFactory() for _ in range(3)]
+        with batched_updates(max_pending=2) as batch:
+            for user in users:
+                batch.add_user(user)
+            assert_equal(mock_index_pending.call_count, 1)
+            assert_equal(len(batch), 1)
+        assert_equal(mock_index_pending.call_count, 2)
+
+    @mock.patch('website.search.elastic_search.helpers.streaming_bulk')
+    def test_index_pending_returns_rejected_items(self, mock_bulk):
+        user = UserFactory()
+        mock_bulk.side_effect = lambda es, actions, **kwargs: [
+            (False, {'index': {'status': 429, 'error': 'EsRejectedExecutionException'}})
+            for _ in actions
+        ]
+        items = [['user', user._id, {}, time.time()]]
+        assert_equal(elastic_search.index_pending(items, index=elastic_search.INDEX), items)
+        assert_equal(indexing_metrics.snapshot()['rejected'], 1)
@@ -4,14 +4,14 @@ import mock
 from nose.tools import *  # noqa
 
 from tests.base import OsfTestCase
-from tests.factories import NodeFactory
+from tests.factories import NodeFactory, UserFactory
 
 from modularodm import Q
 from modularodm import fields
 from modularodm.storage.mongostorage import MongoStorage
 
 from framework.mongo import database
-from framework.guid.model import GuidStoredObject
+from framework.guid.model import GuidStoredObject, ReservedGuid
 
 from website import models
 
@@ -33,6 +33,50 @@ class TestGuidStoredObject(OsfTestCase):
         assert_equal(guids[0]._id, fake_guid._id)
 
 
+class TestReservedGuid(OsfTestCase):
+
+    def setUp(self):
+        super(TestReservedGuid, self).setUp()
+        ReservedGuid.remove()
+
+    @mock.patch('framework.guid.model.generate_guid_id')
+    def test_refill_skips_taken_guids(self, mock_generate):
+        models.BlacklistGuid(_id='bcdef').save()
+        models.Guid(_id='cdefg').save()
+        mock_generate.side_effect = ['bcdef', 'cdefg', 'defgh', 'efghj']
+        assert_equal(ReservedGuid.refill(size=2), 2)
+        assert_equal(
+            sorted(guid._id for guid in ReservedGuid.find()),
+            ['defgh', 'efghj']
+        )
+
+    def test_claim_ids(self):
+        ReservedGuid.refill(size=5)
+        claimed = ReservedGuid.claim_ids(3)
+        assert_equal(len(set(claimed)), 3)
+        assert_equal(ReservedGuid.find().count(), 2)
+        assert_equal(len(ReservedGuid.claim_ids(1)), 1)
+        remaining = ReservedGuid.find()[0]._id
+        assert_equal(ReservedGuid.claim_ids(3), [remaining])
+        assert_equal(ReservedGuid.claim_ids(1), [])
+
+    def test_new_object_gets_reserved_guid(self):
+        user = UserFactory()
+        ReservedGuid.refill(size=1)
+        reserved = ReservedGuid.find()[0]._id
+        node = NodeFactory(creator=user)
+        assert_equal(node._id, reserved)
+        assert_equal(models.Guid.load(reserved).referent, node)
+        assert_equal(ReservedGuid.find().count(), 0)
+
+    def test_generate_many(self):
+        ReservedGuid.refill(size=2)
+        reserved = set(guid._id for guid in ReservedGuid.find())
+        guids = models.Guid.generate_many([None, None, None])
+        assert_equal(len(set(guid._id for guid in guids)), 3)
+        assert_true(reserved.issubset(guid._id for guid in guids))
+
+
 class TestResolveGuid(OsfTestCase):
 
     def setUp(self):
@@ -26,6 +26,7 @@ from framework.auth import exceptions as auth_exc
 from framework.auth.exceptions import ChangePasswordError, ExpiredTokenError
 from framework.auth.utils import impute_names_model
 from framework.auth.signals import user_merged
+from framework.auth.core import verified_passwords
 from framework.celery_tasks import handlers
 from framework.bcrypt import check_password_hash
 from website import filters, language, settings, mailchimp_utils
@@ -604,6 +605,35 @@ class TestUser(OsfTestCase):
         assert_true(user.check_password('ghostrider'))
         assert_false(user.check_password('ghostride'))
 
+    def test_check_password_remembers_successful_checks(self):
+        user = User(username=fake.email(), fullname='Nick Cage')
+        user.set_password('ghostrider')
+        user.save()
+        with mock.patch('framework.auth.core.check_password_hash', wraps=check_password_hash) as mock_check:
+            assert_true(user.check_password('ghostrider'))
+            assert_true(user.check_password('ghostrider'))
+            assert_false(user.check_password('ghostride'))
+        assert_equal(mock_check.call_count, 2)
+
+    def test_set_password_forgets_verified_password(self):
+        user = User(username=fake.email(), fullname='Nick Cage')
+        user.set_password('ghostrider')
+        user.save()
+        assert_true(user.check_password('ghostrider'))
+        user.set_password('johnnyblaze', notify=False)
+        user.save()
+        assert_false(user.check_password('ghostrider'))
+        assert_true(user.check_password('johnnyblaze'))
+
+    def test_disable_account_forgets_verified_password(self):
+        user = UserFactory()
+        user.set_password('ghostrider')
+        user.save()
+        assert_true(user.check_password('ghostrider'))
+        with mock.patch('website.mailchimp_utils.unsubscribe_mailchimp'):
+            user.disable_account()
+        assert_is_none(verified_passwords.get(user._id))
+
     def test_change_password(self):
         old_password = 'password'
         new_password = 'new password'
@@ -2335,6 +2365,46 @@ class TestNodeTraversals(OsfTestCase):
         descendants = list(point1.get_descendants_recursive())
         assert_equal(len(descendants), 1)
 
+    def test_ancestor_ids_set_on_components(self):
+        comp1 = ProjectFactory(creator=self.user, parent=self.root)
+        comp1a = ProjectFactory(creator=self.user, parent=comp1)
+        comp1.reload()
+        comp1a.reload()
+        assert_equal(self.root.ancestor_ids, [])
+        assert_equal(comp1.ancestor_ids, [self.root._id])
+        assert_equal(comp1a.ancestor_ids, [self.root._id, comp1._id])
+
+    def test_ancestor_ids_rewritten_when_subtree_moves(self):
+        comp1 = ProjectFactory(creator=self.user, parent=self.root)
+        comp1a = ProjectFactory(creator=self.user, parent=comp1)
+        new_root = ProjectFactory(creator=self.user)
+        self.root.nodes.remove(comp1)
+        self.root.save()
+        new_root.nodes.append(comp1)
+        new_root.save()
+        comp1a.reload()
+        assert_equal(comp1a.ancestor_ids, [new_root._id, comp1._id])
+
+    def test_ancestor_ids_exclude_pointers(self):
+        comp1 = ProjectFactory(creator=self.user, parent=self.root)
+        other = ProjectFactory(creator=self.user)
+        comp1.add_pointer(other, auth=self.auth)
+        other.reload()
+        assert_equal(other.ancestor_ids, [])
+
+    def test_parents_uses_ancestor_ids(self):
+        comp1 = ProjectFactory(creator=self.user, parent=self.root)
+        comp1a = ProjectFactory(creator=self.user, parent=comp1)
+        comp1a.reload()
+        assert_equal([p._id for p in comp1a.parents], [comp1._id, self.root._id])
+
+    def test_get_descendants_recursive_includes_pointers(self):
+        comp1 = ProjectFactory(creator=self.user, parent=self.root)
+        other = ProjectFactory(creator=self.user)
+        pointer = comp1.add_pointer(other, auth=self.auth)
+        descendants = list(self.root.get_descendants_recursive())
+        assert_equal([d._id for d in descendants], [comp1._id, pointer._id])
+
 class TestRemoveNode(OsfTestCase):
 
     def setUp(self):
@@ -2936,6 +3006,17 @@ class TestProject(OsfTestCase):
         self.project.add_contributor(contrib, auth=Auth(self.project.creator), permissions=[READ, WRITE])
         assert_false(node.is_admin_parent(contrib))
 
+    def test_is_admin_parent_after_parent_admin_removed(self):
+        user = UserFactory()
+        admin = UserFactory()
+        self.project.add_contributor(admin, auth=Auth(self.project.creator), permissions=[READ, WRITE, ADMIN])
+        self.project.save()
+        node = NodeFactory(parent=self.project, creator=user)
+        assert_true(node.is_admin_parent(admin))
+        self.project.set_permissions(admin, [READ, WRITE])
+        self.project.save()
+        assert_false(node.is_admin_parent(admin))
+
     def test_has_permission_read_parent_admin(self):
         user = UserFactory()
         node = NodeFactory(parent=self.project, creator=user)
@@ -4293,6 +4374,31 @@ class TestNodeLog(OsfTestCase):
         assert_equal(fork._id, log_node_forked.node._id)
 
 
+    def test_clone_node_logs(self):
+        user = UserFactory()
+        project = ProjectFactory(creator=user)
+        for i in range(4):
+            project.add_log(
+                action=NodeLog.TAG_ADDED,
+                params={'node': project._id, 'tag': 'tag{}'.format(i)},
+                auth=Auth(user),
+            )
+        target = ProjectFactory(creator=user)
+
+        count = NodeLog.clone_node_logs(project._id, target._id, batch_size=2)
+
+        assert_equal(count, len(project.logs))
+        cloned = [log for log in target.logs if log.original_node == project]
+        originals = list(project.logs)
+        assert_equal([log.action for log in cloned], [log.action for log in originals])
+        assert_equal([log.params for log in cloned], [log.params for log in originals])
+        for clone, original in zip(cloned, originals):
+            assert_not_equal(clone._id, original._id)
+            assert_equal(clone.node, target)
+            assert_equal(clone.original_node, original.original_node)
+            assert_equal(clone.user, original.user)
+
+
 class TestPermissions(OsfTestCase):
 
     def setUp(self):
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from nose.tools import *  # flake8: noqa (PEP8 asserts)
+
+from framework.auth import Auth
+from tests.base import OsfTestCase
+from tests.factories import (
+    AuthUserFactory, CommentFactory, ForkFactory, NodeFactory, ProjectFactory,
+    RegistrationFactory, WatchConfigFactory,
+)
+from website.project import statistics
+
+
+class TestNodeStatistics(OsfTestCase):
+
+    def setUp(self):
+        super(TestNodeStatistics, self).setUp()
+        self.user = AuthUserFactory()
+        self.auth = Auth(self.user)
+        self.project = ProjectFactory(creator=self.user)
+
+    def stored(self):
+        return statistics.get_collection().find_one({'_id': self.project._id})
+
+    def test_computed_on_first_read(self):
+        ForkFactory(project=self.project)
+        RegistrationFactory(project=self.project)
+        NodeFactory(creator=self.user).add_pointer(self.project, auth=self.auth)
+        stats = statistics.get_node_statistics(self.project)
+        assert_equal(stats['fork_count'], 1)
+        assert_equal(stats['registration_count'], 1)
+        assert_equal(stats['points'], 1)
+        assert_equal(stats['watched_count'], 0)
+        assert_false(stats['has_comments'])
+        assert_is_not_none(stats['last_logged'])
+        assert_equal(self.stored()['fork_count'], 1)
+
+    def test_fork_and_delete_update_fork_count(self):
+        statistics.get_node_statistics(self.project)
+        fork = ForkFactory(project=self.project)
+        assert_equal(self.stored()['fork_count'], 1)
+        fork.remove_node(auth=self.auth)
+        assert_equal(self.stored()['fork_count'], 0)
+
+    def test_deleted_registration_tree_updates_registration_count(self):
+        statistics.get_node_statistics(self.project)
+        registration = RegistrationFactory(project=self.project)
+        assert_equal(self.stored()['registration_count'], 1)
+        registration.delete_registration_tree(save=True)
+        assert_equal(self.stored()['registration_count'], 0)
+
+    def test_pointers_update_points(self):
+        statistics.get_node_statistics(self.project)
+        node = NodeFactory(creator=self.user)
+        pointer = node.add_pointer(self.project, auth=self.auth)
+        assert_equal(self.stored()['points'], 1)
+        node.rm_pointer(pointer, auth=self.auth)
+        assert_equal(self.stored()['points'], 0)
+
+    def test_watch_and_unwatch_update_watched_count(self):
+        statistics.get_node_statistics(self.project)
+        config = WatchConfigFactory(node=self.project)
+        self.user.watch(config)
+        self.user.save()
+        assert_equal(self.stored()['watched_count'], 1)
+        self.user.unwatch(config)
+        assert_equal(self.stored()['watched_count'], 0)
+
+    def test_add_log_only_moves_last_logged_forward(self):
+        latest = statistics.get_node_statistics(self.project)['last_logged']
+        self.project.add_log('file_added', {}, auth=self.auth, log_date=latest - datetime.timedelta(days=1))
+        assert_equal(self.stored()['last_logged'], latest)
+        later = latest + datetime.timedelta(days=1)
+        self.project.add_log('file_added', {}, auth=self.auth, log_date=later)
+        assert_equal(self.stored()['last_logged'], later)
+
+    def test_repair_node_statistics(self):
+        statistics.get_node_statistics(self.project)
+        ForkFactory(project=self.project)
+        CommentFactory(node=self.project, user=self.user)
+        NodeFactory(creator=self.user).add_pointer(self.project, auth=self.auth)
+        statistics.get_collection().update(
+            {'_id': self.project._id},
+            {'$set': {'fork_count': 5, 'points': 0, 'has_comments': False, 'last_logged': None}},
+        )
+        assert_equal(statistics.repair_node_statistics([self.project._id]), 1)
+        stats = self.stored()
+        assert_equal(stats['fork_count'], 1)
+        assert_equal(stats['points'], 1)
+        assert_true(stats['has_comments'])
+        assert_equal(stats['last_logged'], statistics.STATISTICS['last_logged'](self.project))
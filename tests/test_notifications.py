@@ -13,6 +13,7 @@ from framework.auth import Auth
 from framework.auth.core import User
 from framework.guid.model import Guid
 
+from website.notifications import tasks as emails_tasks
 from website.notifications.tasks import get_users_emails, send_users_email, group_by_node, remove_notifications
 from website.notifications import constants
 from website.notifications.model import NotificationDigest
@@ -1197,6 +1198,36 @@ class TestCompileSubscriptions(NotificationTestCase):
         assert_equal(subs, {'email_transactional': [], 'email_digest': [self.user_1._id], 'none': []})
 
 
+    @mock.patch('website.notifications.emails.check_node', wraps=emails.check_node)
+    def test_subscribers_resolved_once(self, mock_check_node):
+        self.base_sub.email_transactional.append(self.user_1)
+        self.base_sub.save()
+        first = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        lookups = mock_check_node.call_count
+        first['email_transactional'].remove(self.user_1._id)
+        second = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        assert_equal(second['email_transactional'], [self.user_1._id])
+        assert_equal(mock_check_node.call_count, lookups)
+
+    def test_subscription_change_invalidates_resolved_subscribers(self):
+        result = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        assert_equal(result['email_digest'], [])
+        self.base_sub.email_digest.append(self.user_2)
+        self.base_sub.save()
+        result = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        assert_equal(result['email_digest'], [self.user_2._id])
+
+    def test_permission_change_invalidates_resolved_subscribers(self):
+        self.base_sub.email_transactional.append(self.user_3)
+        self.base_sub.save()
+        result = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        assert_equal(result['email_transactional'], [self.user_3._id])
+        self.shared_node.permissions.pop(self.user_3._id)
+        self.shared_node.save()
+        result = emails.compile_subscriptions(self.shared_node, 'file_updated')
+        assert_equal(result['email_transactional'], [])
+
+
 class TestMoveSubscription(NotificationTestCase):
     def setUp(self):
         super(TestMoveSubscription, self).setUp()
@@ -1496,6 +1527,31 @@ class TestSendEmails(NotificationTestCase):
         assert_true(mock_notify.called)
         assert_equal(mock_notify.call_count, 2)
 
+    @mock.patch('website.mails.render_message')
+    def test_store_emails_renders_once_per_timezone_and_locale(self, mock_render):
+        mock_render.side_effect = lambda template, **context: context['localized_timestamp']
+        recipients = [factories.UserFactory(timezone='Europe/Paris', locale='fr') for _ in range(2)]
+        recipients.append(factories.UserFactory(timezone='America/New_York', locale='en_US'))
+        timestamp = datetime.datetime.utcnow().replace(tzinfo=pytz.utc)
+        emails.store_emails(
+            [recipient._id for recipient in recipients] + [self.user._id],
+            'email_digest', 'comments', self.user, self.node, timestamp,
+        )
+        assert_equal(mock_render.call_count, 2)
+        for recipient in recipients:
+            digest = NotificationDigest.find_one(Q('user_id', 'eq', recipient._id))
+            assert_equal(digest.message, emails.localize_timestamp(timestamp, recipient))
+            assert_equal(digest.send_type, 'email_digest')
+            assert_equal(digest.node_lineage, [self.project._id, self.node._id])
+        assert_equal(NotificationDigest.find(Q('user_id', 'eq', self.user._id)).count(), 0)
+
+    @mock.patch('website.notifications.emails.store_digests')
+    def test_store_emails_skips_type_none_and_acting_user(self, mock_store_digests):
+        timestamp = datetime.datetime.utcnow().replace(tzinfo=pytz.utc)
+        emails.store_emails([self.project.creator._id], 'none', 'comments', self.user, self.node, timestamp)
+        emails.store_emails([self.user._id], 'email_digest', 'comments', self.user, self.node, timestamp)
+        assert_false(mock_store_digests.called)
+
     def test_get_settings_url_for_node(self):
         url = emails.get_settings_url(self.project._id, self.user)
         assert_equal(url, self.project.absolute_url + 'settings/')
@@ -1612,7 +1668,10 @@ class TestSendDigest(OsfTestCase):
         ]
 
         assert_equal(len(user_groups), 2)
-        assert_equal(user_groups, expected)
+        assert_equal(
+            sorted(user_groups, key=lambda group: group['user_id']),
+            sorted(expected, key=lambda group: group['user_id'])
+        )
         digest_ids = [d._id, d2._id, d3._id]
         remove_notifications(email_notification_ids=digest_ids)
 
@@ -1663,7 +1722,10 @@ class TestSendDigest(OsfTestCase):
         ]
 
         assert_equal(len(user_groups), 2)
-        assert_equal(user_groups, expected)
+        assert_equal(
+            sorted(user_groups, key=lambda group: group['user_id']),
+            sorted(expected, key=lambda group: group['user_id'])
+        )
         digest_ids = [d._id, d2._id, d3._id]
         remove_notifications(email_notification_ids=digest_ids)
 
@@ -1695,7 +1757,53 @@ class TestSendDigest(OsfTestCase):
         assert_equal(kwargs['name'], user.fullname)
         message = group_by_node(user_groups[last_user_index]['info'])
         assert_equal(kwargs['message'], message)
-        assert_equal(kwargs['callback'], remove_notifications(email_notification_ids=email_notification_ids))
+        assert_equal(NotificationDigest.find(Q('_id', 'in', email_notification_ids)).count(), 0)
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_in_chunks(self, mock_send_mail):
+        send_type = 'email_digest'
+        NotificationDigest.remove()
+        users = [factories.UserFactory() for _ in range(3)]
+        for user in users:
+            for message in ['Hello', 'Goodbye']:
+                factories.NotificationDigestFactory(
+                    user_id=user._id,
+                    send_type=send_type,
+                    timestamp=datetime.datetime.utcnow(),
+                    message=message,
+                    node_lineage=[self.project._id]
+                ).save()
+        chunks = list(emails_tasks.iter_users_emails(send_type, chunk_size=2))
+        assert_equal([len(chunk) for chunk in chunks], [2, 1])
+        assert_equal(
+            sorted(group['user_id'] for chunk in chunks for group in chunk),
+            sorted(user._id for user in users)
+        )
+        assert_true(all(len(group['info']) == 2 for chunk in chunks for group in chunk))
+
+        with mock.patch.object(settings, 'NOTIFICATION_DIGEST_CHUNK_SIZE', 2):
+            send_users_email(send_type)
+        assert_equal(mock_send_mail.call_count, 3)
+        assert_equal(NotificationDigest.find(Q('send_type', 'eq', send_type)).count(), 0)
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_keeps_digests_that_failed(self, mock_send_mail):
+        send_type = 'email_digest'
+        NotificationDigest.remove()
+        users = sorted([factories.UserFactory() for _ in range(2)], key=lambda user: user._id)
+        for user in users:
+            factories.NotificationDigestFactory(
+                user_id=user._id,
+                send_type=send_type,
+                timestamp=datetime.datetime.utcnow(),
+                message='Hello',
+                node_lineage=[self.project._id]
+            ).save()
+        mock_send_mail.side_effect = [Exception('bad address'), None]
+        send_users_email(send_type)
+        assert_equal(mock_send_mail.call_count, 2)
+        remaining = NotificationDigest.find(Q('send_type', 'eq', send_type))
+        assert_equal([digest.user_id for digest in remaining], [users[0]._id])
 
     def test_remove_sent_digest_notifications(self):
         d = factories.NotificationDigestFactory(
@@ -20,6 +20,7 @@ from scripts import cleanup_failed_registrations as scripts
 
 from framework.auth import Auth
 from framework.celery_tasks import handlers
+from framework.exceptions import HTTPError
 
 from website.archiver import (
     ARCHIVER_INITIATED,
@@ -41,6 +42,7 @@ from website import settings
 from website.util import waterbutler_url_for
 from website.project.model import Node, NodeLog, ensure_schemas, MetaSchema
 from website.addons.base import StorageAddonBase
+from website.addons.base.crawler import FileTreeCrawler, TokenBucket
 
 from tests import factories
 from tests.base import OsfTestCase, fake
@@ -145,6 +147,17 @@ FILE_TREE = {
     ],
 }
 
+def iter_file_tree(file_tree):
+    """Yield (folder, children) for every folder of a file tree, like
+    StorageAddonBase._iter_file_tree
+    """
+    stack = [file_tree]
+    while stack:
+        folder = stack.pop()
+        children = folder.get('children', [])
+        yield folder, children
+        stack.extend(child for child in children if child['kind'] != 'file')
+
 class MockAddon(mock.MagicMock, StorageAddonBase):
 
     complete = True
@@ -152,6 +165,9 @@ class MockAddon(mock.MagicMock, StorageAddonBase):
     def _get_file_tree(self, user, version):
         return FILE_TREE
 
+    def _iter_file_tree(self, user, version):
+        return iter_file_tree(FILE_TREE)
+
     def after_register(self, *args):
         return None, None
 
@@ -387,6 +403,49 @@ class TestStorageAddonBase(ArchiverTestCase):
         for addon in [a for a in settings.ADDONS_ARCHIVABLE if a not in ['wiki', 'forward']]:
             self._test_addon(addon)
 
+class TestFileTreeCrawler(OsfTestCase):
+
+    def _list_children(self, folder):
+        if folder['path'] == '/':
+            return FILE_TREE['children']
+        return [each for each in FILE_TREE['children'] if each['path'] == folder['path']][0]['children']
+
+    def test_crawl_lists_every_folder(self):
+        crawler = FileTreeCrawler(self._list_children, workers=2)
+        listed = {folder['path']: children for folder, children in crawler.crawl({'path': '/', 'kind': 'folder'})}
+        assert_equal(sorted(listed.keys()), ['/', '/qwerty'])
+        assert_equal(listed['/qwerty'], FILE_TREE['children'][1]['children'])
+
+    def test_crawl_retries_throttled_listings(self):
+        list_children = mock.Mock(side_effect=[HTTPError(429), HTTPError(503), []])
+        crawler = FileTreeCrawler(list_children, workers=1, backoff=0)
+        assert_equal(list(crawler.crawl({'path': '/', 'kind': 'folder'})), [({'path': '/', 'kind': 'folder'}, [])])
+        assert_equal(list_children.call_count, 3)
+
+    def test_crawl_gives_up_after_max_retries(self):
+        list_children = mock.Mock(side_effect=HTTPError(503))
+        crawler = FileTreeCrawler(list_children, workers=1, max_retries=2, backoff=0)
+        with assert_raises(HTTPError):
+            list(crawler.crawl({'path': '/', 'kind': 'folder'}))
+        assert_equal(list_children.call_count, 3)
+
+    def test_crawl_does_not_retry_client_errors(self):
+        list_children = mock.Mock(side_effect=HTTPError(403))
+        crawler = FileTreeCrawler(list_children, workers=1, backoff=0)
+        with assert_raises(HTTPError):
+            list(crawler.crawl({'path': '/', 'kind': 'folder'}))
+        assert_equal(list_children.call_count, 1)
+
+    def test_token_bucket_waits_once_burst_is_spent(self):
+        clock = [1000.0]
+        with mock.patch('website.addons.base.crawler.time') as mock_time:
+            mock_time.time.side_effect = lambda: clock[0]
+            mock_time.sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+            bucket = TokenBucket(2)
+            for _ in range(4):
+                bucket.acquire()
+        assert_equal(clock[0], 1001.0)
+
 class TestArchiverTasks(ArchiverTestCase):
 
     @use_fake_addons
@@ -419,8 +478,8 @@ class TestArchiverTasks(ArchiverTestCase):
     @mock.patch('website.archiver.tasks.archive_addon.delay')
     def test_archive_node_pass(self, mock_archive_addon):
         settings.MAX_ARCHIVE_SIZE = 1024 ** 3
-        with mock.patch.object(StorageAddonBase, '_get_file_tree') as mock_file_tree:
-            mock_file_tree.return_value = FILE_TREE
+        with mock.patch.object(StorageAddonBase, '_iter_file_tree') as mock_file_tree:
+            mock_file_tree.side_effect = lambda *args, **kwargs: iter_file_tree(FILE_TREE)
             results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage', 'dropbox']]
         with mock.patch.object(celery, 'group') as mock_group:
             archive_node(results, self.archive_job._id)
@@ -447,13 +506,13 @@ class TestArchiverTasks(ArchiverTestCase):
         with mock.patch.object(self.src, 'get_addon') as mock_get_addon:
             mock_addon = MockAddon()
             def empty_file_tree(user, version):
-                return {
+                return iter_file_tree({
                     'path': '/',
                     'kind': 'folder',
                     'name': 'Fake',
                     'children': []
-                }
-            setattr(mock_addon, '_get_file_tree', empty_file_tree)
+                })
+            setattr(mock_addon, '_iter_file_tree', empty_file_tree)
             mock_get_addon.return_value = mock_addon
             results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage']]
             archive_node(results, job_pk=self.archive_job._id)
@@ -465,8 +524,8 @@ class TestArchiverTasks(ArchiverTestCase):
         settings.MAX_ARCHIVE_SIZE = 100
         self.archive_job.initiator.system_tags.append(NO_ARCHIVE_LIMIT)
         self.archive_job.initiator.save()
-        with mock.patch.object(StorageAddonBase, '_get_file_tree') as mock_file_tree:
-            mock_file_tree.return_value = FILE_TREE
+        with mock.patch.object(StorageAddonBase, '_iter_file_tree') as mock_file_tree:
+            mock_file_tree.side_effect = lambda *args, **kwargs: iter_file_tree(FILE_TREE)
             results = [stat_addon(addon, self.archive_job._id) for addon in ['osfstorage', 'dropbox']]
         with mock.patch.object(celery, 'group') as mock_group:
             archive_node(results, self.archive_job._id)
@@ -725,6 +784,12 @@ class TestArchiverTasks(ArchiverTestCase):
 
 class TestArchiverUtils(ArchiverTestCase):
 
+    def test_aggregate_file_listings(self):
+        result = archiver_utils.aggregate_file_listings('abc12', 'dropbox', iter_file_tree(FILE_TREE))
+        assert_equal(result.num_files, 2)
+        assert_equal(result.disk_usage, 128 + 256)
+        assert_equal(result.targets, [])
+
     @mock.patch('website.mails.send_mail')
     def test_handle_archive_fail(self, mock_send_mail):
         archiver_utils.handle_archive_fail(
@@ -63,15 +63,36 @@ class TestWatching(OsfTestCase):
         assert_equal(n_watched_now, n_watched_then - 1)
         assert_false(self.user.is_watching(self.project))
 
-    @unittest.skip("Won't work because the old log's id doesn't encode the "
-                   "correct log date")
     def test_get_recent_log_ids(self):
         self._watch_project(self.project)
         log_ids = list(self.user.get_recent_log_ids())
         assert_equal(self.last_log._id, log_ids[0])
-        # This part won't work
-        # TODO(sloria): Rethink.
-        assert_equal(len(log_ids), 1)
+        # The log added 100 days ago is left out; the creation log is not
+        assert_equal(len(log_ids), 2)
+
+    def test_get_recent_log_ids_limit(self):
+        self._watch_project(self.project)
+        log_ids = list(self.user.get_recent_log_ids(limit=1))
+        assert_equal(log_ids, [self.last_log._id])
+
+    def test_get_recent_log_ids_merges_watched_nodes(self):
+        other = ProjectFactory(creator=self.user)
+        self._watch_project(self.project)
+        self._watch_project(other)
+        other_log = other.add_log(
+            'tag_added',
+            params={'project': other._primary_key},
+            auth=self.consolidate_auth,
+            log_date=dt.datetime.utcnow(),
+            save=True,
+        )
+        log_ids = list(self.user.get_recent_log_ids())
+        assert_equal(log_ids[0], other_log._id)
+        assert_equal(len(log_ids), 4)
+        assert_equal(len(set(log_ids)), 4)
+
+    def test_get_recent_log_ids_nothing_watched(self):
+        assert_equal(list(self.user.get_recent_log_ids()), [])
 
     def test_get_recent_log_ids_since(self):
         self._watch_project(self.project)
@@ -3,7 +3,6 @@ import glob
 import importlib
 import mimetypes
 import os
-from time import sleep
 
 from bson import ObjectId
 from mako.lookup import TemplateLookup
@@ -24,6 +23,7 @@ from framework.routing import process_rules
 
 from website import settings
 from website.addons.base import serializer, logger
+from website.addons.base.crawler import FileTreeCrawler, get_rate_limiter
 from website.project.model import Node, User
 from website.util import waterbutler_url_for
 
@@ -777,31 +777,40 @@ class StorageAddonBase(object):
             raise HTTPError(res.status_code, data={
                 'error': res.json(),
             })
-        # TODO: better throttling?
-        sleep(1.0 / 5.0)
         return res.json().get('data', [])
 
-    def _get_file_tree(self, filenode=None, user=None, cookie=None, version=None):
+    def _iter_file_tree(self, filenode=None, user=None, cookie=None, version=None):
         """
-        Recursively get file metadata
+        Yield ``(folder, children)`` for ``filenode`` and every folder below it.
+        Folders are listed concurrently, within the rate limit of the provider,
+        and yielded as each listing completes.
         """
         filenode = filenode or {
             'path': '/',
             'kind': 'folder',
             'name': self.root_node.name,
         }
-        if filenode.get('kind') == 'file':
-            return filenode
-        elif 'size' in filenode:
-            return filenode
-        kwargs = {
-            'version': version,
-            'cookie': cookie,
+        # Look the session up once, so the crawler's threads only make requests
+        if user and not cookie:
+            cookie = user.get_or_create_cookie()
+        crawler = FileTreeCrawler(
+            lambda folder: self._get_fileobj_child_metadata(folder, None, cookie=cookie, version=version),
+            rate_limiter=get_rate_limiter(self.config.short_name),
+        )
+        return crawler.crawl(filenode)
+
+    def _get_file_tree(self, filenode=None, user=None, cookie=None, version=None):
+        """
+        Get file metadata as a tree, with the children of each folder under
+        its ``children`` key
+        """
+        filenode = filenode or {
+            'path': '/',
+            'kind': 'folder',
+            'name': self.root_node.name,
         }
-        filenode['children'] = [
-            self._get_file_tree(child, user, cookie=cookie)
-            for child in self._get_fileobj_child_metadata(filenode, user, **kwargs)
-        ]
+        for folder, children in self._iter_file_tree(filenode, user, cookie=cookie, version=version):
+            folder['children'] = children
         return filenode
 
 class AddonOAuthNodeSettingsBase(AddonNodeSettingsBase):
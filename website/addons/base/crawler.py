@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""Concurrent crawling of addon file trees through WaterButler.
+
+Folders are listed by a bounded pool of worker threads as soon as they are
+found, instead of one at a time, while a token bucket per provider keeps the
+metadata requests this process makes to each provider under its rate limit.
+Listings are yielded as they complete, so callers can aggregate a tree without
+holding all of it in memory.
+"""
+import logging
+import Queue
+import threading
+import time
+
+from framework.exceptions import HTTPError
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+# Token buckets shared by every crawl of a provider in this process
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class TokenBucket(object):
+    """Hands out ``rate`` tokens per second, allowing bursts of up to
+    ``capacity`` tokens.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_rate_limiter(provider):
+    """Return the token bucket for requests to ``provider``, or ``None`` if
+    its requests are not limited.
+    """
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            rate = settings.ARCHIVE_CRAWL_RATE_LIMITS.get(provider, settings.ARCHIVE_CRAWL_RATE_LIMIT)
+            _rate_limiters[provider] = TokenBucket(rate) if rate else None
+        return _rate_limiters[provider]
+
+
+def is_listable(filenode):
+    """Whether the children of ``filenode`` have to be listed. Folders whose
+    metadata already includes a size are not descended into.
+    """
+    return filenode.get('kind') != 'file' and 'size' not in filenode
+
+
+def is_retryable(error):
+    """Whether a listing that failed with ``error`` is worth retrying, i.e.
+    it was throttled or hit a server error.
+    """
+    return isinstance(error, HTTPError) and (error.code == 429 or error.code >= 500)
+
+
+class FileTreeCrawler(object):
+    """Lists a folder and every folder below it.
+
+    :param list_children: Function taking the metadata of a folder and
+        returning the metadata of its children
+    :param int workers: Number of folders listed concurrently
+    :param TokenBucket rate_limiter: Bucket to take a token from before each
+        request, or ``None``
+    :param int max_retries: Times a throttled or failed listing is retried
+    :param float backoff: Seconds before the first retry, doubled for each
+        retry after it
+    """
+
+    def __init__(self, list_children, workers=None, rate_limiter=None, max_retries=None, backoff=None):
+        self.list_children = list_children
+        self.workers = workers or settings.ARCHIVE_CRAWL_WORKERS
+        self.rate_limiter = rate_limiter
+        self.max_retries = settings.ARCHIVE_CRAWL_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.ARCHIVE_CRAWL_BACKOFF if backoff is None else backoff
+
+    def list_folder(self, folder):
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                return self.list_children(folder)
+            except HTTPError as error:
+                if not is_retryable(error) or attempt >= self.max_retries:
+                    raise
+            delay = self.backoff * 2 ** attempt
+            attempt += 1
+            logger.warning('Listing {} failed, retry {} in {}s'.format(folder.get('path'), attempt, delay))
+            time.sleep(delay)
+
+    def _work(self, folders, results):
+        while True:
+            folder = folders.get()
+            if folder is None:
+                return
+            try:
+                results.put((folder, self.list_folder(folder), None))
+            except Exception as error:
+                results.put((folder, None, error))
+
+    def crawl(self, root):
+        """Yield ``(folder, children)`` for ``root`` and every folder below it,
+        in the order their listings complete. The first listing that fails
+        for good stops the crawl and is raised.
+        """
+        if not is_listable(root):
+            return
+        folders = Queue.Queue()
+        results = Queue.Queue()
+        for _ in range(self.workers):
+            worker = threading.Thread(target=self._work, args=(folders, results))
+            worker.daemon = True
+            worker.start()
+        folders.put(root)
+        pending = 1
+        try:
+            while pending:
+                folder, children, error = results.get()
+                pending -= 1
+                if error is not None:
+                    raise error
+                for child in children:
+                    if is_listable(child):
+                        folders.put(child)
+                        pending += 1
+                yield folder, children
+        finally:
+            # Drop folders nobody has started listing, then stop the workers
+            try:
+                while True:
+                    folders.get_nowait()
+            except Queue.Empty:
+                pass
+            for _ in range(self.workers):
+                folders.put(None)
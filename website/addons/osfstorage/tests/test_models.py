@@ -178,6 +178,21 @@ class TestOsfstorageFileNode(StorageTestCase):
         assert_equals(child.get_download_count(1), 1)
         assert_equals(child.get_download_count(2), 1)
 
+    @mock.patch('framework.analytics.session')
+    def test_download_counts_many_files(self, mock_session):
+        mock_session.data = {}
+        root = self.node_settings.get_root()
+        downloaded = root.append_file('Downloaded')
+        untouched = root.append_file('Untouched')
+
+        utils.update_analytics(self.project, downloaded._id, 0)
+        utils.update_analytics(self.project, downloaded._id, 1)
+
+        with mock.patch('website.files.models.base.get_basic_counters') as mock_get_counters:
+            counts = models.OsfStorageFile.get_download_counts([downloaded, untouched])
+        assert_false(mock_get_counters.called)
+        assert_equals(counts, {downloaded._id: 2, untouched._id: 0})
+
     @unittest.skip
     def test_create_version(self):
         pass
@@ -237,6 +252,44 @@ class TestOsfstorageFileNode(StorageTestCase):
         child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
         assert_equals('/Cloud/Carp', child.materialized_path)
 
+    def test_materialized_path_is_stored(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        assert_equals('/Cloud/Carp', child.stored_object.materialized_path)
+        assert_equals('/', self.node_settings.get_root().stored_object.materialized_path)
+
+    def test_materialized_path_falls_back_to_lineage(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        models.StoredFileNode._storage[0].store.update(
+            {'_id': child._id},
+            {'$set': {'materialized_path': ''}},
+        )
+        models.StoredFileNode._clear_caches(child._id)
+        assert_equals('/Cloud/Carp', models.OsfStorageFile.load(child._id).materialized_path)
+
+    def test_move_folder_rewrites_descendant_paths(self):
+        root = self.node_settings.get_root()
+        to_move = root.append_folder('Carp')
+        nested = to_move.append_folder('Tuna')
+        child = nested.append_file('A dee um')
+        move_to = root.append_folder('Cloud')
+
+        to_move.move_under(move_to, name='Koi')
+
+        assert_equal(to_move.materialized_path, '/Cloud/Koi/')
+        assert_equal(models.OsfStorageFolder.load(nested._id).materialized_path, '/Cloud/Koi/Tuna/')
+        assert_equal(models.OsfStorageFile.load(child._id).materialized_path, '/Cloud/Koi/Tuna/A dee um')
+
+    def test_move_folder_across_nodes_rewrites_descendant_paths(self):
+        other_node_settings = ProjectFactory().get_addon('osfstorage')
+        move_to = other_node_settings.get_root().append_folder('Cloud')
+        to_move = self.node_settings.get_root().append_folder('Carp')
+        child = to_move.append_file('A dee um')
+
+        to_move.move_under(move_to)
+        child.reload()
+
+        assert_equal(child.materialized_path, '/Cloud/Carp/A dee um')
+
     def test_copy(self):
         to_copy = self.node_settings.get_root().append_file('Carp')
         copy_to = self.node_settings.get_root().append_folder('Cloud')
@@ -730,6 +783,45 @@ class TestOsfStorageCheckout(StorageTestCase):
         with assert_raises(FileNodeCheckedOutError):
             folder.delete()
 
+    def test_checkout_flags_ancestors(self):
+        folder = self.root_node.append_folder('folder')
+        nested = folder.append_folder('nested')
+        self.file.move_under(nested)
+        assert_false(folder.is_checked_out)
+
+        self.file.check_in_or_out(self.user, self.user, save=True)
+        folder.reload()
+        nested.reload()
+        assert_true(folder.has_checked_out_descendants)
+        assert_true(nested.has_checked_out_descendants)
+        assert_true(folder.is_checked_out)
+
+        self.file.check_in_or_out(self.user, None, save=True)
+        folder.reload()
+        nested.reload()
+        assert_false(folder.has_checked_out_descendants)
+        assert_false(nested.has_checked_out_descendants)
+        assert_false(folder.is_checked_out)
+
+    def test_checkin_keeps_flag_for_other_checkouts(self):
+        folder = self.root_node.append_folder('folder')
+        other = folder.append_file('other')
+        self.file.move_under(folder)
+        self.file.check_in_or_out(self.user, self.user, save=True)
+        other.check_in_or_out(self.user, self.user, save=True)
+
+        self.file.check_in_or_out(self.user, None, save=True)
+        folder.reload()
+        assert_true(folder.is_checked_out)
+
+    def test_is_checked_out_scans_folders_without_flag(self):
+        folder = self.root_node.append_folder('folder')
+        self.file.move_under(folder)
+        self.file.check_in_or_out(self.user, self.user, save=True)
+        folder.reload()
+        folder.has_checked_out_descendants = None
+        assert_true(folder.is_checked_out)
+
     def test_move_checked_out_file(self):
         self.file.check_in_or_out(self.user, self.user, save=True)
         self.file.reload()
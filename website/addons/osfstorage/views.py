@@ -130,9 +130,11 @@ def osfstorage_get_metadata(file_node, **kwargs):
 @must_be_signed
 @decorators.autoload_filenode(must_be='folder')
 def osfstorage_get_children(file_node, **kwargs):
+    children = list(file_node.children)
+    downloads = models.OsfStorageFile.get_download_counts([child for child in children if child.is_file])
     return [
-        child.serialize()
-        for child in file_node.children
+        child.serialize(downloads=downloads[child._id]) if child.is_file else child.serialize()
+        for child in children
     ]
 
 
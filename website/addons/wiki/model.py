@@ -2,6 +2,7 @@
 
 import datetime
 import functools
+import hashlib
 import logging
 import urllib
 
@@ -13,6 +14,7 @@ import markdown
 from markdown.extensions import codehilite, fenced_code, wikilinks
 from modularodm import fields
 
+from framework.caching import TieredCache
 from framework.mongo.utils import to_mongo_key
 from framework.forms.utils import sanitize
 from framework.guid.model import GuidStoredObject
@@ -21,7 +23,7 @@ from framework.mongo import utils as mongo_utils
 from website import settings
 from website.addons.base import AddonNodeSettingsBase
 from website.addons.wiki import utils as wiki_utils
-from website.addons.wiki.settings import WIKI_CHANGE_DATE
+from website.addons.wiki.settings import WIKI_CHANGE_DATE, WIKI_RENDER_CACHE_SIZE, WIKI_RENDER_CACHE_TTL
 from website.project.commentable import Commentable
 from website.project.model import Node
 from website.project.signals import write_permissions_revoked
@@ -38,6 +40,15 @@ from .exceptions import (
 
 logger = logging.getLogger(__name__)
 
+#: Rendered HTML and plain text of wiki pages, keyed by the page, a hash of its
+#: content and the node its links point into. Editing a page changes the key,
+#: so entries never have to be invalidated.
+render_cache = TieredCache(
+    'wiki-render',
+    max_size=WIKI_RENDER_CACHE_SIZE,
+    ttl=WIKI_RENDER_CACHE_TTL,
+)
+
 
 class AddonWikiNodeSettings(AddonNodeSettingsBase):
 
@@ -164,6 +175,16 @@ def render_content(content, node):
     return sanitized_content
 
 
+def get_render_cache_key(page, node, kind):
+    """Key of the rendered ``kind`` ('html' or 'text') of ``page`` with its
+    links pointing into ``node``.
+    """
+    content = page.content or ''
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return (kind, page._id, hashlib.sha1(content).hexdigest(), node._id)
+
+
 class NodeWikiPage(GuidStoredObject, Commentable):
 
     _id = fields.StringField(primary=True)
@@ -235,6 +256,14 @@ class NodeWikiPage(GuidStoredObject, Commentable):
 
     def html(self, node):
         """The cleaned HTML of the page"""
+        key = get_render_cache_key(self, node, 'html')
+        html = render_cache.get(key)
+        if html is None:
+            html = self.render_html(node)
+            render_cache.set(key, html)
+        return html
+
+    def render_html(self, node):
         sanitized_content = render_content(self.content, node=node)
         try:
             return linkify(
@@ -247,8 +276,12 @@ class NodeWikiPage(GuidStoredObject, Commentable):
 
     def raw_text(self, node):
         """ The raw text of the page, suitable for using in a test search"""
-
-        return sanitize(self.html(node), tags=[], strip=True)
+        key = get_render_cache_key(self, node, 'text')
+        text = render_cache.get(key)
+        if text is None:
+            text = sanitize(self.html(node), tags=[], strip=True)
+            render_cache.set(key, text)
+        return text
 
     def get_draft(self, node):
         """
@@ -289,9 +322,14 @@ class NodeWikiPage(GuidStoredObject, Commentable):
                                         data=contributors)
 
     def save(self, *args, **kwargs):
+        render = kwargs.pop('render', True)
         rv = super(NodeWikiPage, self).save(*args, **kwargs)
         if self.node:
-            self.node.update_search()
+            if render and 'content' in rv:
+                # Render new content once, ahead of its first view and indexing
+                self.raw_text(self.node)
+            # Wikis aren't part of file docs
+            self.node.update_search(update_files=None)
         return rv
 
     def rename(self, new_name, save=True):
@@ -313,7 +351,8 @@ class NodeWikiPage(GuidStoredObject, Commentable):
         clone = self.clone()
         clone.node = node
         clone.user = self.user
-        clone.save()
+        # Most cloned versions are never viewed; render them on demand
+        clone.save(render=False)
         return clone
 
     @classmethod
@@ -11,3 +11,7 @@ SHAREJS_DB_URL = 'mongodb://{}:{}/{}'.format(settings.DB_HOST, settings.DB_PORT,
 
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.utcfromtimestamp(1423760098)
+
+# Rendered wiki pages kept in process, and seconds they stay in the shared cache
+WIKI_RENDER_CACHE_SIZE = 1000
+WIKI_RENDER_CACHE_TTL = 7 * 24 * 60 * 60
@@ -20,7 +20,7 @@ from website.exceptions import NodeStateError
 from website.addons.wiki import settings
 from website.addons.wiki import views
 from website.addons.wiki.exceptions import InvalidVersionError
-from website.addons.wiki.model import NodeWikiPage, render_content
+from website.addons.wiki.model import NodeWikiPage, render_content, render_cache, get_render_cache_key
 from website.addons.wiki.utils import (
     get_sharejs_uuid, generate_private_uuid, share_db, delete_share_doc,
     migrate_uuid, format_wiki_version, serialize_wiki_settings,
@@ -761,6 +761,35 @@ class TestWikiLinks(OsfTestCase):
         assert_equal(expected, wiki.html(node))
 
 
+class TestWikiRenderCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestWikiRenderCache, self).setUp()
+        self.project = ProjectFactory()
+        self.wiki = NodeWikiFactory(content='[[wiki2]] *hello*', node=self.project)
+
+    def test_rendered_on_save(self):
+        assert_equal(
+            render_cache.get(get_render_cache_key(self.wiki, self.project, 'html')),
+            self.wiki.render_html(self.project),
+        )
+        assert_in('hello', render_cache.get(get_render_cache_key(self.wiki, self.project, 'text')))
+
+    @mock.patch('website.addons.wiki.model.render_content')
+    def test_html_reuses_rendered_content(self, mock_render):
+        self.wiki.html(self.project)
+        self.wiki.raw_text(self.project)
+        assert_false(mock_render.called)
+
+    def test_key_follows_content_and_node(self):
+        fork = ProjectFactory()
+        html = self.wiki.html(self.project)
+        assert_in('/{}/wiki/wiki2/'.format(fork._id), self.wiki.html(fork))
+        self.wiki.content = '[[wiki3]]'
+        assert_not_equal(self.wiki.html(self.project), html)
+        assert_in('wiki3', self.wiki.html(self.project))
+
+
 class TestWikiUuid(OsfTestCase):
 
     def setUp(self):
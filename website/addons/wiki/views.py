@@ -144,8 +144,8 @@ def wiki_widget(**kwargs):
     more = len(node.wiki_pages_current.keys()) >= 2
     MAX_DISPLAY_LENGTH = 400
     use_python_render = False
-    if wiki_page and wiki_page.html(node):
-        wiki_html = wiki_page.html(node)
+    wiki_html = wiki_page.html(node) if wiki_page else None
+    if wiki_html:
         if len(wiki_html) > MAX_DISPLAY_LENGTH:
             wiki_html = BeautifulSoup(wiki_html[:MAX_DISPLAY_LENGTH] + '...', 'html.parser')
             more = True
@@ -48,10 +48,19 @@ class AggregateStatResult(object):
     """
     Helper class to collect metadata about arbitrary depth file/addon/node file trees
     """
+    # Totals of the files counted with add_file, on top of those of the targets
+    _num_files = 0
+    _disk_usage = 0.0
+
     def __init__(self, target_id, target_name, targets=None):
         self.target_id = target_id
         self.target_name = target_name
-        self.targets = [target for target in targets if target]
+        self.targets = [target for target in targets or [] if target]
+
+    def add_file(self, disk_usage=0):
+        """Count a file in the totals without keeping a StatResult for it"""
+        self._num_files += 1
+        self._disk_usage += float(disk_usage or 0)
 
     def __str__(self):
         return str(self._to_dict())
@@ -70,8 +79,8 @@ class AggregateStatResult(object):
 
     @property
     def num_files(self):
-        return sum([value.num_files for value in self.targets])
+        return self._num_files + sum([value.num_files for value in self.targets])
 
     @property
     def disk_usage(self):
-        return sum([value.disk_usage for value in self.targets])
+        return self._disk_usage + sum([value.disk_usage for value in self.targets])
@@ -125,7 +125,11 @@ def stat_addon(addon_short_name, job_pk):
     src, dst, user = job.info()
     src_addon = src.get_addon(addon_name)
     try:
-        file_tree = src_addon._get_file_tree(user=user, version=version)
+        result = utils.aggregate_file_listings(
+            src_addon._id,
+            addon_short_name,
+            src_addon._iter_file_tree(user=user, version=version),
+        )
     except HTTPError as e:
         dst.archive_job.update_target(
             addon_short_name,
@@ -133,11 +137,6 @@ def stat_addon(addon_short_name, job_pk):
             errors=[e.data['error']],
         )
         raise
-    result = AggregateStatResult(
-        src_addon._id,
-        addon_short_name,
-        targets=[utils.aggregate_file_tree_metadata(addon_short_name, file_tree, user)],
-    )
     return result
 
 
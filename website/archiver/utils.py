@@ -156,6 +156,21 @@ def aggregate_file_tree_metadata(addon_short_name, fileobj_metadata, user):
             targets=[aggregate_file_tree_metadata(addon_short_name, child, user) for child in fileobj_metadata.get('children', [])],
         )
 
+def aggregate_file_listings(target_id, target_name, listings):
+    """Total the files of an addon's file tree as its folders are listed, without
+    keeping the tree or a StatResult per file
+
+    :param listings: iterable of (folder, children) pairs, as yielded by
+    StorageAddonBase._iter_file_tree
+    :return: AggregateStatResult with the number and disk usage of the files
+    """
+    result = AggregateStatResult(target_id=target_id, target_name=target_name)
+    for _, children in listings:
+        for child in children:
+            if child['kind'] == 'file':
+                result.add_file(child.get('size'))
+    return result
+
 def before_archive(node, user):
     link_archive_provider(node, user)
     job = ArchiveJob(
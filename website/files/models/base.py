@@ -15,7 +15,7 @@ from dateutil.parser import parse as parse_date
 from framework.guid.model import Guid
 from framework.mongo import StoredObject
 from framework.mongo.utils import unique_on
-from framework.analytics import get_basic_counters
+from framework.analytics import get_basic_counters, get_basic_counters_many
 
 from website import util
 from website.files import utils
@@ -66,6 +66,10 @@ class TrashedFileNode(StoredObject, Commentable):
     materialized_path = fields.StringField(required=True)
 
     checkout = fields.AbstractForeignField('User')
+    # Whether any file or folder below this folder is checked out
+    # None when unknown, for folders saved before this was tracked
+    # Should only be used for OsfStorage
+    has_checked_out_descendants = fields.BooleanField(default=None)
     deleted_by = fields.AbstractForeignField('User')
     deleted_on = fields.DateTimeField(auto_now_add=True)
     tags = fields.ForeignField('Tag', list=True)
@@ -173,6 +177,13 @@ class StoredFileNode(StoredObject, Commentable):
         'key_or_list': [
             ('parent', pymongo.ASCENDING),
         ]
+    }, {
+        'unique': False,
+        'key_or_list': [
+            ('node', pymongo.ASCENDING),
+            ('provider', pymongo.ASCENDING),
+            ('materialized_path', pymongo.ASCENDING),
+        ]
     }]
 
     _id = fields.StringField(primary=True, default=lambda: str(bson.ObjectId()))
@@ -200,6 +211,10 @@ class StoredFileNode(StoredObject, Commentable):
     # The User that has this file "checked out"
     # Should only be used for OsfStorage
     checkout = fields.AbstractForeignField('User')
+    # Whether any file or folder below this folder is checked out
+    # None when unknown, for folders saved before this was tracked
+    # Should only be used for OsfStorage
+    has_checked_out_descendants = fields.BooleanField(default=None)
 
     #Tags for a file, currently only used for osfStorage
     tags = fields.ForeignField('Tag', list=True)
@@ -554,6 +569,7 @@ class FileNode(object):
             history=self.history,
             is_file=self.is_file,
             checkout=self.checkout,
+            has_checked_out_descendants=self.has_checked_out_descendants,
             provider=self.provider,
             versions=self.versions,
             last_touched=self.last_touched,
@@ -710,20 +726,42 @@ class File(FileNode):
         self.save()
         return version
 
+    def _download_page(self, version=None):
+        parts = ['download', self.node._id, self._id]
+        if version is not None:
+            parts.append(version)
+        return ':'.join([format(part) for part in parts])
+
     def get_download_count(self, version=None):
         """Pull the download count from the pagecounter collection
         Limit to version if specified.
         Currently only useful for OsfStorage
         """
-        parts = ['download', self.node._id, self._id]
-        if version is not None:
-            parts.append(version)
-        page = ':'.join([format(part) for part in parts])
-        _, count = get_basic_counters(page)
+        _, count = get_basic_counters(self._download_page(version))
 
         return count or 0
 
-    def serialize(self):
+    @classmethod
+    def get_download_counts(cls, files):
+        """Pull the download counts of many files with a single query
+
+        :param list files: Files to count downloads of
+        :return dict: Map of file _id to download count
+        """
+        pages = {each._id: each._download_page() for each in files}
+        counters = get_basic_counters_many(pages.values())
+        return {
+            file_id: counters[page][1] or 0
+            for file_id, page in pages.items()
+        }
+
+    def serialize(self, downloads=None):
+        """
+        :param int downloads: Download count, if already fetched with get_download_counts
+        """
+        if downloads is None:
+            downloads = self.get_download_count()
+
         if not self.versions:
             return dict(
                 super(File, self).serialize(),
@@ -731,7 +769,7 @@ class File(FileNode):
                 version=None,
                 modified=None,
                 contentType=None,
-                downloads=self.get_download_count(),
+                downloads=downloads,
                 checkout=self.checkout._id if self.checkout else None,
             )
 
@@ -739,7 +777,7 @@ class File(FileNode):
         return dict(
             super(File, self).serialize(),
             size=version.size,
-            downloads=self.get_download_count(),
+            downloads=downloads,
             checkout=self.checkout._id if self.checkout else None,
             version=version.identifier if self.versions else None,
             contentType=version.content_type if self.versions else None,
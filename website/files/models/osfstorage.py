@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
 import os
+import re
 
 from modularodm import Q
 
@@ -8,7 +9,7 @@ from framework.auth import Auth
 from framework.guid.model import Guid
 from website.exceptions import InvalidTagError, NodeStateError, TagNotFoundError
 from website.files import exceptions
-from website.files.models.base import File, Folder, FileNode, FileVersion, TrashedFileNode
+from website.files.models.base import File, Folder, FileNode, FileVersion, StoredFileNode, TrashedFileNode
 from website.util import permissions
 
 
@@ -75,10 +76,12 @@ class OsfStorageFileNode(FileNode):
 
     @property
     def materialized_path(self):
-        """creates the full path to a the given filenode
-        Note: Possibly high complexity/ many database calls
-        USE SPARINGLY
+        """The full path to the given filenode. It is stored when the filenode
+        is saved; filenodes saved before that fall back to walking their parents.
+        Note: The fallback has high complexity/ many database calls
         """
+        if self.stored_object.materialized_path:
+            return self.stored_object.materialized_path
         if not self.parent:
             return '/'
         # Note: ODM cache can be abused here
@@ -115,7 +118,17 @@ class OsfStorageFileNode(FileNode):
     def move_under(self, destination_parent, name=None):
         if self.is_checked_out:
             raise exceptions.FileNodeCheckedOutError()
-        return super(OsfStorageFileNode, self).move_under(destination_parent, name)
+        if self.is_file or destination_parent.node._id != self.node._id:
+            # Moving across nodes has to update the node of every descendant
+            return super(OsfStorageFileNode, self).move_under(destination_parent, name)
+
+        old_path = self.materialized_path
+        self.name = name or self.name
+        self.parent = destination_parent.stored_object
+        self.save()
+        self._rewrite_descendant_paths(old_path, self.materialized_path)
+
+        return self
 
     def check_in_or_out(self, user, checkout, save=False):
         """
@@ -159,8 +172,83 @@ class OsfStorageFileNode(FileNode):
 
     def save(self):
         self.path = ''
-        self.materialized_path = ''
-        return super(OsfStorageFileNode, self).save()
+        self.materialized_path = self._build_materialized_path()
+        is_new = not self._is_loaded
+        if is_new and not self.is_file:
+            # Children are always saved after their parent
+            self.has_checked_out_descendants = False
+        fields_changed = super(OsfStorageFileNode, self).save()
+        # New filenodes only affect their ancestors if they are created checked out
+        if 'checkout' in fields_changed and (self.checkout is not None or not is_new):
+            self._update_checked_out_ancestors()
+        return fields_changed
+
+    def _build_materialized_path(self):
+        parent = self.parent
+        if parent is None:
+            return '/'
+        return '{}{}{}'.format(parent.materialized_path, self.name, '' if self.is_file else '/')
+
+    def _rewrite_descendant_paths(self, old_path, new_path):
+        """Point the stored materialized path of everything below this folder at
+        its new location, without loading or saving each descendant.
+        """
+        if old_path == new_path:
+            return
+        collection = StoredFileNode._storage[0].store
+        descendants = list(collection.find({
+            'node': self.node._id,
+            'provider': self.provider,
+            'materialized_path': {'$regex': '^' + re.escape(old_path)},
+        }, {'materialized_path': True}))
+        for descendant in descendants:
+            collection.update(
+                {'_id': descendant['_id']},
+                {'$set': {'materialized_path': new_path + descendant['materialized_path'][len(old_path):]}},
+            )
+            StoredFileNode._clear_caches(descendant['_id'])
+
+    def _ancestors(self):
+        """Load every folder above this filenode, deepest first, in one query."""
+        prefixes = []
+        path = self.materialized_path.rstrip('/')
+        while path:
+            path = path[:path.rindex('/')]
+            prefixes.append(path + '/')
+        if not prefixes:
+            return []
+        ancestors = StoredFileNode.find(
+            Q('node', 'eq', self.node) &
+            Q('provider', 'eq', self.provider) &
+            Q('is_file', 'eq', False) &
+            Q('materialized_path', 'in', prefixes)
+        )
+        return sorted(ancestors, key=lambda ancestor: len(ancestor.materialized_path), reverse=True)
+
+    def _update_checked_out_ancestors(self):
+        """Keep has_checked_out_descendants correct on every folder above this
+        filenode after its checkout changed. Folders whose flag is unknown are
+        left alone and keep scanning their children.
+        """
+        for ancestor in self._ancestors():
+            if ancestor.has_checked_out_descendants is None:
+                continue
+            if self.checkout is not None:
+                checked_out = True
+            else:
+                checked_out = StoredFileNode.find(
+                    Q('node', 'eq', self.node) &
+                    Q('provider', 'eq', self.provider) &
+                    Q('materialized_path', 'startswith', ancestor.materialized_path) &
+                    Q('_id', 'ne', ancestor._id) &
+                    Q('checkout', 'ne', None)
+                ).count() > 0
+            if ancestor.has_checked_out_descendants != checked_out:
+                ancestor.has_checked_out_descendants = checked_out
+                ancestor.save()
+            elif checked_out:
+                # Every folder further up already knows about this subtree
+                break
 
 
 class OsfStorageFile(OsfStorageFileNode, File):
@@ -175,8 +263,8 @@ class OsfStorageFile(OsfStorageFileNode, File):
     def history(self):
         return [v.metadata for v in self.versions]
 
-    def serialize(self, include_full=None, version=None):
-        ret = super(OsfStorageFile, self).serialize()
+    def serialize(self, include_full=None, version=None, downloads=None):
+        ret = super(OsfStorageFile, self).serialize(downloads=downloads)
         if include_full:
             ret['fullPath'] = self.materialized_path
 
@@ -287,6 +375,8 @@ class OsfStorageFolder(OsfStorageFileNode, Folder):
     def is_checked_out(self):
         if self.checkout:
             return True
+        if self.has_checked_out_descendants is not None:
+            return self.has_checked_out_descendants
         for child in self.children:
             if child.is_checked_out:
                 return True
@@ -3,7 +3,7 @@
 """
 
 from framework.auth.core import User
-from framework.guid.model import Guid, BlacklistGuid
+from framework.guid.model import Guid, BlacklistGuid, ReservedGuid
 from framework.sessions.model import Session
 
 from website.project.model import (
@@ -46,7 +46,7 @@ MODELS = (
     NotificationSubscription, NotificationDigest, CitationStyle,
     CitationStyle, ExternalAccount, Identifier,
     Embargo, Retraction, RegistrationApproval, EmbargoTerminationApproval,
-    ArchiveJob, ArchiveTarget, BlacklistGuid,
+    ArchiveJob, ArchiveTarget, BlacklistGuid, ReservedGuid,
     QueuedMail, AlternativeCitation,
     DraftRegistration, DraftRegistrationApproval, DraftRegistrationLog,
     NodeLicense, NodeLicenseRecord
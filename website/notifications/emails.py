@@ -1,11 +1,18 @@
 from babel import dates, core, Locale
+from modularodm import Q
 
+from framework.caching import request_cache
+from framework.mongo import ObjectId, dummy_request, get_cache_key
+from framework.postcommit_tasks.handlers import enqueue_postcommit_task
 from website import mails
+from website import settings
 from website import models as website_models
 from website.notifications import constants
 from website.notifications import utils
 from website.notifications.model import NotificationDigest
 from website.notifications.model import NotificationSubscription
+from website.notifications.model import get_root_id, get_subscription_generation, subscribers_cache
+from website.project.model import get_permission_generation
 from website.util import web_url_for
 
 
@@ -62,7 +69,8 @@ def notify_mentions(event, user, node, timestamp, **context):
 def store_emails(recipient_ids, notification_type, event, user, node, timestamp, **context):
     """Store notification emails
 
-    Emails are sent via celery beat as digests
+    Emails are sent via celery beat as digests. Within a request the digests
+    are rendered and stored once the request has committed.
     :param recipient_ids: List of user ids to send mail to.
     :param notification_type: from constants.Notification_types
     :param event: event that triggered notification
@@ -75,30 +83,50 @@ def store_emails(recipient_ids, notification_type, event, user, node, timestamp,
     if notification_type == 'none':
         return
 
+    recipient_ids = [user_id for user_id in recipient_ids if user_id != user._id]
+    if not recipient_ids:
+        return
+
+    args = (recipient_ids, notification_type, event, user, node, timestamp)
+    if get_cache_key() is not dummy_request and not settings.DEBUG_MODE:
+        enqueue_postcommit_task(store_digests, args, context, celery=False, once_per_request=False)
+    else:
+        store_digests(*args, **context)
+
+
+def store_digests(recipient_ids, notification_type, event, user, node, timestamp, **context):
+    """Render and insert the digests for `store_emails`. Recipients are loaded
+    with one query, the message is rendered once per distinct (timezone, locale)
+    and every digest is written with a single insert.
+    """
     template = event + '.html.mako'
     context['user'] = user
     node_lineage_ids = get_node_lineage(node) if node else []
 
-    for user_id in recipient_ids:
-        if user_id == user._id:
-            continue
-        recipient = website_models.User.load(user_id)
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        message = mails.render_message(template, **context)
-
-        digest = NotificationDigest(
-            timestamp=timestamp,
-            send_type=notification_type,
-            event=event,
-            user_id=user_id,
-            message=message,
-            node_lineage=node_lineage_ids
-        )
-        digest.save()
+    messages = {}
+    digests = []
+    for recipient in website_models.User.find(Q('_id', 'in', recipient_ids)):
+        key = (recipient.timezone, recipient.locale)
+        if key not in messages:
+            context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
+            messages[key] = mails.render_message(template, **context)
+        digests.append({
+            '_id': str(ObjectId()),
+            'timestamp': timestamp,
+            'send_type': notification_type,
+            'event': event,
+            'user_id': recipient._id,
+            'message': messages[key],
+            'node_lineage': node_lineage_ids,
+        })
+    if digests:
+        NotificationDigest._storage[0].store.insert(digests)
 
 
 def compile_subscriptions(node, event_type, event=None, level=0):
-    """Recurse through node and parents for subscriptions.
+    """Recurse through node and parents for subscriptions. The result for a node
+    is cached per event until subscriptions, permissions or the parent chain
+    change anywhere in the node's tree.
 
     :param node: current node
     :param event_type: Generally node_subscriptions_available
@@ -106,13 +134,37 @@ def compile_subscriptions(node, event_type, event=None, level=0):
     :param level: How deep the recursion is
     :return: a dict of notification types with lists of users.
     """
+    if level or (node.parent_id and not node.ancestor_ids):
+        # Only whole lineages are cached, and only once they are materialized
+        return resolve_subscriptions(node, event_type, event, level)
+
+    root_id = get_root_id(node)
+    key = (
+        node._id, event_type, event,
+        get_permission_generation(root_id),
+        get_subscription_generation(root_id),
+    )
+    resolved = request_cache('notification-subscribers')
+    subscriptions = resolved.get(key) if resolved is not None else None
+    if subscriptions is None:
+        subscriptions = subscribers_cache.get(key)
+        if subscriptions is None:
+            subscriptions = resolve_subscriptions(node, event_type, event)
+            subscribers_cache.set(key, subscriptions)
+        if resolved is not None:
+            resolved[key] = subscriptions
+    # Callers remove users from the lists they are given
+    return {notification_type: list(users) for notification_type, users in subscriptions.items()}
+
+
+def resolve_subscriptions(node, event_type, event=None, level=0):
     subscriptions = check_node(node, event_type)
     if event:
         subscriptions = check_node(node, event)  # Gets particular event subscriptions
-        parent_subscriptions = compile_subscriptions(node, event_type, level=level + 1)  # get node and parent subs
+        parent_subscriptions = resolve_subscriptions(node, event_type, level=level + 1)  # get node and parent subs
     elif node.parent_id:
         parent_subscriptions = \
-            compile_subscriptions(website_models.Node.load(node.parent_id), event_type, level=level + 1)
+            resolve_subscriptions(website_models.Node.load(node.parent_id), event_type, level=level + 1)
     else:
         parent_subscriptions = check_node(None, event_type)
     for notification_type in parent_subscriptions:
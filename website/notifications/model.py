@@ -1,11 +1,53 @@
+import uuid
+
+import pymongo
 from modularodm import fields
 
+from framework.caching import TieredCache, request_cache
 from framework.mongo import StoredObject, ObjectId
 from modularodm.exceptions import ValidationValueError
 
+from website import settings
 from website.project.model import Node
 from website.notifications.constants import NOTIFICATION_TYPES
 
+#: Subscribers resolved for a node and event, keyed by the node, the event and the
+#: generation tokens of the node's tree. There is no in-process tier so that a
+#: change to a subscription is seen by every process at once.
+subscribers_cache = TieredCache(
+    'notification-subscribers',
+    ttl=settings.NOTIFICATION_SUBSCRIBERS_CACHE_TTL,
+    local=False,
+)
+
+
+def get_root_id(node):
+    return node.ancestor_ids[0] if node.ancestor_ids else node._id
+
+
+def get_subscription_generation(root_id):
+    """Return a token identifying the current state of the subscriptions in the
+    node tree under `root_id`. The token is replaced by `invalidate_subscribers_cache`.
+    """
+    generations = request_cache('subscription-generations')
+    if generations is not None and root_id in generations:
+        return generations[root_id]
+    generation = subscribers_cache.get(('generation', root_id))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        subscribers_cache.set(('generation', root_id), generation)
+    if generations is not None:
+        generations[root_id] = generation
+    return generation
+
+
+def invalidate_subscribers_cache(root_id):
+    """Drop every subscriber list resolved in the node tree under `root_id`."""
+    subscribers_cache.set(('generation', root_id), uuid.uuid4().hex)
+    generations = request_cache('subscription-generations')
+    if generations is not None:
+        generations.pop(root_id, None)
+
 
 def validate_subscription_type(value):
     if value not in NOTIFICATION_TYPES:
@@ -23,6 +65,12 @@ class NotificationSubscription(StoredObject):
     email_digest = fields.ForeignField('user', list=True)
     email_transactional = fields.ForeignField('user', list=True)
 
+    def save(self, *args, **kwargs):
+        saved_fields = super(NotificationSubscription, self).save(*args, **kwargs)
+        if isinstance(self.owner, Node):
+            invalidate_subscribers_cache(get_root_id(self.owner))
+        return saved_fields
+
     def add_user_to_subscription(self, user, notification_type, save=True):
         for nt in NOTIFICATION_TYPES:
             if user in getattr(self, nt):
@@ -60,6 +108,15 @@ class NotificationSubscription(StoredObject):
 
 
 class NotificationDigest(StoredObject):
+    # Pending digests are read per send type, in order of user and time
+    __indices__ = [{
+        'key_or_list': [
+            ('send_type', pymongo.ASCENDING),
+            ('user_id', pymongo.ASCENDING),
+            ('timestamp', pymongo.ASCENDING),
+        ]
+    }]
+
     _id = fields.StringField(primary=True, default=lambda: str(ObjectId()))
     user_id = fields.StringField(index=True)
     timestamp = fields.DateTimeField()
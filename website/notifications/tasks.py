@@ -1,7 +1,9 @@
 """
 Tasks for making even transactional emails consolidated.
 """
-from bson.code import Code
+import itertools
+import operator
+
 from modularodm import Q
 
 from framework.celery_tasks import app as celery_app
@@ -9,40 +11,88 @@ from framework.mongo import database as db
 from framework.auth.core import User
 from framework.sentry import log_exception
 
-from framework.transactions.context import TokuTransaction
-
 from website.notifications.utils import NotificationsDict
 from website.notifications.model import NotificationDigest
-from website import mails
+from website import mails, settings
 
 
 @celery_app.task(name='website.notifications.tasks.send_users_email', max_retries=0)
 def send_users_email(send_type):
     """Find pending Emails and amalgamates them into a single Email.
 
+    Users are handled in chunks of ``NOTIFICATION_DIGEST_CHUNK_SIZE``: the
+    digests of a chunk are mailed, then every digest that was sent is removed
+    at once.
+
     :param send_type
     :return:
     """
-    grouped_emails = get_users_emails(send_type)
-    if not grouped_emails:
-        return
-    for group in grouped_emails:
-        user = User.load(group['user_id'])
-        if not user:
-            log_exception()
-            continue
-        info = group['info']
-        notification_ids = [message['_id'] for message in info]
-        sorted_messages = group_by_node(info)
-        if sorted_messages:
+    for groups in iter_users_emails(send_type):
+        users = {
+            user._id: user
+            for user in User.find(Q('_id', 'in', [group['user_id'] for group in groups]))
+        }
+        sent = [send_digest(users.get(group['user_id']), group) for group in groups]
+        remove_notifications(email_notification_ids=[_id for ids in sent for _id in ids])
+
+
+def send_digest(user, group):
+    """Mail the digest of a single user.
+
+    :return: Ids of the digests that were sent, none if mailing failed so
+        that they are sent again on the next run
+    """
+    if not user:
+        log_exception()
+        return []
+    info = group['info']
+    sorted_messages = group_by_node(info)
+    if sorted_messages:
+        try:
             mails.send_mail(
                 to_addr=user.username,
                 mimetype='html',
                 mail=mails.DIGEST,
                 name=user.fullname,
                 message=sorted_messages,
-                callback=remove_notifications(email_notification_ids=notification_ids)
             )
+        except Exception:
+            log_exception()
+            return []
+    return [message['_id'] for message in info]
+
+
+def iter_users_emails(send_type, chunk_size=None):
+    """Stream the pending emails of `get_users_emails` in chunks of up to
+    ``chunk_size`` users. Digests are read from a single cursor sorted by user,
+    so no result ever has to hold the digests of every user.
+
+    :param send_type: from NOTIFICATION_TYPES
+    :param int chunk_size: Number of users per chunk
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_DIGEST_CHUNK_SIZE
+    digests = db['notificationdigest'].find(
+        {'send_type': send_type},
+        {'user_id': True, 'message': True, 'node_lineage': True},
+    ).sort([('user_id', 1), ('timestamp', 1)])
+    chunk = []
+    for user_id, user_digests in itertools.groupby(digests, key=operator.itemgetter('user_id')):
+        chunk.append({
+            'user_id': user_id,
+            'info': [
+                {
+                    'message': digest['message'],
+                    'node_lineage': digest['node_lineage'],
+                    '_id': digest['_id'],
+                }
+                for digest in user_digests
+            ],
+        })
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def get_users_emails(send_type):
@@ -65,26 +115,7 @@ def get_users_emails(send_type):
                 'user_id': ...
               }]
     """
-    with TokuTransaction():
-        emails = db['notificationdigest'].group(
-            key={'user_id': 1},
-            condition={
-                'send_type': send_type
-            },
-            initial={'info': []},
-            reduce=Code(
-                """
-                function(curr, result) {
-                    result.info.push({
-                        'message': curr.message,
-                        'node_lineage': curr.node_lineage,
-                        '_id': curr._id
-                    });
-                };
-                """
-            )
-        )
-    return emails
+    return list(itertools.chain.from_iterable(iter_users_emails(send_type)))
 
 
 def group_by_node(notifications):
@@ -100,10 +131,13 @@ def group_by_node(notifications):
 
 
 def remove_notifications(email_notification_ids=None):
-    """Remove sent emails.
+    """Remove sent emails with a single delete.
 
     :param email_notification_ids:
     :return:
     """
+    if not email_notification_ids:
+        return
+    NotificationDigest._storage[0].store.remove({'_id': {'$in': email_notification_ids}})
     for email_id in email_notification_ids:
-        NotificationDigest.remove(Q('_id', 'eq', email_id))
+        NotificationDigest._clear_caches(email_id)
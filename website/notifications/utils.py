@@ -80,6 +80,7 @@ def remove_subscription(node):
 def remove_subscription_task(node_id):
     node = Node.load(node_id)
     model.NotificationSubscription.remove(Q('owner', 'eq', node))
+    model.invalidate_subscribers_cache(model.get_root_id(node))
     parent = node.parent_node
 
     if parent and parent.child_node_subscriptions:
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 import itertools
 import functools
+import collections
 import os
 import re
 import logging
 import pymongo
 import datetime
 import urlparse
+import uuid
 import warnings
 import jsonschema
 
@@ -21,12 +23,14 @@ from modularodm.exceptions import NoResultsFound
 from modularodm.exceptions import ValidationValueError
 
 from framework import status
+from framework.caching import TieredCache, request_cache
 from framework.mongo import ObjectId
 from framework.mongo import StoredObject
 from framework.mongo import validators
 from framework.addons import AddonModelMixin
 from framework.auth import get_user, User, Auth
 from framework.exceptions import PermissionsError
+from framework.routing import invalidate_fragments
 from framework.guid.model import GuidStoredObject, Guid
 from framework.auth.utils import privacy_info_handle
 from framework.analytics import tasks as piwik_tasks
@@ -61,6 +65,7 @@ from website.project.licenses import (
     NodeLicenseRecord,
 )
 from website.project import signals as project_signals
+from website.project import statistics as node_statistics
 from website.project.spam.model import SpamMixin
 from website.project.sanctions import (
     DraftRegistrationApproval,
@@ -74,6 +79,34 @@ from keen import scoped_keys
 
 logger = logging.getLogger(__name__)
 
+#: Resolved inherited-admin bits, keyed by (user, node, tree generation). There is
+#: no in-process tier so that a revoked permission is seen by every process at once.
+admin_ancestor_cache = TieredCache('admin-ancestor', ttl=settings.PERMISSION_CACHE_TTL, local=False)
+
+
+def get_permission_generation(root_id):
+    """Return a token identifying the current permission state of the node tree
+    under `root_id`. The token is replaced by `invalidate_permission_cache`.
+    """
+    generations = request_cache('permission-generations')
+    if generations is not None and root_id in generations:
+        return generations[root_id]
+    generation = admin_ancestor_cache.get(('generation', root_id))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        admin_ancestor_cache.set(('generation', root_id), generation)
+    if generations is not None:
+        generations[root_id] = generation
+    return generation
+
+
+def invalidate_permission_cache(root_id):
+    """Drop every cached permission resolved in the node tree under `root_id`."""
+    admin_ancestor_cache.set(('generation', root_id), uuid.uuid4().hex)
+    generations = request_cache('permission-generations')
+    if generations is not None:
+        generations.pop(root_id, None)
+
 
 def has_anonymous_link(node, auth):
     """check if the node is anonymous to the user
@@ -450,6 +483,13 @@ class NodeLog(StoredObject):
             ('should_hide', 1),
             ('date', -1)
         ]
+    }, {
+        # Recent logs of a few nodes, e.g. watched nodes: each node's logs in
+        # the window are found by range, then the small result is sorted
+        'key_or_list': [
+            ('node', 1),
+            ('date', -1)
+        ]
     }]
 
     date = fields.DateTimeField(default=datetime.datetime.utcnow, index=True)
@@ -583,6 +623,32 @@ class NodeLog(StoredObject):
         log_clone.save()
         return log_clone
 
+    @classmethod
+    def clone_node_logs(cls, original_node_id, node_id, batch_size=1000):
+        """
+        Copy every log of one node to another with batched inserts, instead of loading and
+        saving each log like `clone_node_log`.
+        :param original_node_id: node whose logs are copied
+        :param node_id: node the copies are attached to
+        :param batch_size: number of logs inserted per round trip
+        :return: number of logs cloned
+        """
+        collection = cls._storage[0].store
+        count = 0
+        batch = []
+        for log in collection.find({'node': original_node_id}).sort('date', pymongo.ASCENDING):
+            log['_id'] = str(ObjectId())
+            log['node'] = node_id
+            batch.append(log)
+            if len(batch) >= batch_size:
+                collection.insert(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            collection.insert(batch)
+            count += len(batch)
+        return count
+
     @property
     def tz_date(self):
         '''Return the timezone-aware date.
@@ -832,6 +898,31 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         '_affiliated_institutions',
     }
 
+    # Node fields copied into the search documents of the node's files
+    FILE_SEARCH_FIELDS = {
+        'title',
+        'is_registration',
+        'retraction',
+        'is_retracted',
+    }
+
+    # Node fields that decide whether the node's files are searchable at all
+    FILE_VISIBILITY_FIELDS = {
+        'is_public',
+        'is_deleted',
+    }
+
+    # Node fields that invalidate cached permissions in the node's tree on save
+    PERMISSION_CACHE_FIELDS = {
+        'permissions',
+        'contributors',
+        'parent_node',
+        'is_public',
+        'is_deleted',
+        'nodes',
+        'ancestor_ids',
+    }
+
     # Fields that are writable by Node.update
     WRITABLE_WHITELIST = [
         'title',
@@ -922,6 +1013,11 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
     root = fields.ForeignField('node', index=True)
     parent_node = fields.ForeignField('node', index=True)
 
+    # Materialized ids of all primary ancestors, root first:
+    # [<root._id>, ..., <parent._id>]. Maintained on save so that a whole subtree
+    # or ancestor chain can be fetched in a single query.
+    ancestor_ids = fields.StringField(list=True, index=True)
+
     # The node (if any) used as a template for this node's creation
     template_node = fields.ForeignField('node', index=True)
 
@@ -1181,9 +1277,33 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
     def is_admin_parent(self, user):
         if self.has_permission(user, 'admin', check_parent=False):
             return True
-        if self.parent_node:
-            return self.parent_node.is_admin_parent(user)
-        return False
+        return self.has_admin_ancestor(user)
+
+    def has_admin_ancestor(self, user):
+        """Whether `user` is an admin on any ancestor of this node. Resolved once
+        per (user, node) and cached for the request and in the shared cache tier
+        until a permission-related field changes anywhere in the node's tree.
+        """
+        if user is None:
+            return False
+        if not self.ancestor_ids:
+            # Top-level node, or lineage not yet materialized
+            return bool(self.parent_node and self.parent_node.is_admin_parent(user))
+
+        key = (user._id, self._id, get_permission_generation(self.ancestor_ids[0]))
+        resolved = request_cache('admin-ancestor')
+        if resolved is not None and key in resolved:
+            return resolved[key]
+        is_admin = admin_ancestor_cache.get(key)
+        if is_admin is None:
+            is_admin = any(
+                ADMIN in parent.permissions.get(user._id, [])
+                for parent in self.parents
+            )
+            admin_ancestor_cache.set(key, is_admin)
+        if resolved is not None:
+            resolved[key] = is_admin
+        return is_admin
 
     def can_view(self, auth):
         if auth and getattr(auth.private_link, 'anonymous', False):
@@ -1195,7 +1315,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         return (
             self.is_public or
             (auth.user and self.has_permission(auth.user, 'read')) or
-            auth.private_key in self.private_link_keys_active or
+            (auth.private_key and auth.private_key in self.private_link_keys_active) or
             self.is_admin_parent(auth.user)
         )
 
@@ -1299,18 +1419,19 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
             return self.is_admin_parent(user)
         return False
 
-    def has_permission_on_children(self, user, permission):
+    def has_permission_on_children(self, user, permission, _subtree=None):
         """Checks if the given user has a given permission on any child nodes
             that are not registrations or deleted
         """
         if self.has_permission(user, permission):
             return True
 
-        for node in self.nodes:
+        subtree = _subtree if _subtree is not None else self._load_subtree()
+        for node in self._get_children(subtree):
             if not node.primary or node.is_deleted:
                 continue
 
-            if node.has_permission_on_children(user, permission):
+            if node.has_permission_on_children(user, permission, _subtree=subtree):
                 return True
 
         return False
@@ -1325,12 +1446,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
                 return next_parent
             next_parent = next_parent.parent_node
 
-    def find_readable_descendants(self, auth):
+    def find_readable_descendants(self, auth, _subtree=None):
         """ Returns a generator of first descendant node(s) readable by <user>
         in each descendant branch.
         """
+        subtree = _subtree if _subtree is not None else self._load_subtree()
         new_branches = []
-        for node in self.nodes:
+        for node in self._get_children(subtree):
             if not node.primary or node.is_deleted:
                 continue
 
@@ -1340,7 +1462,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
                 new_branches.append(node)
 
         for bnode in new_branches:
-            for node in bnode.find_readable_descendants(auth):
+            for node in bnode.find_readable_descendants(auth, _subtree=subtree):
                 yield node
 
     def has_addon_on_children(self, addon):
@@ -1382,9 +1504,23 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
 
     @property
     def parents(self):
-        if self.parent_node:
+        if not self.parent_node:
+            return []
+        if not self.ancestor_ids:
+            # Lineage not yet materialized for this node; walk the chain instead
             return [self.parent_node] + self.parent_node.parents
-        return []
+        ancestors = {
+            node._id: node
+            for node in Node.find(Q('_id', 'in', self.ancestor_ids))
+        }
+        ret = []
+        # A deleted ancestor ends the chain, as it does for `parent_node`
+        for ancestor_id in reversed(self.ancestor_ids):
+            ancestor = ancestors.get(ancestor_id)
+            if ancestor is None or ancestor.is_deleted:
+                break
+            ret.append(ancestor)
+        return ret
 
     @property
     def admin_contributor_ids(self, contributors=None):
@@ -1642,10 +1778,24 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
 
         self.root = self._root._id
         self.parent_node = self._parent_node
+        if self.node__parent:
+            parent = self.node__parent[0]
+            self.ancestor_ids = (parent.ancestor_ids or []) + [parent._id]
+        else:
+            self.ancestor_ids = []
 
         # If you're saving a property, do it above this super call
         saved_fields = super(Node, self).save(*args, **kwargs)
 
+        if {'nodes', 'ancestor_ids'}.intersection(saved_fields):
+            self.update_descendant_ancestor_ids()
+        if self.PERMISSION_CACHE_FIELDS.intersection(saved_fields):
+            invalidate_permission_cache(self.ancestor_ids[0] if self.ancestor_ids else self._id)
+        if saved_fields:
+            invalidate_fragments(self._id)
+        if first_save or {'is_deleted', 'nodes'}.intersection(saved_fields):
+            self.update_related_statistics(saved_fields, first_save)
+
         if first_save and is_original and not suppress_log:
             # TODO: This logic also exists in self.use_as_template()
             for addon in settings.ADDONS_AVAILABLE:
@@ -1684,7 +1834,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         if self.is_collection or self.archiving:
             need_update = False
         if need_update:
-            self.update_search()
+            if self.FILE_VISIBILITY_FIELDS.intersection(saved_fields):
+                update_files = 'all'
+            elif self.FILE_SEARCH_FIELDS.intersection(saved_fields):
+                update_files = 'node_fields'
+            else:
+                update_files = None
+            self.update_search(update_files=update_files)
 
         if 'node_license' in saved_fields:
             children = [c for c in self.get_descendants_recursive(
@@ -1803,6 +1959,22 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
     # Pointers #
     ############
 
+    def update_related_statistics(self, saved_fields, first_save=False):
+        """Recompute the statistics of the nodes that count this one as a
+        fork, template, registration or pointer parent.
+        """
+        if first_save or 'is_deleted' in saved_fields:
+            if self.forked_from and not self.is_registration:
+                node_statistics.update_node_statistics(self.forked_from, 'fork_count')
+            if self.template_node:
+                node_statistics.update_node_statistics(self.template_node, 'templated_count')
+        if first_save and self.registered_from:
+            node_statistics.update_node_statistics(self.registered_from, 'registration_count')
+        # Pointers from collections are not counted
+        if not self.is_collection:
+            for pointer in self.nodes_pointer:
+                node_statistics.update_node_statistics(pointer.node, 'points')
+
     def add_pointer(self, node, auth, save=True):
         """Add a pointer to a node.
 
@@ -1873,6 +2045,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         # Remove `Pointer` object; will also remove self from `nodes` list of
         # parent node
         Pointer.remove_one(pointer)
+        node_statistics.update_node_statistics(pointer.node, 'points')
 
         # Add log
         self.add_log(
@@ -1917,31 +2090,115 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
     def depth(self):
         return len(self.parents)
 
-    def next_descendants(self, auth, condition=lambda auth, node: True):
+    def next_descendants(self, auth, condition=lambda auth, node: True, _subtree=None):
         """
         Recursively find the first set of descedants under a given node that meet a given condition
 
         returns a list of [(node, [children]), ...]
         """
+        subtree = _subtree if _subtree is not None else self._load_subtree()
         ret = []
-        for node in self.nodes:
+        for node in self._get_children(subtree):
             if condition(auth, node):
                 # base case
                 ret.append((node, []))
+            elif node.primary:
+                ret.append((node, node.next_descendants(auth, condition, _subtree=subtree)))
             else:
                 ret.append((node, node.next_descendants(auth, condition)))
         ret = [item for item in ret if item[1] or condition(auth, item[0])]  # prune empty branches
         return ret
 
-    def get_descendants_recursive(self, include=lambda n: True):
-        for node in self.nodes:
+    def get_descendants_recursive(self, include=lambda n: True, _subtree=None):
+        subtree = _subtree if _subtree is not None else self._load_subtree()
+        for node in self._get_children(subtree):
             if include(node):
                 yield node
             if node.primary:
-                for descendant in node.get_descendants_recursive(include):
+                for descendant in node.get_descendants_recursive(include, _subtree=subtree):
                     if include(descendant):
                         yield descendant
 
+    @property
+    def primary_node_ids(self):
+        """Primary keys of the primary (non-pointer) children in `nodes`,
+        read without dereferencing them.
+        """
+        return [
+            key for key, schema in self.nodes._to_data()
+            if schema == self._name
+        ]
+
+    def _load_subtree(self):
+        """Fetch every primary descendant of this node and the pointers they
+        contain using the `ancestor_ids` index, one query per collection.
+
+        :returns: dict mapping (primary key, schema name) pairs to records
+        """
+        subtree = {
+            (node._id, node._name): node
+            for node in Node.find(Q('ancestor_ids', 'eq', self._id))
+        }
+        pointer_ids = [
+            key
+            for node in itertools.chain([self], subtree.values())
+            for key, schema in node.nodes._to_data()
+            if schema == Pointer._name
+        ]
+        if pointer_ids:
+            subtree.update({
+                (pointer._id, pointer._name): pointer
+                for pointer in Pointer.find(Q('_id', 'in', pointer_ids))
+            })
+        return subtree
+
+    def _get_children(self, subtree):
+        """Yield the records in `nodes`, taking them from a preloaded `subtree`
+        and only falling back to a load for children the index missed.
+        """
+        for key, schema in self.nodes._to_data():
+            child = subtree.get((key, schema))
+            if child is None:
+                child = self.nodes.get_foreign_object((key, schema))
+            if child is not None:
+                yield child
+
+    def update_descendant_ancestor_ids(self):
+        """Rewrite the materialized lineage of every primary descendant to
+        hang under this node's current lineage. Each subtree is found through
+        the existing index and updated with one write per distinct lineage.
+        """
+        child_ids = self.primary_node_ids
+        if not child_ids:
+            return
+        lineage = (self.ancestor_ids or []) + [self._id]
+        descendants = Node.find(
+            Q('_id', 'in', child_ids) |
+            Q('ancestor_ids', 'in', child_ids)
+        )
+        updates = collections.defaultdict(list)
+        for node in descendants:
+            if node._id in child_ids:
+                new_ancestor_ids = lineage
+            else:
+                old_ancestor_ids = node.ancestor_ids or []
+                start = min(
+                    old_ancestor_ids.index(child_id)
+                    for child_id in child_ids
+                    if child_id in old_ancestor_ids
+                )
+                new_ancestor_ids = lineage + old_ancestor_ids[start:]
+            if new_ancestor_ids != node.ancestor_ids:
+                updates[tuple(new_ancestor_ids)].append(node._id)
+        for new_ancestor_ids, node_ids in updates.iteritems():
+            Node._storage[0].store.update(
+                {'_id': {'$in': node_ids}},
+                {'$set': {'ancestor_ids': list(new_ancestor_ids)}},
+                multi=True,
+            )
+            for node_id in node_ids:
+                Node._clear_caches(node_id)
+
     def get_aggregate_logs_query(self, auth):
         ids = [self._id] + [n._id
                             for n in self.get_descendants_recursive()
@@ -2057,6 +2314,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
             # removing pointer, else remove will fail when trying to remove
             # backref from self to pointer.
             Pointer.remove_one(pointer)
+            node_statistics.update_node_statistics(pointer.node, 'points')
 
         # Return forked content
         return forked
@@ -2126,10 +2384,10 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
             self.save()
         return None
 
-    def update_search(self):
+    def update_search(self, update_files='all'):
         from website import search
         try:
-            search.search.update_node(self, bulk=False, async=True)
+            search.search.update_node(self, bulk=False, async=True, update_files=update_files)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
@@ -2154,10 +2412,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
 
     def delete_registration_tree(self, save=False):
         self.is_deleted = True
+        registered_from = self.registered_from
         if not getattr(self.embargo, 'for_existing_registration', False):
             self.registered_from = None
         if save:
             self.save()
+            if registered_from:
+                node_statistics.update_node_statistics(registered_from, 'registration_count')
         self.update_search()
         for child in self.nodes_primary:
             child.delete_registration_tree(save=save)
@@ -2323,9 +2584,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         )
 
         # Clone each log from the original node for this fork.
-        logs = original.logs
-        for log in logs:
-            log.clone_node_log(forked._id)
+        NodeLog.clone_node_logs(original._id, forked._id)
 
         forked.reload()
 
@@ -2389,9 +2648,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         registered.save()
 
         # Clone each log from the original node for this registration.
-        logs = original.logs
-        for log in logs:
-            log.clone_node_log(registered._id)
+        NodeLog.clone_node_logs(original._id, registered._id)
 
         registered.is_public = False
         for node in registered.get_descendants_recursive():
@@ -2549,6 +2806,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin, Commentable):
         if log_date:
             log.date = log_date
         log.save()
+        node_statistics.record_log(self, log.date)
 
         if len(self.logs) == 1:
             self.date_modified = log.date.replace(tzinfo=None)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Denormalized statistics shown on the project overview page.
+
+Counting a node's registrations, forks, watchers etc. takes a query each, so
+the counts are kept in one ``nodestatistics`` document per node instead, read
+with a single query. The actions that change a count recompute it (or, for
+comments and logs, update it in place); fields missing from a document are
+computed the first time it is read, and :func:`repair_node_statistics`
+recomputes every field in bulk should the documents drift.
+"""
+import logging
+from collections import defaultdict
+
+from modularodm import Q
+
+from framework.mongo import database
+from website import settings
+from website.project import signals as project_signals
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'nodestatistics'
+
+
+def _count_comments(node):
+    from website.project.model import Comment  # Avoid circular import
+    return Comment.find(Q('node', 'eq', node._id)).count()
+
+
+def _last_logged(node):
+    from website.project.model import NodeLog  # Avoid circular import
+    latest = NodeLog._storage[0].store.find_one(
+        {'node': node._id},
+        {'date': True},
+        sort=[('date', -1)],
+    )
+    return latest['date'] if latest else None
+
+
+# Functions computing each statistic of a node from scratch
+STATISTICS = {
+    'registration_count': lambda node: node.registrations_all.count(),
+    'fork_count': lambda node: node.forks.count(),
+    'templated_count': lambda node: node.templated_list.count(),
+    'watched_count': lambda node: node.watches.count(),
+    'points': lambda node: len(node.get_points(deleted=False, folders=False)),
+    'has_comments': lambda node: _count_comments(node) > 0,
+    'last_logged': _last_logged,
+}
+
+
+def get_collection():
+    return database[COLLECTION]
+
+
+def get_node_statistics(node):
+    """Return the statistics of ``node`` as a dict keyed by the names in
+    ``STATISTICS``, computing and storing any that have not been yet.
+    """
+    stats = get_collection().find_one({'_id': node._id}) or {}
+    missing = [field for field in STATISTICS if field not in stats]
+    if missing:
+        stats.update(update_node_statistics(node, *missing))
+    return stats
+
+
+def update_node_statistics(node, *fields):
+    """Recompute ``fields`` of the statistics of ``node`` and store them.
+
+    :return: Dict of the recomputed fields
+    """
+    values = {field: STATISTICS[field](node) for field in fields}
+    if values:
+        get_collection().update({'_id': node._id}, {'$set': values}, upsert=True)
+    return values
+
+
+def record_log(node, date):
+    """Move ``last_logged`` of ``node`` forward to ``date`` if it is older."""
+    get_collection().update(
+        {
+            '_id': node._id,
+            '$or': [
+                {'last_logged': {'$lt': date}},
+                {'last_logged': {'$type': 10}},  # Stored before the node had any logs
+            ],
+        },
+        {'$set': {'last_logged': date}},
+    )
+
+
+@project_signals.comment_added.connect
+def record_comment(comment, **kwargs):
+    get_collection().update(
+        {'_id': comment.node._id},
+        {'$set': {'has_comments': True}},
+        upsert=True,
+    )
+
+
+def _group(store, query, key, accumulator=None):
+    """Run ``query`` on ``store`` and return a dict mapping each value of
+    ``key`` to the number of matching documents, or to ``accumulator`` if given.
+    """
+    result = store.aggregate([
+        {'$match': query},
+        {'$group': {'_id': '$' + key, 'value': accumulator or {'$sum': 1}}},
+    ])
+    return {each['_id']: each['value'] for each in result['result']}
+
+
+def _count_points(node_ids):
+    from website.project.model import Node, Pointer  # Avoid circular import
+    pointers = {
+        each['_id']: each['node']
+        for each in Pointer._storage[0].store.find({'node': {'$in': node_ids}}, {'node': True})
+    }
+    counts = defaultdict(int)
+    if not pointers:
+        return counts
+    # Node#nodes stores (primary key, collection name) pairs
+    parents = Node._storage[0].store.find(
+        {
+            'nodes': {'$in': [[pointer_id, Pointer._name] for pointer_id in pointers]},
+            'is_deleted': {'$ne': True},
+            'is_collection': {'$ne': True},
+        },
+        {'nodes': True},
+    )
+    for parent in parents:
+        for pointer_id, _ in parent['nodes']:
+            if pointer_id in pointers:
+                counts[pointers[pointer_id]] += 1
+    return counts
+
+
+def compute_statistics_in_bulk(node_ids):
+    """Compute every statistic of the nodes with ``node_ids`` with a query
+    per statistic rather than per node.
+
+    :return: Dict mapping each node id to its statistics
+    """
+    from website.project.model import Comment, Node, NodeLog, WatchConfig  # Avoid circular import
+    nodes = Node._storage[0].store
+    registrations = _group(nodes, {'registered_from': {'$in': node_ids}}, 'registered_from')
+    forks = _group(nodes, {
+        'forked_from': {'$in': node_ids},
+        'is_deleted': False,
+        'is_registration': {'$ne': True},
+    }, 'forked_from')
+    templated = _group(nodes, {
+        'template_node': {'$in': node_ids},
+        'is_deleted': {'$ne': True},
+    }, 'template_node')
+    watches = _group(WatchConfig._storage[0].store, {'node': {'$in': node_ids}}, 'node')
+    comments = _group(Comment._storage[0].store, {'node': {'$in': node_ids}}, 'node')
+    last_logged = _group(NodeLog._storage[0].store, {'node': {'$in': node_ids}}, 'node', {'$max': '$date'})
+    points = _count_points(node_ids)
+    return {
+        node_id: {
+            'registration_count': registrations.get(node_id, 0),
+            'fork_count': forks.get(node_id, 0),
+            'templated_count': templated.get(node_id, 0),
+            'watched_count': watches.get(node_id, 0),
+            'points': points.get(node_id, 0),
+            'has_comments': node_id in comments,
+            'last_logged': last_logged.get(node_id),
+        }
+        for node_id in node_ids
+    }
+
+
+def repair_node_statistics(node_ids=None, chunk_size=None):
+    """Recompute and store the statistics of the nodes with ``node_ids``, or
+    of every node, ``chunk_size`` nodes at a time.
+
+    :return: Number of nodes whose statistics were stored
+    """
+    from website.project.model import Node  # Avoid circular import
+    chunk_size = chunk_size or settings.NODE_STATISTICS_REPAIR_CHUNK_SIZE
+    if node_ids is None:
+        node_ids = (each['_id'] for each in Node._storage[0].store.find({}, {'_id': True}))
+    collection = get_collection()
+    count = 0
+    chunk = []
+    for node_id in node_ids:
+        chunk.append(node_id)
+        if len(chunk) < chunk_size:
+            continue
+        count += _store_statistics(collection, chunk)
+        chunk = []
+    if chunk:
+        count += _store_statistics(collection, chunk)
+    logger.info('Repaired statistics of {} nodes'.format(count))
+    return count
+
+
+def _store_statistics(collection, node_ids):
+    for node_id, stats in compute_statistics_in_bulk(node_ids).items():
+        collection.update({'_id': node_id}, {'$set': stats}, upsert=True)
+    return len(node_ids)
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+from framework.celery_tasks import app
+from website.project import statistics
+
+
+@app.task(ignore_result=True)
+def repair_node_statistics(node_ids=None):
+    statistics.repair_node_statistics(node_ids=node_ids)
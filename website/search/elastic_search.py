@@ -2,11 +2,13 @@
 
 from __future__ import division
 
+import collections
 import copy
 import functools
 import logging
 import math
 import re
+import time
 import unicodedata
 
 from elasticsearch import (
@@ -282,78 +284,83 @@ def get_doctype_from_node(node):
         return node.category
 
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_node_async(self, node_id, index=None, bulk=False):
+def update_node_async(self, node_id, index=None, bulk=False, update_files='all'):
     node = Node.load(node_id)
     try:
-        update_node(node=node, index=index, bulk=bulk)
+        update_node(node=node, index=index, bulk=bulk, update_files=update_files)
     except Exception as exc:
         self.retry(exc=exc)
 
-@requires_search
-def update_node(node, index=None, bulk=False):
-    index = index or INDEX
+def serialize_node(node, category):
     from website.addons.wiki.model import NodeWikiPage
 
-    category = get_doctype_from_node(node)
+    try:
+        normalized_title = six.u(node.title)
+    except TypeError:
+        normalized_title = node.title
+    normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
 
-    elastic_document_id = node._id
-    parent_id = node.parent_id
+    elastic_document = {
+        'id': node._id,
+        'contributors': [
+            {
+                'fullname': x.fullname,
+                'url': x.profile_url if x.is_active else None
+            }
+            for x in node.visible_contributors
+            if x is not None
+        ],
+        'title': node.title,
+        'normalized_title': normalized_title,
+        'category': category,
+        'public': node.is_public,
+        'tags': [tag._id for tag in node.tags if tag],
+        'description': node.description,
+        'url': node.url,
+        'is_registration': node.is_registration,
+        'is_pending_registration': node.is_pending_registration,
+        'is_retracted': node.is_retracted,
+        'is_pending_retraction': node.is_pending_retraction,
+        'embargo_end_date': node.embargo_end_date.strftime('%A, %b. %d, %Y') if node.embargo_end_date else False,
+        'is_pending_embargo': node.is_pending_embargo,
+        'registered_date': node.registered_date,
+        'wikis': {},
+        'parent_id': node.parent_id,
+        'date_created': node.date_created,
+        'license': serialize_node_license_record(node.license),
+        'affiliated_institutions': [inst.name for inst in node.affiliated_institutions],
+        'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+    }
+    if not node.is_retracted:
+        for wiki in [
+            NodeWikiPage.load(x)
+            for x in node.wiki_pages_current.values()
+        ]:
+            elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
+    return elastic_document
 
-    from website.files.models.osfstorage import OsfStorageFile
-    for file_ in paginated(OsfStorageFile, Q('node', 'eq', node)):
-        update_file(file_, index=index)
+@requires_search
+def update_node(node, index=None, bulk=False, update_files='all'):
+    """Index ``node``, or remove it from the index if it should not be searchable.
 
-    if node.is_deleted or not node.is_public or node.archiving:
-        delete_doc(elastic_document_id, node, index=index)
-    else:
-        try:
-            normalized_title = six.u(node.title)
-        except TypeError:
-            normalized_title = node.title
-        normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
-
-        elastic_document = {
-            'id': elastic_document_id,
-            'contributors': [
-                {
-                    'fullname': x.fullname,
-                    'url': x.profile_url if x.is_active else None
-                }
-                for x in node.visible_contributors
-                if x is not None
-            ],
-            'title': node.title,
-            'normalized_title': normalized_title,
-            'category': category,
-            'public': node.is_public,
-            'tags': [tag._id for tag in node.tags if tag],
-            'description': node.description,
-            'url': node.url,
-            'is_registration': node.is_registration,
-            'is_pending_registration': node.is_pending_registration,
-            'is_retracted': node.is_retracted,
-            'is_pending_retraction': node.is_pending_retraction,
-            'embargo_end_date': node.embargo_end_date.strftime('%A, %b. %d, %Y') if node.embargo_end_date else False,
-            'is_pending_embargo': node.is_pending_embargo,
-            'registered_date': node.registered_date,
-            'wikis': {},
-            'parent_id': parent_id,
-            'date_created': node.date_created,
-            'license': serialize_node_license_record(node.license),
-            'affiliated_institutions': [inst.name for inst in node.affiliated_institutions],
-            'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
-        }
-        if not node.is_retracted:
-            for wiki in [
-                NodeWikiPage.load(x)
-                for x in node.wiki_pages_current.values()
-            ]:
-                elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
+    :param str update_files: How to bring the docs of the node's files in line:
+        'all' re-serializes every file, 'node_fields' only rewrites the node fields
+        copied into file docs and None leaves them alone
+    """
+    index = index or INDEX
+
+    if update_files:
+        update_node_files(node, index=index, node_fields_only=update_files == 'node_fields')
 
+    if not is_searchable(node):
+        delete_doc(node._id, node, index=index)
+    else:
+        category = get_doctype_from_node(node)
+        elastic_document = serialize_node(node, category)
         if bulk:
             return elastic_document
         else:
-            es.index(index=index, doc_type=category, id=elastic_document_id, body=elastic_document, refresh=True)
+            es.index(index=index, doc_type=category, id=node._id, body=elastic_document, refresh=settings.ELASTIC_REFRESH)
 
 def bulk_update_nodes(serialize, nodes, index=None):
     """Updates the list of input projects
@@ -394,17 +401,7 @@ def serialize_contributors(node):
 bulk_update_contributors = functools.partial(bulk_update_nodes, serialize_contributors)
 
 
-@requires_search
-def update_user(user, index=None):
-
-    index = index or INDEX
-    if not user.is_active:
-        try:
-            es.delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
-        except NotFoundError:
-            pass
-        return
-
+def serialize_user(user):
     names = dict(
         fullname=user.fullname,
         given_name=user.given_name,
@@ -422,7 +419,7 @@ def update_user(user, index=None):
                 pass  # This is fine, will only happen in 2.x if val is already unicode
             normalized_names[key] = unicodedata.normalize('NFKD', val).encode('ascii', 'ignore')
 
-    user_doc = {
+    return {
         'id': user._id,
         'user': user.fullname,
         'normalized_user': normalized_names['fullname'],
@@ -439,23 +436,36 @@ def update_user(user, index=None):
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
 
-    es.index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
-
 @requires_search
-def update_file(file_, index=None, delete=False):
+def update_user(user, index=None):
 
     index = index or INDEX
-
-    if not file_.node.is_public or delete or file_.node.is_deleted or file_.node.archiving:
-        es.delete(
-            index=index,
-            doc_type='file',
-            id=file_._id,
-            refresh=True,
-            ignore=[404]
-        )
+    if not user.is_active:
+        try:
+            es.delete(index=index, doc_type='user', id=user._id, refresh=settings.ELASTIC_REFRESH, ignore=[404])
+        except NotFoundError:
+            pass
         return
 
+    es.index(index=index, doc_type='user', body=serialize_user(user), id=user._id, refresh=settings.ELASTIC_REFRESH)
+
+def is_searchable(node):
+    """Whether ``node`` and its files belong in the index."""
+    return node.is_public and not node.is_deleted and not node.archiving
+
+
+def serialize_file_node_fields(node):
+    """Fields of ``node`` copied into the docs of its files."""
+    return {
+        'node_url': '/{node_id}/'.format(node_id=node._id),
+        'node_title': node.title,
+        'parent_id': node.parent_node._id if node.parent_node else None,
+        'is_registration': node.is_registration,
+        'is_retracted': node.is_retracted,
+    }
+
+
+def serialize_file(file_):
     # We build URLs manually here so that this function can be
     # run outside of a Flask request context (e.g. in a celery task)
     file_deep_url = '/{node_id}/files/{provider}{path}/'.format(
@@ -463,35 +473,221 @@ def update_file(file_, index=None, delete=False):
         provider=file_.provider,
         path=file_.path,
     )
-    node_url = '/{node_id}/'.format(node_id=file_.node._id)
-
     file_doc = {
         'id': file_._id,
         'deep_url': file_deep_url,
         'tags': [tag._id for tag in file_.tags],
         'name': file_.name,
         'category': 'file',
-        'node_url': node_url,
-        'node_title': file_.node.title,
-        'parent_id': file_.node.parent_node._id if file_.node.parent_node else None,
-        'is_registration': file_.node.is_registration,
-        'is_retracted': file_.node.is_retracted
     }
+    file_doc.update(serialize_file_node_fields(file_.node))
+    return file_doc
+
+
+def get_node_file_ids(node):
+    from website.files.models import StoredFileNode
+    return [
+        each['_id']
+        for each in StoredFileNode._storage[0].store.find(
+            {'node': node._id, 'provider': 'osfstorage', 'is_file': True},
+            {'_id': True},
+        )
+    ]
+
+
+def node_file_actions(node, index, node_fields_only=False):
+    """Bulk actions for the docs of every osfstorage file on ``node``. Files of
+    nodes that aren't searchable are removed from the index.
+
+    :param bool node_fields_only: Only rewrite the fields copied from the node,
+        without loading the files
+    """
+    if not is_searchable(node):
+        return (
+            {'_op_type': 'delete', '_index': index, '_type': 'file', '_id': file_id}
+            for file_id in get_node_file_ids(node)
+        )
+    if node_fields_only:
+        node_fields = serialize_file_node_fields(node)
+        return (
+            {'_op_type': 'update', '_index': index, '_type': 'file', '_id': file_id, 'doc': node_fields}
+            for file_id in get_node_file_ids(node)
+        )
+    from website.files.models.osfstorage import OsfStorageFile
+    return (
+        {'_op_type': 'index', '_index': index, '_type': 'file', '_id': file_._id, '_source': serialize_file(file_)}
+        for file_ in paginated(OsfStorageFile, Q('node', 'eq', node))
+    )
+
+
+def update_node_files(node, index=None, node_fields_only=False):
+    """Update the docs of every osfstorage file on ``node`` with a single bulk
+    request.
+    """
+    index = index or INDEX
+    actions = node_file_actions(node, index, node_fields_only=node_fields_only)
+    # Deleting or updating files that were never indexed is not an error
+    return helpers.bulk(es, actions, raise_on_error=False, refresh=settings.ELASTIC_REFRESH)
+
+
+@requires_search
+def update_file(file_, index=None, delete=False):
+
+    index = index or INDEX
+
+    if delete or not is_searchable(file_.node):
+        es.delete(
+            index=index,
+            doc_type='file',
+            id=file_._id,
+            refresh=settings.ELASTIC_REFRESH,
+            ignore=[404]
+        )
+        return
+
+    file_doc = serialize_file(file_)
 
     es.index(
         index=index,
         doc_type='file',
         body=file_doc,
         id=file_._id,
-        refresh=True
+        refresh=settings.ELASTIC_REFRESH
     )
 
+def node_actions(node, index, update_files='all'):
+    """Bulk actions that bring the doc of ``node`` up to date, along with the
+    docs of its files as described by ``update_files``.
+    """
+    if update_files:
+        for action in node_file_actions(node, index, node_fields_only=update_files == 'node_fields'):
+            yield action
+    if is_searchable(node):
+        category = get_doctype_from_node(node)
+        yield {'_op_type': 'index', '_index': index, '_type': category, '_id': node._id, '_source': serialize_node(node, category)}
+    else:
+        category = 'registration' if node.is_registration else node.project_or_component
+        yield {'_op_type': 'delete', '_index': index, '_type': category, '_id': node._id}
+
+
+def user_actions(user, index):
+    if user.is_active:
+        yield {'_op_type': 'index', '_index': index, '_type': 'user', '_id': user._id, '_source': serialize_user(user)}
+    else:
+        yield {'_op_type': 'delete', '_index': index, '_type': 'user', '_id': user._id}
+
+
+def file_actions(file_, index, delete=False):
+    if delete or not is_searchable(file_.node):
+        yield {'_op_type': 'delete', '_index': index, '_type': 'file', '_id': file_._id}
+    else:
+        yield {'_op_type': 'index', '_index': index, '_type': 'file', '_id': file_._id, '_source': serialize_file(file_)}
+
+
+def load_pending(items):
+    """Load the objects behind ``items`` with one query per kind.
+
+    :return: dict mapping (kind, id) to the loaded object
+    """
+    from website.files.models.osfstorage import OsfStorageFile
+    ids = collections.defaultdict(list)
+    for kind, _id, _, _ in items:
+        ids[kind].append(_id)
+    finders = {'node': Node.find, 'user': User.find, 'file': OsfStorageFile.find}
+    return {
+        (kind, obj._id): obj
+        for kind, kind_ids in ids.items()
+        for obj in finders[kind](Q('_id', 'in', kind_ids))
+    }
+
+
+def pending_actions(item, obj, index):
+    kind, _id, options, _ = item
+    if kind == 'file':
+        if obj is None:
+            # The file was deleted after the update was queued
+            return [{'_op_type': 'delete', '_index': index, '_type': 'file', '_id': _id}]
+        return file_actions(obj, index, delete=options.get('delete', False))
+    if obj is None:
+        logger.warning('Could not index {} {}: not found'.format(kind, _id))
+        return []
+    if kind == 'node':
+        return node_actions(obj, index, update_files=options.get('update_files', 'all'))
+    return user_actions(obj, index)
+
+
+@requires_search
+def index_pending(items, index=None):
+    """Load, serialize and send the coalesced updates in ``items`` in streaming
+    bulk requests of ``SEARCH_INDEXING_CHUNK_SIZE`` actions.
+
+    :param list items: ``[kind, id, options, enqueued]`` entries of an
+        :class:`website.search.indexing.IndexingBatch`
+    :return: The items Elasticsearch rejected because it was overloaded
+    """
+    from website.search.indexing import indexing_metrics
+    index = index or INDEX
+    objects = load_pending(items)
+    # streaming_bulk consumes actions and reports results in the same order,
+    # so the item each result belongs to is always at the front of ``owners``
+    owners = collections.deque()
+
+    def actions():
+        for item in items:
+            for action in pending_actions(item, objects.get((item[0], item[1])), index):
+                owners.append(item)
+                yield action
+
+    failed, rejected = [], []
+    results = helpers.streaming_bulk(
+        es, actions(),
+        chunk_size=settings.SEARCH_INDEXING_CHUNK_SIZE,
+        raise_on_error=False,
+        refresh=settings.ELASTIC_REFRESH,
+    )
+    for ok, result in results:
+        item = owners.popleft()
+        status = result.values()[0].get('status')
+        # Deleting or updating docs that were never indexed is not an error
+        if ok or status == 404:
+            continue
+        if status == 429:
+            if not rejected or rejected[-1] is not item:
+                rejected.append(item)
+        elif not failed or failed[-1] is not item:
+            failed.append(item)
+            logger.error('Failed to index {} {}: {}'.format(item[0], item[1], result.values()[0].get('error')))
+
+    now = time.time()
+    rejected_keys = {(kind, _id) for kind, _id, _, _ in rejected}
+    indexing_metrics.record_indexed(
+        lags=[now - enqueued for kind, _id, _, enqueued in items if (kind, _id) not in rejected_keys],
+        failed=len(failed),
+        rejected=len(rejected),
+    )
+    return rejected
+
+
+@celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
+def index_pending_async(self, items, index=None):
+    try:
+        rejected = index_pending(items, index=index)
+    except Exception as exc:
+        self.retry(exc=exc)
+    if rejected:
+        # Back off while the cluster is shedding writes, retrying only what it rejected
+        self.retry(
+            args=(rejected, ),
+            kwargs={'index': index},
+            countdown=self.default_retry_delay * 2 ** self.request.retries,
+        )
+
 @requires_search
 def update_institution(institution, index=None):
     index = index or INDEX
     id_ = institution._id
     if institution.is_deleted:
-        es.delete(index=index, doc_type='institution', id=id_, refresh=True, ignore=[404])
+        es.delete(index=index, doc_type='institution', id=id_, refresh=settings.ELASTIC_REFRESH, ignore=[404])
     else:
         institution_doc = {
             'id': id_,
@@ -501,7 +697,7 @@ def update_institution(institution, index=None):
             'name': institution.name,
         }
 
-        es.index(index=index, doc_type='institution', body=institution_doc, id=id_, refresh=True)
+        es.index(index=index, doc_type='institution', body=institution_doc, id=id_, refresh=settings.ELASTIC_REFRESH)
 
 @requires_search
 def delete_all():
@@ -567,7 +763,7 @@ def create_index(index=None):
 def delete_doc(elastic_document_id, node, index=None, category=None):
     index = index or INDEX
     category = category or 'registration' if node.is_registration else node.project_or_component
-    es.delete(index=index, doc_type=category, id=elastic_document_id, refresh=True, ignore=[404])
+    es.delete(index=index, doc_type=category, id=elastic_document_id, refresh=settings.ELASTIC_REFRESH, ignore=[404])
 
 
 @requires_search
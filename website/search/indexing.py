@@ -0,0 +1,203 @@
+"""Coalescing of search index updates.
+
+Updates made while handling a request are collected in an :class:`IndexingBatch`
+keyed by (kind, id), so an object saved many times, or reached through many
+related objects, is only serialized once. The batch is sent once the request
+has committed, in chunks of ``SEARCH_INDEXING_CHUNK_SIZE`` updates, each of
+which is indexed with a single streaming bulk request by a celery worker.
+"""
+import contextlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from framework.caching import request_cache
+from framework.postcommit_tasks.handlers import enqueue_postcommit_task
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Ranks of the ``update_files`` modes of node updates; coalescing keeps the widest
+UPDATE_FILES_RANKS = {None: 0, 'node_fields': 1, 'all': 2}
+
+
+class IndexingMetrics(object):
+    """Running totals for search updates queued and indexed by this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.enqueued = 0
+            self.coalesced = 0
+            self.depth = 0
+            self.max_depth = 0
+            self.indexed = 0
+            self.failed = 0
+            self.rejected = 0
+            self.total_lag = 0.0
+            self.max_lag = 0.0
+
+    def record_enqueued(self, coalesced):
+        with self._lock:
+            self.enqueued += 1
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.depth += 1
+                self.max_depth = max(self.max_depth, self.depth)
+
+    def record_flushed(self, count):
+        with self._lock:
+            self.depth = max(self.depth - count, 0)
+
+    def record_indexed(self, lags, failed=0, rejected=0):
+        """
+        :param list lags: Seconds between queueing and indexing each update
+        """
+        with self._lock:
+            self.indexed += len(lags)
+            self.failed += failed
+            self.rejected += rejected
+            self.total_lag += sum(lags)
+            self.max_lag = max([self.max_lag] + lags)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'enqueued': self.enqueued,
+                'coalesced': self.coalesced,
+                'depth': self.depth,
+                'max_depth': self.max_depth,
+                'indexed': self.indexed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'mean_lag': self.total_lag / self.indexed if self.indexed else 0.0,
+                'max_lag': self.max_lag,
+            }
+
+indexing_metrics = IndexingMetrics()
+
+
+class IndexingBatch(object):
+    """Search updates waiting to be sent, coalesced per (kind, id). Objects are
+    loaded again when the batch is indexed, so only the options of an update
+    are kept.
+
+    :param int max_pending: Number of distinct updates after which the batch is
+        sent early; ``None`` holds everything until :meth:`flush`
+    """
+
+    def __init__(self, max_pending=None):
+        self.pending = OrderedDict()
+        self.max_pending = max_pending
+
+    def __repr__(self):
+        return '<IndexingBatch {}>'.format(id(self))
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, kind, _id, **options):
+        key = (kind, _id)
+        queued = self.pending.get(key)
+        indexing_metrics.record_enqueued(coalesced=queued is not None)
+        if queued is None:
+            self.pending[key] = (options, time.time())
+        else:
+            self.pending[key] = (merge_options(kind, queued[0], options), queued[1])
+        if self.max_pending and len(self.pending) >= self.max_pending:
+            self.flush()
+
+    def add_node(self, node, update_files='all'):
+        self.add('node', node._id, update_files=update_files)
+
+    def add_user(self, user):
+        self.add('user', user._id)
+
+    def add_file(self, file_, delete=False):
+        self.add('file', file_._id, delete=delete)
+
+    def items(self):
+        """``[kind, id, options, enqueued]`` for every pending update, in the
+        order they were first queued.
+        """
+        return [
+            [kind, _id, options, enqueued]
+            for (kind, _id), (options, enqueued) in self.pending.items()
+        ]
+
+    def flush(self):
+        """Send every pending update and empty the batch."""
+        items = self.items()
+        self.pending.clear()
+        indexing_metrics.record_flushed(len(items))
+        if not items:
+            return
+        from website.search import search
+        chunk_size = settings.SEARCH_INDEXING_CHUNK_SIZE
+        for start in range(0, len(items), chunk_size):
+            search.index_pending(items[start:start + chunk_size])
+        logger.info('Queued {} search updates in {} chunks'.format(
+            len(items), (len(items) + chunk_size - 1) // chunk_size
+        ))
+
+
+def merge_options(kind, queued, options):
+    """Options of a single update that covers both ``queued`` and ``options``."""
+    if kind == 'node':
+        update_files = max(
+            queued.get('update_files'), options.get('update_files'),
+            key=UPDATE_FILES_RANKS.get,
+        )
+        return {'update_files': update_files}
+    if kind == 'file':
+        # The file is loaded when indexed, so the latest request wins
+        return options
+    return queued
+
+
+def flush_batch(batch):
+    batch.flush()
+
+
+def get_indexing_batch():
+    """Return the batch that search updates should be added to, or ``None`` if
+    they should be sent right away. Within a request the batch is created on
+    first use and sent once the request has committed. Like other async search
+    updates, this only happens when celery is used.
+    """
+    stack = getattr(_local, 'batches', None)
+    if stack:
+        return stack[-1]
+    if not settings.USE_CELERY:
+        return None
+    cache = request_cache('search-indexing')
+    if cache is None:
+        return None
+    if 'batch' not in cache:
+        cache['batch'] = IndexingBatch()
+        enqueue_postcommit_task(flush_batch, (cache['batch'], ), {}, celery=False, once_per_request=True)
+    return cache['batch']
+
+
+@contextlib.contextmanager
+def batched_updates(max_pending=None):
+    """Coalesce the search updates made in this block outside of a request,
+    e.g. in scripts. Updates are sent every ``max_pending`` distinct updates,
+    which bounds the memory held by long runs, and when the block exits.
+    """
+    batch = IndexingBatch(max_pending=max_pending or settings.SEARCH_INDEXING_MAX_PENDING)
+    if not hasattr(_local, 'batches'):
+        _local.batches = []
+    _local.batches.append(batch)
+    try:
+        yield batch
+    finally:
+        _local.batches.pop()
+    batch.flush()
@@ -4,6 +4,7 @@ from framework.celery_tasks.handlers import enqueue_task
 
 from website import settings
 from website.search import share_search
+from website.search.indexing import get_indexing_batch
 
 logger = logging.getLogger(__name__)
 
@@ -26,20 +27,23 @@ def search(query, index=None, doc_type=None):
     return search_engine.search(query, index=index, doc_type=doc_type)
 
 @requires_search
-def update_node(node, index=None, bulk=False, async=True):
-    if async:
+def update_node(node, index=None, bulk=False, async=True, update_files='all'):
+    batch = get_indexing_batch()
+    if async and batch is not None and index is None and not bulk:
+        batch.add_node(node, update_files=update_files)
+    elif async:
         node_id = node._id
         # We need the transaction to be committed before trying to run celery tasks.
         # For example, when updating a Node's privacy, is_public must be True in the
         # database in order for method that updates the Node's elastic search document
         # to run correctly.
         if settings.USE_CELERY:
-            enqueue_task(search_engine.update_node_async.s(node_id=node_id, index=index, bulk=bulk))
+            enqueue_task(search_engine.update_node_async.s(node_id=node_id, index=index, bulk=bulk, update_files=update_files))
         else:
-            search_engine.update_node_async(node_id=node_id, index=index, bulk=bulk)
+            search_engine.update_node_async(node_id=node_id, index=index, bulk=bulk, update_files=update_files)
     else:
         index = index or settings.ELASTIC_INDEX
-        return search_engine.update_node(node, index=index, bulk=bulk)
+        return search_engine.update_node(node, index=index, bulk=bulk, update_files=update_files)
 
 @requires_search
 def bulk_update_nodes(serialize, nodes, index=None):
@@ -55,18 +59,40 @@ def delete_node(node, index=None):
     search_engine.delete_doc(node._id, node, index=index, category=doc_type)
 
 def update_contributors(nodes):
-    search_engine.bulk_update_contributors(nodes)
+    batch = get_indexing_batch()
+    if batch is not None:
+        for node in nodes:
+            # Contributors aren't part of file docs
+            batch.add_node(node, update_files=None)
+    else:
+        search_engine.bulk_update_contributors(nodes)
 
 
 @requires_search
 def update_user(user, index=None):
-    index = index or settings.ELASTIC_INDEX
-    search_engine.update_user(user, index=index)
+    batch = get_indexing_batch()
+    if batch is not None and index is None:
+        batch.add_user(user)
+    else:
+        index = index or settings.ELASTIC_INDEX
+        search_engine.update_user(user, index=index)
 
 @requires_search
 def update_file(file_, index=None, delete=False):
-    index = index or settings.ELASTIC_INDEX
-    search_engine.update_file(file_, index=index, delete=delete)
+    batch = get_indexing_batch()
+    if batch is not None and index is None:
+        batch.add_file(file_, delete=delete)
+    else:
+        index = index or settings.ELASTIC_INDEX
+        search_engine.update_file(file_, index=index, delete=delete)
+
+@requires_search
+def index_pending(items, index=None):
+    """Send coalesced updates from an IndexingBatch to the search engine."""
+    if settings.USE_CELERY:
+        search_engine.index_pending_async.apply_async(args=(items, ), kwargs={'index': index})
+    else:
+        search_engine.index_pending(items, index=index)
 
 @requires_search
 def update_institution(institution, index=None):
@@ -3,53 +3,219 @@
 '''Migration script for Search-enabled Models.'''
 from __future__ import absolute_import
 
+import collections
 import logging
+import multiprocessing
 
-from elasticsearch import helpers
+from elasticsearch import Elasticsearch, helpers
 from modularodm.query.querydialect import DefaultQueryDialect as Q
 
-from framework.mongo.utils import paginated
+from framework.mongo import database
+from framework.mongo import handlers as mongo_handlers
 from website import settings
 from framework.auth import User
 from website.models import Node
 from website.app import init_app
 import website.search.search as search
 from scripts import utils as script_utils
+from website.search import elastic_search
 from website.search.elastic_search import es
+from website.search.exceptions import SearchException
 
 
 logger = logging.getLogger(__name__)
 
-def migrate_nodes(index):
-    logger.info('Migrating nodes to index: {}'.format(index))
-    query = Q('is_public', 'eq', True) & Q('is_deleted', 'eq', False)
-    total = Node.find(query).count()
-    increment = 200
-    total_pages = (total // increment) + 1
-    pages = paginated(Node, query=query, increment=increment, each=False)
-    for page_number, page in enumerate(pages):
-        logger.info('Updating page {} / {}'.format(page_number + 1, total_pages))
-        Node.bulk_update_search(page, index=index)
-        Node._clear_caches()
+# Progress of each partition of a reindex, so an interrupted reindex can resume
+CHECKPOINT_COLLECTION = 'searchreindexcheckpoints'
 
-    logger.info('Nodes migrated: {}'.format(total))
+# Documents of each kind that belong in a freshly built index
+REINDEX_QUERIES = collections.OrderedDict([
+    ('node', {'is_public': True, 'is_deleted': False}),
+    ('user', {}),
+])
 
+REINDEX_MODELS = {
+    'node': Node,
+    'user': User,
+}
 
-def migrate_users(index):
-    logger.info('Migrating users to index: {}'.format(index))
-    n_migr = 0
-    n_iter = 0
-    users = paginated(User, query=None, increment=1000, each=True)
-    for user in users:
-        if user.is_active:
-            search.update_user(user, index=index)
-            n_migr += 1
-        n_iter += 1
 
-    logger.info('Users iterated: {0}\nUsers migrated: {1}'.format(n_iter, n_migr))
+def get_partitions(kind, size):
+    """Split the ``_id`` keyspace of the documents of ``kind`` to reindex into
+    ranges of about ``size`` documents.
 
+    :return: ``(start, end)`` pairs; ``start`` is inclusive, ``end`` exclusive
+        and ``None`` leaves that side of the range open
+    """
+    collection = REINDEX_MODELS[kind]._storage[0].store
+    query = REINDEX_QUERIES[kind]
+    boundaries = []
+    while True:
+        if boundaries:
+            query = dict(REINDEX_QUERIES[kind], _id={'$gte': boundaries[-1]})
+        boundary = list(collection.find(query, {'_id': True}).sort('_id', 1).skip(size).limit(1))
+        if not boundary:
+            break
+        boundaries.append(boundary[0]['_id'])
+    return zip([None] + boundaries, boundaries + [None])
 
-def migrate(delete, index=None, app=None):
+
+def create_checkpoints(alias, index, size=None):
+    """Record a checkpoint for every partition of a reindex of ``alias`` into
+    ``index``, dropping those of any earlier reindex of ``alias``.
+    """
+    size = size or settings.SEARCH_REINDEX_PARTITION_SIZE
+    checkpoints = database[CHECKPOINT_COLLECTION]
+    checkpoints.remove({'alias': alias})
+    for kind in REINDEX_QUERIES:
+        for number, (start, end) in enumerate(get_partitions(kind, size)):
+            checkpoints.insert({
+                '_id': '{}:{}:{}'.format(index, kind, number),
+                'alias': alias,
+                'index': index,
+                'kind': kind,
+                'start': start,
+                'end': end,
+                'last_id': None,
+                'counts': {},
+                'done': False,
+            })
+
+
+def get_unfinished_index(alias):
+    """Return the index an interrupted reindex of ``alias`` was writing to."""
+    checkpoint = database[CHECKPOINT_COLLECTION].find_one({'alias': alias})
+    if checkpoint and es.indices.exists(index=checkpoint['index']):
+        return checkpoint['index']
+    return None
+
+
+def partition_query(checkpoint):
+    query = dict(REINDEX_QUERIES[checkpoint['kind']])
+    id_range = {}
+    if checkpoint['last_id'] is not None:
+        id_range['$gt'] = checkpoint['last_id']
+    elif checkpoint['start'] is not None:
+        id_range['$gte'] = checkpoint['start']
+    if checkpoint['end'] is not None:
+        id_range['$lt'] = checkpoint['end']
+    if id_range:
+        query['_id'] = id_range
+    return query
+
+
+def partition_actions(kind, objects, index):
+    for obj in objects:
+        if kind == 'node':
+            for action in elastic_search.node_actions(obj, index):
+                yield action
+        elif obj.is_active:
+            for action in elastic_search.user_actions(obj, index):
+                yield action
+
+
+def reindex_partition(checkpoint_id):
+    """Index the documents of a partition from where its checkpoint left off,
+    moving the checkpoint forward after every chunk.
+
+    :return: The id of the checkpoint
+    """
+    checkpoints = database[CHECKPOINT_COLLECTION]
+    checkpoint = checkpoints.find_one({'_id': checkpoint_id})
+    if checkpoint['done']:
+        return checkpoint_id
+    kind, index = checkpoint['kind'], checkpoint['index']
+    model = REINDEX_MODELS[kind]
+    chunk_size = settings.SEARCH_INDEXING_CHUNK_SIZE
+    ids = [
+        each['_id']
+        for each in model._storage[0].store.find(partition_query(checkpoint), {'_id': True}).sort('_id', 1)
+    ]
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        objects = model.find(Q('_id', 'in', chunk))
+        counts = collections.Counter()
+        results = helpers.streaming_bulk(
+            es, partition_actions(kind, objects, index),
+            chunk_size=chunk_size,
+            raise_on_error=False,
+        )
+        for ok, result in results:
+            op_type, item = result.items()[0]
+            if ok and op_type == 'index':
+                counts[item['_type']] += 1
+            elif not ok and item.get('status') != 404:
+                logger.error('Failed to index {} {}: {}'.format(item['_type'], item['_id'], item.get('error')))
+        update = {'$set': {'last_id': chunk[-1]}}
+        if counts:
+            update['$inc'] = {'counts.{}'.format(doc_type): count for doc_type, count in counts.items()}
+        checkpoints.update({'_id': checkpoint_id}, update)
+        model._clear_caches()
+    checkpoints.update({'_id': checkpoint_id}, {'$set': {'done': True}})
+    return checkpoint_id
+
+
+def init_worker():
+    """Give each worker process its own connections rather than sharing the
+    sockets inherited from the parent.
+    """
+    global es
+    mongo_handlers.CLIENT_POOL = mongo_handlers.ClientPool()
+    es = elastic_search.es = Elasticsearch(settings.ELASTIC_URI, request_timeout=settings.ELASTIC_TIMEOUT)
+
+
+def reindex(index, workers=None):
+    """Run every unfinished partition of the reindex into ``index``, across
+    ``workers`` processes.
+    """
+    workers = workers or settings.SEARCH_REINDEX_WORKERS
+    pending = [
+        each['_id']
+        for each in database[CHECKPOINT_COLLECTION].find({'index': index, 'done': False}, {'_id': True})
+    ]
+    total = database[CHECKPOINT_COLLECTION].find({'index': index}).count()
+    logger.info('Reindexing {} of {} partitions into {} with {} workers'.format(len(pending), total, index, workers))
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=init_worker)
+        try:
+            results = pool.imap_unordered(reindex_partition, pending)
+            for number, checkpoint_id in enumerate(results, 1):
+                logger.info('Finished partition {} ({} / {})'.format(checkpoint_id, number, len(pending)))
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for number, checkpoint_id in enumerate(pending, 1):
+            reindex_partition(checkpoint_id)
+            logger.info('Finished partition {} ({} / {})'.format(checkpoint_id, number, len(pending)))
+
+
+def get_expected_counts(index):
+    counts = collections.Counter()
+    for checkpoint in database[CHECKPOINT_COLLECTION].find({'index': index}):
+        counts.update(checkpoint['counts'])
+    return counts
+
+
+def check_counts(index):
+    """Raise if ``index`` doesn't hold exactly the documents the reindex wrote."""
+    es.indices.refresh(index=index)
+    for doc_type, expected in get_expected_counts(index).items():
+        actual = es.count(index=index, doc_type=doc_type)['count']
+        if actual != expected:
+            raise SearchException(
+                'Index {} has {} {} documents, expected {}'.format(index, actual, doc_type, expected)
+            )
+
+
+def migrate(delete, index=None, app=None, workers=None, resume=True):
+    """Rebuild ``index`` into a new versioned index, and point the ``index``
+    alias at it once the document counts check out.
+
+    :param int workers: Number of processes to reindex with
+    :param bool resume: Continue an interrupted reindex of ``index`` if there
+        is one, rather than starting over
+    """
     index = index or settings.ELASTIC_INDEX
     app = app or init_app('website.settings', set_backends=True, routes=True)
 
@@ -60,17 +226,24 @@ def migrate(delete, index=None, app=None):
     ctx = app.test_request_context()
     ctx.push()
 
-    new_index = set_up_index(index)
-
-    migrate_nodes(new_index)
-    migrate_users(new_index)
+    try:
+        new_index = get_unfinished_index(index) if resume else None
+        if new_index:
+            logger.info('Resuming reindex of {} into {}'.format(index, new_index))
+        else:
+            new_index = set_up_index(index)
+            create_checkpoints(index, new_index)
 
-    set_up_alias(index, new_index)
+        reindex(new_index, workers=workers)
+        check_counts(new_index)
 
-    if delete:
-        delete_old(new_index)
+        set_up_alias(index, new_index)
+        database[CHECKPOINT_COLLECTION].remove({'alias': index})
 
-    ctx.pop()
+        if delete:
+            delete_old(new_index)
+    finally:
+        ctx.pop()
 
 def set_up_index(idx):
     alias = es.indices.get_aliases(index=idx)
@@ -75,6 +75,17 @@ SEARCH_ENGINE = 'elastic'  # Can be 'elastic', or None
 ELASTIC_URI = 'localhost:9200'
 ELASTIC_TIMEOUT = 10
 ELASTIC_INDEX = 'website'
+# Whether writes to the search index wait for a refresh so they are searchable at
+# once. Otherwise they become visible on the index's next scheduled refresh.
+ELASTIC_REFRESH = False
+# Search updates are coalesced per request and indexed in bulk by a celery worker.
+# Number of updates sent per task, and actions sent per bulk request
+SEARCH_INDEXING_CHUNK_SIZE = 500
+# Distinct updates a batch outside of a request holds before sending them early
+SEARCH_INDEXING_MAX_PENDING = 5000
+# Processes used by search_migration to rebuild the index, and documents per partition they work through
+SEARCH_REINDEX_WORKERS = 4
+SEARCH_REINDEX_PARTITION_SIZE = 10000
 SHARE_ELASTIC_URI = ELASTIC_URI
 SHARE_ELASTIC_INDEX = 'share'
 # For old indices
@@ -245,6 +256,17 @@ SYSTEM_ADDED_ADDONS = {
     'node': [],
 }
 
+# Page counters are buffered in each process and written out by a background
+# thread every PAGE_COUNTER_FLUSH_INTERVAL seconds, or once this many pages have
+# pending counts
+PAGE_COUNTER_FLUSH_INTERVAL = 10
+PAGE_COUNTER_FLUSH_THRESHOLD = 500
+# Sessions store the pages they have visited, used for unique counts, as a list
+# of up to VISIT_LIST_MAX_SIZE pages, then as bloom filters of this many bits
+VISIT_LIST_MAX_SIZE = 20
+VISIT_FILTER_SIZE = 8192
+DAILY_VISIT_FILTER_SIZE = 2048
+
 # Piwik
 
 # TODO: Override in local.py in production
@@ -330,6 +352,17 @@ ARCHIVE_TIMEOUT_TIMEDELTA = timedelta(1)  # 24 hours
 
 ENABLE_ARCHIVER = True
 
+# Addon file trees are crawled with this many concurrent folder listings. Each
+# process makes at most ARCHIVE_CRAWL_RATE_LIMIT metadata requests per second to
+# a provider, unless the provider is given its own rate in ARCHIVE_CRAWL_RATE_LIMITS
+ARCHIVE_CRAWL_WORKERS = 8
+ARCHIVE_CRAWL_RATE_LIMIT = 10
+ARCHIVE_CRAWL_RATE_LIMITS = {}
+# Retries of a listing that is throttled or fails with a server error, waiting
+# ARCHIVE_CRAWL_BACKOFF seconds before the first and twice as long before each next
+ARCHIVE_CRAWL_MAX_RETRIES = 4
+ARCHIVE_CRAWL_BACKOFF = 1
+
 JWT_SECRET = 'changeme'
 JWT_ALGORITHM = 'HS256'
 
@@ -342,6 +375,7 @@ HIGH_QUEUE = 'high'
 
 LOW_PRI_MODULES = {
     'framework.analytics.tasks',
+    'framework.guid.tasks',
     'framework.celery_tasks',
     'scripts.osfstorage.usage_audit',
     'scripts.osfstorage.glacier_inventory',
@@ -367,6 +401,7 @@ HIGH_PRI_MODULES = {
     'scripts.refresh_addon_tokens',
     'scripts.retract_registrations',
     'website.archiver.tasks',
+    'website.project.tasks',
 }
 
 try:
@@ -444,6 +479,14 @@ else:
             'schedule': crontab(minute=0, hour=0),
             'args': ('email_digest',),
         },
+        'refill_guid_pool': {
+            'task': 'framework.guid.tasks.refill_guid_pool',
+            'schedule': crontab(minute='*/5'),
+        },
+        'repair_node_statistics': {
+            'task': 'website.project.tasks.repair_node_statistics',
+            'schedule': crontab(minute=0, hour=3, day_of_week=0),  # Sunday 3:00 a.m.
+        },
         'refresh_addons': {
             'task': 'scripts.refresh_addon_tokens',
             'schedule': crontab(minute=0, hour= 2),  # Daily 2:00 a.m
@@ -553,7 +596,50 @@ ENABLE_INSTITUTIONS = False
 ENABLE_VARNISH = False
 ENABLE_ESI = False
 VARNISH_SERVERS = []  # This should be set in local.py or cache invalidation won't work
+# Maximum number of BAN requests in flight at once, and of keep-alive connections per server
+VARNISH_BAN_CONCURRENCY = 10
 ESI_MEDIA_TYPES = {'application/vnd.api+json', 'application/json'}
 
+# URL of a Redis-compatible server (e.g. 'redis://localhost:6379/1') shared by all
+# processes on a host. Used as the cross-request tier of framework.caching; requires
+# the redis package. When None, only in-process and per-request caches are used.
+SHARED_CACHE_URL = None
+
+# Seconds a resolved inherited-admin permission stays in the shared cache
+PERMISSION_CACHE_TTL = 5 * 60
+
+# Seconds the resolved subscribers of a node and notification event stay in the shared cache
+NOTIFICATION_SUBSCRIBERS_CACHE_TTL = 5 * 60
+
+# Users whose digests are mailed per batch
+NOTIFICATION_DIGEST_CHUNK_SIZE = 500
+
+# GUIDs of each length kept reserved for new objects, topped up by a periodic task
+GUID_POOL_SIZE = 10000
+
+# Seconds a rendered embedded (mod-meta) template that opts in with a "cache"
+# key stays in the shared cache
+WEB_FRAGMENT_CACHE_TTL = 60
+
+# Nodes whose overview page statistics are recomputed per batch of queries
+NODE_STATISTICS_REPAIR_CHUNK_SIZE = 1000
+
+# Serializers that set `cache_representation` keep anonymous API representations
+# for this many seconds. Saves invalidate entries immediately in the saving process
+# and in the shared tier; other processes' in-process tier may lag by up to the TTL.
+API_REPRESENTATION_CACHE_TTL = 60
+API_REPRESENTATION_CACHE_SIZE = 4096
+
+# Successful OAuth2 access token lookups from CAS are reused for this many seconds.
+# Revoking tokens evicts them everywhere when SHARED_CACHE_URL is set; otherwise
+# other processes may keep accepting a revoked token for up to the TTL.
+CAS_TOKEN_CACHE_TTL = 60
+CAS_TOKEN_CACHE_SIZE = 4096
+
+# Successful password checks are remembered in-process for this many seconds, keyed
+# by an HMAC that includes the stored password hash
+PASSWORD_VERIFICATION_CACHE_TTL = 5 * 60
+PASSWORD_VERIFICATION_CACHE_SIZE = 1024
+
 # Used for gathering meta information about the current build
 GITHUB_API_TOKEN = None
@@ -5,6 +5,7 @@
             <div mod-meta='{
                     "tpl": "util/render_node.mako",
                     "uri": "${each['api_url']}get_summary/",
+                    "cache": ["${each['id']}"],
                     "view_kwargs": {
                         "primary": ${int(each['primary'])},
                         "link_id": "${each['id']}",
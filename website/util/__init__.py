@@ -163,7 +163,10 @@ def waterbutler_url_for(route, provider, path, node, user=None, **kwargs):
         'provider': provider,
     })
 
-    if user:
+    # A cookie passed in ``kwargs`` is used as is
+    if 'cookie' in kwargs:
+        pass
+    elif user:
         url.args['cookie'] = user.get_or_create_cookie()
     elif website_settings.COOKIE_NAME in request.cookies:
         url.args['cookie'] = request.cookies[website_settings.COOKIE_NAME]